@@ -3,20 +3,21 @@ FraudShield AI - Main API Server
 FastAPI backend for fraud detection system
 """
 
-from fastapi import FastAPI, File, UploadFile, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
 from typing import List, Dict, Optional, Set, Tuple
 import pandas as pd
 import numpy as np
-import io
+import asyncio
+import functools
 import os
 import sys
 from datetime import datetime
-import json
 import tempfile
 import threading
+import time
 from collections import deque
 from dotenv import load_dotenv
 
@@ -25,9 +26,19 @@ load_dotenv()
 # Add parent directory to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from ml_engine.models.hybrid_fraud_detector import HybridFraudDetector
-from ml_engine.explainability.explainer import FraudExplainer
-from utils.helpers import get_risk_level
+from ml_engine.explainability.explainer import ATTRIBUTION_CACHE
+from ml_engine.models.account_dictionary import ACCOUNTS, decode_accounts, encode_accounts
+from ml_engine.models.hybrid_fraud_detector import HybridFraudDetector, RuleBasedEngine
+from ml_engine.models.artifacts import read_manifest
+from ml_engine.models.partitioning import scoring_pool, start_method
+from ml_engine.models.schema import read_transactions
+from utils.exports import ExportStore
+from utils.helpers import get_risk_level, get_risk_levels
+from utils.jobs import Job, JobManager
+from utils.model_registry import ModelRegistry, ModelSnapshot, StaleSnapshotError
+from utils.responses import json_response
+from utils.result_store import MAX_PAGE_SIZE, RESULT_COLUMNS, ResultStore
+from utils.uploads import UploadStream, multipart_boundary, read_upload
 
 app = FastAPI(
     title="FraudShield AI API",
@@ -46,11 +57,81 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
-# Global model instances with thread safety
-fraud_detector: Optional[HybridFraudDetector] = None
-fraud_explainer: Optional[FraudExplainer] = None
+# Global model state: requests read model_registry.current without locking,
+# training publishes a complete new snapshot when it is done
+model_registry = ModelRegistry()
 training_data: Optional[pd.DataFrame] = None
-model_lock = threading.Lock()
+# Serializes writes to the saved artifact; scoring never takes it
+artifact_lock = threading.Lock()
+# Serializes updates appending to training_data
+history_lock = threading.Lock()
+# training_data as last scored for /api/graph/ego-tree:
+# (model version, training_data frame, scored frame)
+scored_history_cache: Optional[Tuple[Optional[int], pd.DataFrame, pd.DataFrame]] = None
+scored_history_lock = threading.Lock()
+
+# Persisted model artifact (loaded on startup, written after training)
+MODEL_ARTIFACT_DIR = os.getenv(
+    "MODEL_ARTIFACT_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "artifacts", "fraud_detector")
+)
+AUTO_SAVE_MODEL = os.getenv("AUTO_SAVE_MODEL", "true").lower() == "true"
+
+# Times /api/model/update is redone on a newer model that was published while
+# it ran, before giving up with 409
+UPDATE_ATTEMPTS = 3
+
+# Declarative rules (JSON), loaded on startup and reloadable via /api/rules/reload.
+# One engine is shared by every published detector.
+RULES_PATH = os.getenv(
+    "RULES_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config", "rules.json")
+)
+rule_engine = RuleBasedEngine()
+
+# Default for the ``cascade`` query parameter of /api/detect and /api/analyze
+CASCADE_MODE = os.getenv("CASCADE_MODE", "false").lower() == "true"
+
+# Processes per /api/detect and /api/analyze scoring call; the batch is
+# partitioned by account so results do not depend on it. The processes are
+# started once, at startup.
+PREDICT_WORKERS = max(1, int(os.getenv("PREDICT_WORKERS", "1")))
+
+# Rows of training_data (the transactions behind /api/graph/ego-tree) kept as
+# updates append to it; the model keeps its own history in its profiles and
+# sliding-window forest
+TRAINING_DATA_MAX_ROWS = max(1, int(os.getenv("TRAINING_DATA_MAX_ROWS", "1000000")))
+
+# Rows whose attributions are kept for /api/explain and /api/analyze; entries
+# are keyed by explainer version, so retraining never serves stale values
+ATTRIBUTION_CACHE.resize(int(os.getenv("ATTRIBUTION_CACHE_SIZE", str(ATTRIBUTION_CACHE.maxsize))))
+
+# Raw upload bytes buffered ahead of the CSV parser, per request; a faster
+# sender is paused until parsing catches up
+UPLOAD_BUFFER_BYTES = int(float(os.getenv("UPLOAD_BUFFER_MB", "32")) * 1024 * 1024)
+
+# /api/detect results stay downloadable for EXPORT_TTL_MINUTES; each format is
+# written on its first download. At most EXPORT_MAX_RESULTS are kept in memory.
+export_store = ExportStore(
+    os.path.join(tempfile.gettempdir(), "fraudshield_results"),
+    ttl=float(os.getenv("EXPORT_TTL_MINUTES", "60")) * 60,
+    max_results=int(os.getenv("EXPORT_MAX_RESULTS", "8")),
+    prepare=decode_accounts  # Exports carry account IDs, not codes
+)
+
+# Scored /api/analyze runs, queryable at /api/results/{result_id} for
+# RESULT_TTL_MINUTES; only the newest RESULT_MAX_RUNS are kept
+result_store = ResultStore(
+    os.getenv("RESULT_STORE_DIR", os.path.join(tempfile.gettempdir(), "fraudshield_result_store")),
+    ttl=float(os.getenv("RESULT_TTL_MINUTES", "1440")) * 60,
+    max_results=int(os.getenv("RESULT_MAX_RUNS", "16"))
+)
+
+# Training and file detection run in worker threads, off the event loop
+job_manager = JobManager(
+    max_workers=int(os.getenv("JOB_WORKERS", "2")),
+    history_size=int(os.getenv("JOB_HISTORY_SIZE", "100"))
+)
 
 
 class TransactionAnalysis(BaseModel):
@@ -125,6 +206,36 @@ class EgoTreeRequest(BaseModel):
     limit: int = 100
 
 
+class TransactionRecord(BaseModel):
+    """Single transaction for real-time scoring"""
+    step: int
+    type: str
+    amount: float
+    nameOrig: str
+    oldbalanceOrg: float
+    newbalanceOrig: float
+    nameDest: str
+    oldbalanceDest: float
+    newbalanceDest: float
+
+
+class ScoreRequest(BaseModel):
+    """Request model for real-time scoring"""
+    transactions: List[TransactionRecord]
+
+
+MAX_SCORE_BATCH = 100
+
+
+class ExplainRequest(BaseModel):
+    """Request model for feature attributions"""
+    transactions: List[TransactionRecord]
+    max_features: int = 5
+
+
+MAX_EXPLAIN_BATCH = 1000
+
+
 class EgoTreeResponse(BaseModel):
     """Response model for ego-tree graph"""
     nodes: List[GraphNode]
@@ -132,6 +243,63 @@ class EgoTreeResponse(BaseModel):
     summary: Dict
 
 
+def save_model_artifact(detector: HybridFraudDetector, path: str = MODEL_ARTIFACT_DIR) -> Dict:
+    """Persist a model (blocking; call from a job worker or via asyncio.to_thread)"""
+    with artifact_lock:
+        return detector.save(path)
+
+
+def load_model_artifact(path: str = MODEL_ARTIFACT_DIR) -> HybridFraudDetector:
+    """
+    Load a persisted model and publish it as the active detector
+
+    Blocking; call from a job worker or via asyncio.to_thread.
+    """
+    with artifact_lock:
+        detector = HybridFraudDetector.load(path)
+    detector.rule_engine = rule_engine
+    model_registry.publish(detector, detector.explainer)
+    return detector
+
+
+@app.on_event("startup")
+async def load_rules_on_startup():
+    """Use the configured rules file, if any, instead of the built-in rules"""
+    if not os.path.exists(RULES_PATH):
+        print(f"ℹ️  No rules file at {RULES_PATH}; using built-in rules")
+        return
+
+    try:
+        rules = rule_engine.load_rules(RULES_PATH)
+        print(f"✅ Loaded {len(rules.rules)} rules from {RULES_PATH}")
+    except Exception as e:
+        print(f"⚠️  Failed to load rules, using built-in rules: {str(e)}")
+
+
+@app.on_event("startup")
+async def start_scoring_pool():
+    """Start the PREDICT_WORKERS scoring processes before the first request needs them"""
+    if PREDICT_WORKERS > 1:
+        pool = scoring_pool(PREDICT_WORKERS)
+        print(f"✅ Started {pool.processes} scoring workers ({start_method()})")
+
+
+@app.on_event("startup")
+async def load_model_on_startup():
+    """Restore the last saved model so a restart does not require retraining"""
+    if read_manifest(MODEL_ARTIFACT_DIR) is None:
+        print(f"ℹ️  No saved model at {MODEL_ARTIFACT_DIR}; train via /api/train")
+        return
+
+    try:
+        start = time.perf_counter()
+        load_model_artifact()
+        print(f"✅ Loaded saved model from {MODEL_ARTIFACT_DIR} "
+              f"in {(time.perf_counter() - start) * 1000:.1f} ms")
+    except Exception as e:
+        print(f"⚠️  Failed to load saved model: {str(e)}")
+
+
 @app.get("/")
 async def root():
     """API root endpoint"""
@@ -139,7 +307,7 @@ async def root():
         "service": "FraudShield AI",
         "version": "2.0.0",
         "status": "operational",
-        "model_trained": fraud_detector is not None,
+        "model_trained": model_registry.current is not None,
         "description": "Advanced hybrid fraud detection system combining ML and rule-based approaches"
     }
 
@@ -150,209 +318,278 @@ async def health_check():
     return {
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
-        "model_ready": fraud_detector is not None
+        "model_ready": model_registry.current is not None
     }
 
 
-@app.post("/api/train")
-async def train_model(file: UploadFile = File(...)):
+TRAIN_STAGES = ["parsing", "training", "saving"]
+UPDATE_STAGES = ["parsing", "updating", "saving"]
+DETECT_STAGES = ["parsing", "scoring", "explaining"]
+ANALYZE_STAGES = ["parsing", "scoring", "explaining", "summarizing"]
+
+# Transactions returned in the /api/analyze response itself, by default
+INLINE_TRANSACTIONS = 1000
+
+# Shapes of the transactions in /api/analyze and /api/results responses:
+# one object per row, or one array per field
+LAYOUTS = ("rows", "columns")
+
+
+async def job_response(job: Job, background: bool):
     """
-    Train the fraud detection model on uploaded data
+    Return a 202 with the job's status URL, or wait for the job to finish
+
+    Waiting happens on the job's future, so the event loop keeps serving other
+    requests (health checks, /api/score, job polling) while the work runs.
     """
-    global fraud_detector, fraud_explainer, training_data
+    if background:
+        return JSONResponse(status_code=202, content={
+            "status": "accepted",
+            "job_id": job.id,
+            "status_url": f"/api/jobs/{job.id}"
+        })
+    return await asyncio.wrap_future(job.future)
 
-    with model_lock:
-        try:
-            print(f"\n{'='*60}")
-            print(f"🎓 Training Request Received")
-            print(f"{'='*60}")
-            print(f"📁 File: {file.filename}")
 
-            # Read uploaded CSV
-            contents = await file.read()
-            df = pd.read_csv(io.BytesIO(contents))
-            print(f"✅ Loaded {len(df)} transactions")
+async def encoded_response(request: Request, payload):
+    """
+    Large JSON ``payload`` encoded and compressed off the event loop (see
+    utils.responses); responses such as a job's 202 pass through
+    """
+    if isinstance(payload, Response):
+        return payload
+    return await asyncio.to_thread(json_response, payload, request.headers.get("accept-encoding", ""))
+
+
+# Upload endpoints parse the request body themselves (see utils.uploads), so
+# the multipart body is declared for the API docs here
+UPLOAD_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {"multipart/form-data": {"schema": {
+            "type": "object",
+            "required": ["file"],
+            "properties": {"file": {
+                "type": "string",
+                "format": "binary",
+                "description": "Transactions as CSV (may be gzip or zstd compressed), Parquet or Arrow IPC"
+            }}
+        }}}
+    }
+}
 
-            # Validate required columns
-            required_columns = ['step', 'type', 'amount', 'nameOrig', 'oldbalanceOrg',
-                               'newbalanceOrig', 'nameDest', 'oldbalanceDest',
-                               'newbalanceDest']
 
-            missing_columns = [col for col in required_columns if col not in df.columns]
-            if missing_columns:
-                print(f"❌ Missing columns: {missing_columns}")
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Missing required columns: {missing_columns}"
-                )
+async def submit_upload_job(request: Request, kind: str, stages: List[str], work) -> Job:
+    """
+    Start ``work(job, upload)`` and stream the request's file into it
+
+    The job parses the file while it is still arriving; this returns once
+    the whole body has been received.
+    """
+    try:
+        upload = UploadStream(multipart_boundary(request.headers.get("content-type")),
+                              max_buffered=UPLOAD_BUFFER_BYTES)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    job = job_manager.submit(kind, stages, lambda job: work(job, upload))
+    try:
+        await upload.receive(request.stream())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return job
 
-            # Store training data
+
+def parse_upload(upload: UploadStream) -> pd.DataFrame:
+    """Transactions from an upload, typed by the ingestion schema (runs in a job worker)"""
+    try:
+        return read_upload(upload)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def run_training(job: Job, upload: UploadStream) -> Dict:
+    """Train a new model from an uploaded CSV (runs in a job worker)"""
+    global training_data
+
+    try:
+        print(f"\n{'='*60}")
+        print(f"🎓 Training Request Received")
+        print(f"{'='*60}")
+
+        # Read uploaded CSV
+        job.start_stage("parsing")
+        df = parse_upload(upload)
+        print(f"📁 File: {upload.filename}")
+        print(f"✅ Loaded {len(df)} transactions")
+
+        # Account IDs become int32 codes for the rest of the pipeline
+        encode_accounts(df)
+
+        # Initialize and train a new model off to the side; requests keep
+        # scoring with the current snapshot until it is published
+        job.start_stage("training")
+        print("🤖 Initializing fraud detector...")
+        detector = HybridFraudDetector(rule_engine)
+        print("🔧 Training model (this may take a moment)...")
+        detector.train(df)
+
+        # The explainer's attribution baseline was computed during training;
+        # the training data is replaced together with the model
+        with model_registry.lock:
+            snapshot = model_registry.publish(detector, detector.explainer)
             training_data = df.copy()
+        print(f"🚀 Published model version {snapshot.version}")
 
-            # Initialize and train model
-            print("🤖 Initializing fraud detector...")
-            fraud_detector = HybridFraudDetector()
-            print("🔧 Training model (this may take a moment)...")
-            fraud_detector.train(df)
-
-            # Initialize explainer
-            _, X = fraud_detector.prepare_features(df)
-            print("🔍 Initializing explainer...")
-            fraud_explainer = FraudExplainer(
-                fraud_detector.isolation_forest,
-                fraud_detector.feature_columns
-            )
+        job.start_stage("saving")
+        if AUTO_SAVE_MODEL:
+            try:
+                save_model_artifact(detector)
+                print(f"💾 Model saved to {MODEL_ARTIFACT_DIR}")
+            except Exception as e:
+                print(f"⚠️  Failed to save model: {str(e)}")
 
-            print(f"\n✅ Training Complete!")
-            print(f"  Training Samples: {len(df)}")
-            print(f"  Features Used: {len(fraud_detector.feature_columns)}")
-            print(f"{'='*60}\n")
+        print(f"\n✅ Training Complete!")
+        print(f"  Training Samples: {len(df)}")
+        print(f"  Features Used: {len(detector.feature_columns)}")
+        print(f"{'='*60}\n")
 
-            return {
-                "status": "success",
-                "message": "Model trained successfully",
-                "training_samples": len(df),
-                "features_used": len(fraud_detector.feature_columns)
-            }
+        return {
+            "status": "success",
+            "message": "Model trained successfully",
+            "training_samples": len(df),
+            "features_used": len(detector.feature_columns),
+            "model_version": snapshot.version
+        }
 
-        except HTTPException:
-            raise
-        except Exception as e:
-            print(f"❌ Training failed: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            raise HTTPException(status_code=500, detail=f"Training failed: {str(e)}")
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"❌ Training failed: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Training failed: {str(e)}")
 
 
-@app.post("/api/detect")
-async def detect_fraud(file: UploadFile = File(...)):
+@app.post("/api/train", openapi_extra=UPLOAD_BODY)
+async def train_model(request: Request, background: bool = False):
     """
-    Detect fraud in uploaded transaction data
+    Train the fraud detection model on uploaded data
+
+    The file (CSV, optionally gzip/zstd compressed, Parquet or Arrow IPC) is
+    parsed while it uploads.
+    With ``background=true`` the response is a 202 carrying a job ID to poll
+    at /api/jobs/{job_id}; otherwise the request waits for the result.
     """
-    global fraud_detector, fraud_explainer
+    job = await submit_upload_job(request, "train", TRAIN_STAGES, run_training)
+    return await job_response(job, background)
 
-    if fraud_detector is None:
-        raise HTTPException(
-            status_code=400,
-            detail="Model not trained. Please train the model first using /api/train endpoint"
-        )
 
-    with model_lock:
-        try:
-            # Read uploaded CSV
-            contents = await file.read()
-            df = pd.read_csv(io.BytesIO(contents))
+def run_detection(job: Job, upload: UploadStream, detector: HybridFraudDetector,
+                  cascade: bool = False) -> Dict:
+    """Score an uploaded file and register its results for download (runs in a job worker)"""
+    try:
+        # Read uploaded CSV
+        job.start_stage("parsing")
+        df = parse_upload(upload)
 
-            # Validate columns
-            required_columns = ['step', 'type', 'amount', 'nameOrig', 'oldbalanceOrg',
-                               'newbalanceOrig', 'nameDest', 'oldbalanceDest',
-                               'newbalanceDest']
+        # IDs the model has not seen are coded for this request only
+        accounts = ACCOUNTS.overlay()
+        encode_accounts(df, accounts)
 
-            missing_columns = [col for col in required_columns if col not in df.columns]
-            if missing_columns:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Missing required columns: {missing_columns}"
-                )
+        # Run fraud detection
+        job.start_stage("scoring")
+        results_df = detector.predict(df, cascade=cascade, workers=PREDICT_WORKERS)
 
-            # Run fraud detection
-            results_df = fraud_detector.predict(df)
-
-            # Add transaction IDs if not present
-            if 'transaction_id' not in results_df.columns:
-                results_df['transaction_id'] = range(1, len(results_df) + 1)
-
-            # Generate explanations for suspicious transactions
-            suspicious_mask = results_df['is_suspicious'] == 1
-            results_df['explanation'] = ''
-
-            for idx in results_df[suspicious_mask].index:
-                row = results_df.loc[idx]
-                explanation = fraud_detector.explain_transaction(row)
-                results_df.at[idx, 'explanation'] = explanation
-
-            # Add risk levels
-            results_df['risk_level'] = results_df['fraud_score'].apply(get_risk_level)
-
-            # Save results (cross-platform compatible)
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            output_dir = os.path.join(tempfile.gettempdir(), "fraudshield_results")
-            os.makedirs(output_dir, exist_ok=True)
-
-            # Save CSV
-            csv_path = f"{output_dir}/fraud_results_{timestamp}.csv"
-            results_df.to_csv(csv_path, index=False)
-
-            # Save Excel
-            xlsx_path = f"{output_dir}/fraud_results_{timestamp}.xlsx"
-            results_df.to_excel(xlsx_path, index=False, engine='openpyxl')
-
-            # Generate summary statistics
-            summary = {
-                "total_transactions": len(results_df),
-                "suspicious_count": int(results_df['is_suspicious'].sum()),
-                "suspicious_percentage": float(results_df['is_suspicious'].mean() * 100),
-                "average_fraud_score": float(results_df['fraud_score'].mean()),
-                "high_risk_count": int((results_df['fraud_score'] > 0.8).sum()),
-                "medium_risk_count": int(((results_df['fraud_score'] > 0.6) &
-                                         (results_df['fraud_score'] <= 0.8)).sum()),
-                "total_suspicious_amount": float(results_df[results_df['is_suspicious']==1]['amount'].sum()),
-                "csv_file": csv_path,
-                "xlsx_file": xlsx_path
-            }
+        # Add transaction IDs if not present
+        if 'transaction_id' not in results_df.columns:
+            results_df['transaction_id'] = range(1, len(results_df) + 1)
 
-            return {
-                "status": "success",
-                "summary": summary,
-                "download_links": {
-                    "csv": f"/api/download/{os.path.basename(csv_path)}",
-                    "xlsx": f"/api/download/{os.path.basename(xlsx_path)}"
-                }
+        # Generate explanations for suspicious transactions
+        job.start_stage("explaining")
+        suspicious_rows = np.flatnonzero(results_df['is_suspicious'].to_numpy() == 1)
+        explanations = np.full(len(results_df), '', dtype=object)
+        explanations[suspicious_rows] = detector.explain_transactions(results_df, suspicious_rows)
+        results_df['explanation'] = explanations
+
+        # Add risk levels
+        results_df['risk_level'] = get_risk_levels(results_df['fraud_score'].to_numpy())
+
+        # Export files are written when first downloaded
+        export_files = export_store.register(
+            results_df, prepare=functools.partial(decode_accounts, accounts=accounts))
+
+        # Generate summary statistics
+        summary = {
+            "total_transactions": len(results_df),
+            "suspicious_count": int(results_df['is_suspicious'].sum()),
+            "suspicious_percentage": float(results_df['is_suspicious'].mean() * 100),
+            "average_fraud_score": float(results_df['fraud_score'].mean()),
+            "high_risk_count": int((results_df['fraud_score'] > 0.8).sum()),
+            "medium_risk_count": int(((results_df['fraud_score'] > 0.6) &
+                                     (results_df['fraud_score'] <= 0.8)).sum()),
+            "total_suspicious_amount": float(results_df[results_df['is_suspicious']==1]['amount'].sum())
+        }
+        if cascade:
+            summary["cascade"] = results_df.attrs["cascade"]
+
+        return {
+            "status": "success",
+            "summary": summary,
+            "download_links": {
+                fmt: f"/api/download/{filename}" for fmt, filename in export_files.items()
             }
+        }
 
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Detection failed: {str(e)}")
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Detection failed: {str(e)}")
 
 
-@app.post("/api/analyze")
-async def analyze_transactions(file: UploadFile = File(...)):
+@app.post("/api/detect", openapi_extra=UPLOAD_BODY)
+async def detect_fraud(request: Request, background: bool = False,
+                       cascade: bool = CASCADE_MODE):
     """
-    Comprehensive analysis with detailed results for frontend display
-    """
-    global fraud_detector
-
-    print(f"\n{'='*60}")
-    print(f"📊 Analysis Request Received")
-    print(f"{'='*60}")
+    Detect fraud in uploaded transaction data
 
-    if fraud_detector is None:
-        print("❌ ERROR: Model not trained!")
+    Accepts the same formats as /api/train; results can be downloaded as
+    CSV, XLSX, Parquet and Arrow IPC. Supports ``background=true`` like
+    /api/train. With ``cascade=true`` rows that cannot reach the suspicious
+    threshold skip the ML models.
+    """
+    snapshot = model_registry.current
+    if snapshot is None:
         raise HTTPException(
             status_code=400,
-            detail="Model not trained. Please train the model first using the /api/train endpoint."
+            detail="Model not trained. Please train the model first using /api/train endpoint"
         )
 
+    job = await submit_upload_job(
+        request, "detect", DETECT_STAGES,
+        lambda job, upload: run_detection(job, upload, snapshot.detector, cascade)
+    )
+    return await job_response(job, background)
+
+
+def run_analysis(job: Job, upload: UploadStream, detector: HybridFraudDetector,
+                 cascade: bool = False, layout: str = "rows",
+                 limit: int = INLINE_TRANSACTIONS) -> Dict:
+    """Score an uploaded CSV and build the dashboard payload (runs in a job worker)"""
     try:
-        print(f"📁 Reading file: {file.filename}")
-        contents = await file.read()
-        df = pd.read_csv(io.BytesIO(contents))
+        job.start_stage("parsing")
+        df = parse_upload(upload)
+        print(f"📁 File: {upload.filename}")
         print(f"✅ File loaded: {len(df)} transactions")
 
-        # Validate required columns
-        required_columns = ['step', 'type', 'amount', 'nameOrig', 'oldbalanceOrg',
-                           'newbalanceOrig', 'nameDest', 'oldbalanceDest',
-                           'newbalanceDest']
-        missing_columns = [col for col in required_columns if col not in df.columns]
-        if missing_columns:
-            print(f"❌ Missing columns: {missing_columns}")
-            raise HTTPException(
-                status_code=400,
-                detail=f"Missing required columns: {missing_columns}"
-            )
+        # IDs the model has not seen are coded for this request only
+        accounts = ACCOUNTS.overlay()
+        encode_accounts(df, accounts)
 
         # Run detection
+        job.start_stage("scoring")
         print("🔍 Running fraud detection...")
-        results_df = fraud_detector.predict(df)
+        results_df = detector.predict(df, cascade=cascade, workers=PREDICT_WORKERS)
         print(f"✅ Detection complete")
 
         # Add transaction IDs
@@ -360,36 +597,37 @@ async def analyze_transactions(file: UploadFile = File(...)):
             results_df['transaction_id'] = range(1, len(results_df) + 1)
 
         # Risk levels (for all transactions - needed for summary stats)
-        results_df['risk_level'] = results_df['fraud_score'].apply(get_risk_level)
-
-        # Limit to first 1000 transactions for performance
-        results_df_limited = results_df.head(1000).copy()
+        results_df['risk_level'] = get_risk_levels(results_df['fraud_score'].to_numpy())
 
-        # Generate explanations (only for limited set)
+        # Explanations for every suspicious transaction; all rows are stored
+        job.start_stage("explaining")
         print("📝 Generating explanations for suspicious transactions...")
-        results_df_limited['explanation'] = results_df_limited.apply(
-            lambda row: fraud_detector.explain_transaction(row) if row['is_suspicious'] == 1 else "",
-            axis=1
-        )
+        suspicious_rows = np.flatnonzero(results_df['is_suspicious'].to_numpy() == 1)
+        explanations = np.full(len(results_df), '', dtype=object)
+        explanations[suspicious_rows] = detector.explain_transactions(results_df, suspicious_rows)
+        results_df['explanation'] = explanations
 
         # Prepare response data
-        print("📦 Preparing response data...")
-        transactions = []
-        for _, row in results_df_limited.iterrows():
-            transactions.append({
-                "transaction_id": int(row['transaction_id']),
-                "step": int(row['step']),
-                "type": row['type'],
-                "amount": float(row['amount']),
-                "nameOrig": row['nameOrig'],
-                "nameDest": row['nameDest'],
-                "fraud_score": float(row['fraud_score']),
-                "ml_score": float(row['ml_score']),
-                "rule_score": float(row['rule_score']),
-                "is_suspicious": bool(row['is_suspicious']),
-                "risk_level": row['risk_level'],
-                "explanation": row['explanation']
-            })
+        job.start_stage("summarizing")
+        print("📦 Storing results...")
+        result_id = result_store.save(decode_accounts(results_df[list(RESULT_COLUMNS)], accounts))
+
+        # The first page is returned inline, with feature attributions for its
+        # suspicious rows; the rest is paged through /api/results/{result_id}
+        shown = min(limit, len(results_df))
+        transactions = result_store.query(result_id, limit=limit,
+                                          columnar=layout == "columns")["transactions"]
+        shown_suspicious = suspicious_rows[suspicious_rows < shown]
+        feature_contributions = [None] * shown
+        if detector.explainer is not None:
+            for position, contributions in zip(shown_suspicious,
+                                               detector.explain(df, rows=shown_suspicious)):
+                feature_contributions[position] = contributions
+        if layout == "columns":
+            transactions["feature_contributions"] = feature_contributions
+        else:
+            for transaction, contributions in zip(transactions, feature_contributions):
+                transaction["feature_contributions"] = contributions
 
         # Summary statistics
         summary = {
@@ -402,6 +640,8 @@ async def analyze_transactions(file: UploadFile = File(...)):
                                      (results_df['fraud_score'] <= 0.8)).sum()),
             "total_suspicious_amount": float(results_df[results_df['is_suspicious']==1]['amount'].sum())
         }
+        if cascade:
+            summary["cascade"] = results_df.attrs["cascade"]
 
         # Distribution data for charts
         # Convert fraud_score to bins and make them JSON-serializable
@@ -425,6 +665,8 @@ async def analyze_transactions(file: UploadFile = File(...)):
         return {
             "status": "success",
             "summary": summary,
+            "result_id": result_id,
+            "results_url": f"/api/results/{result_id}",
             "transactions": transactions,
             "distributions": {
                 "fraud_scores": fraud_score_distribution,
@@ -442,17 +684,453 @@ async def analyze_transactions(file: UploadFile = File(...)):
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
 
 
+@app.post("/api/analyze", openapi_extra=UPLOAD_BODY)
+async def analyze_transactions(request: Request, background: bool = False,
+                               cascade: bool = CASCADE_MODE, layout: str = "rows",
+                               limit: int = INLINE_TRANSACTIONS):
+    """
+    Comprehensive analysis with detailed results for frontend display
+
+    Supports ``background=true`` like /api/train and ``cascade`` like /api/detect.
+    The first ``limit`` transactions are returned inline, as objects or, with
+    ``layout=columns``, as one array per field. The response is gzip/brotli
+    compressed when the client accepts it.
+    """
+    if layout not in LAYOUTS:
+        raise HTTPException(status_code=400, detail=f"layout must be one of {list(LAYOUTS)}")
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_PAGE_SIZE}")
+
+    print(f"\n{'='*60}")
+    print(f"📊 Analysis Request Received")
+    print(f"{'='*60}")
+
+    snapshot = model_registry.current
+    if snapshot is None:
+        print("❌ ERROR: Model not trained!")
+        raise HTTPException(
+            status_code=400,
+            detail="Model not trained. Please train the model first using the /api/train endpoint."
+        )
+
+    job = await submit_upload_job(
+        request, "analyze", ANALYZE_STAGES,
+        lambda job, upload: run_analysis(job, upload, snapshot.detector, cascade, layout, limit)
+    )
+    return await encoded_response(request, await job_response(job, background))
+
+
+@app.get("/api/results/{result_id}")
+async def get_results(request: Request, result_id: str, offset: int = 0, limit: int = 100,
+                      sort: Optional[str] = None, order: str = "desc", layout: str = "rows",
+                      risk_level: Optional[str] = None,
+                      tx_type: Optional[str] = Query(None, alias="type"),
+                      account: Optional[str] = None, suspicious: Optional[bool] = None):
+    """
+    Page through the transactions of an /api/analyze run
+
+    ``risk_level`` and ``type`` take comma-separated values; ``account``
+    matches the sender or the receiver. With ``sort`` (fraud_score, amount,
+    step or transaction_id) the first ``offset + limit`` rows are selected
+    without sorting the whole run, so ``sort=fraud_score&limit=K`` is a
+    top-K query. ``layout`` and compression work as for /api/analyze.
+    """
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="order must be 'asc' or 'desc'")
+    if layout not in LAYOUTS:
+        raise HTTPException(status_code=400, detail=f"layout must be one of {list(LAYOUTS)}")
+
+    def split(values: Optional[str]) -> List[str]:
+        return [value.strip() for value in values.split(",") if value.strip()] if values else []
+
+    try:
+        page = await asyncio.to_thread(
+            result_store.query, result_id, offset=offset, limit=limit, sort=sort,
+            descending=order == "desc", risk_levels=split(risk_level), types=split(tx_type),
+            account=account, suspicious=suspicious, columnar=layout == "columns"
+        )
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Results not found or expired")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return await encoded_response(request, {"result_id": result_id, "sort": sort, "order": order,
+                                            "layout": layout, **page})
+
+
+@app.get("/api/jobs")
+async def list_jobs():
+    """List recent background jobs, newest first"""
+    return {"jobs": [job.to_dict() for job in reversed(job_manager.list())]}
+
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Status, per-stage progress and result URL of a background job"""
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+
+@app.get("/api/jobs/{job_id}/result")
+async def get_job_result(request: Request, job_id: str):
+    """Result of a finished job (the same body the synchronous call returns)"""
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.status == "failed":
+        raise HTTPException(status_code=job.error_status_code or 500, detail=job.error)
+    if job.status != "succeeded":
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+    return await encoded_response(request, job.result)
+
+
+@app.post("/api/score")
+async def score_transactions(request: ScoreRequest):
+    """
+    Score a handful of transactions in real time
+
+    Account behaviour is taken from the profiles captured at training time,
+    so a single transaction gets meaningful per-user statistics.
+    """
+    snapshot = model_registry.current
+    if snapshot is None:
+        raise HTTPException(
+            status_code=400,
+            detail="Model not trained. Please train the model first using /api/train endpoint"
+        )
+    if not request.transactions:
+        raise HTTPException(status_code=400, detail="No transactions provided")
+    if len(request.transactions) > MAX_SCORE_BATCH:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {MAX_SCORE_BATCH} transactions per request; use /api/detect for files"
+        )
+
+    start = time.perf_counter()
+    try:
+        scores = snapshot.detector.score_records([tx.model_dump() for tx in request.transactions])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    latency_ms = (time.perf_counter() - start) * 1000
+
+    results = []
+    for i, tx in enumerate(request.transactions):
+        fraud_score = float(scores['fraud_score'][i])
+        results.append({
+            "nameOrig": tx.nameOrig,
+            "nameDest": tx.nameDest,
+            "fraud_score": fraud_score,
+            "ml_score": float(scores['ml_score'][i]),
+            "rule_score": float(scores['rule_score'][i]),
+            "is_suspicious": bool(scores['is_suspicious'][i]),
+            "risk_level": get_risk_level(fraud_score)
+        })
+
+    return {
+        "status": "success",
+        "results": results,
+        "latency_ms": latency_ms,
+        "model_version": snapshot.version
+    }
+
+
+@app.post("/api/explain")
+async def explain_transactions(request: ExplainRequest):
+    """
+    Explain the IsolationForest score of transactions feature by feature
+
+    Transactions are scored like /api/score; each result carries its
+    ``max_features`` largest attributions. A contribution is in tree levels:
+    positive values shortened the isolation path (more anomalous) compared
+    with the training data.
+    """
+    snapshot = model_registry.current
+    if snapshot is None:
+        raise HTTPException(
+            status_code=400,
+            detail="Model not trained. Please train the model first using /api/train endpoint"
+        )
+    if not request.transactions:
+        raise HTTPException(status_code=400, detail="No transactions provided")
+    if len(request.transactions) > MAX_EXPLAIN_BATCH:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {MAX_EXPLAIN_BATCH} transactions per request; use /api/analyze for files"
+        )
+    if not 1 <= request.max_features <= len(snapshot.detector.feature_columns):
+        raise HTTPException(
+            status_code=400,
+            detail=f"max_features must be between 1 and {len(snapshot.detector.feature_columns)}"
+        )
+
+    start = time.perf_counter()
+    try:
+        scores = snapshot.detector.score_records(
+            [tx.model_dump() for tx in request.transactions],
+            max_features=request.max_features
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    latency_ms = (time.perf_counter() - start) * 1000
+
+    results = []
+    for i, tx in enumerate(request.transactions):
+        fraud_score = float(scores['fraud_score'][i])
+        results.append({
+            "nameOrig": tx.nameOrig,
+            "nameDest": tx.nameDest,
+            "fraud_score": fraud_score,
+            "ml_isolation_forest_score": float(scores['ml_isolation_forest_score'][i]),
+            "is_suspicious": bool(scores['is_suspicious'][i]),
+            "risk_level": get_risk_level(fraud_score),
+            "feature_contributions": scores['feature_contributions'][i]
+        })
+
+    return {
+        "status": "success",
+        "results": results,
+        "latency_ms": latency_ms,
+        "model_version": snapshot.version,
+        "attribution_cache": ATTRIBUTION_CACHE.stats()
+    }
+
+
+@app.post("/api/model/save")
+async def save_model():
+    """Persist the current model so it survives restarts"""
+    snapshot = model_registry.current
+    if snapshot is None:
+        raise HTTPException(status_code=400, detail="Model not trained")
+
+    # Writing the arrays (and waiting for a concurrent save) stays off the event loop
+    try:
+        manifest = await asyncio.to_thread(save_model_artifact, snapshot.detector)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Saving model failed: {str(e)}")
+
+    return {
+        "status": "success",
+        "path": MODEL_ARTIFACT_DIR,
+        "format_version": manifest["format_version"],
+        "created_at": manifest["created_at"]
+    }
+
+
+@app.post("/api/model/load")
+async def load_model():
+    """Replace the current model with the last saved artifact"""
+    if await asyncio.to_thread(read_manifest, MODEL_ARTIFACT_DIR) is None:
+        raise HTTPException(status_code=404, detail="No saved model found")
+
+    try:
+        start = time.perf_counter()
+        detector = await asyncio.to_thread(load_model_artifact)
+        load_ms = (time.perf_counter() - start) * 1000
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Loading model failed: {str(e)}")
+
+    return {
+        "status": "success",
+        "path": MODEL_ARTIFACT_DIR,
+        "features_used": len(detector.feature_columns),
+        "load_time_ms": load_ms
+    }
+
+
+def append_history(history: pd.DataFrame, rows: pd.DataFrame) -> pd.DataFrame:
+    """``history`` followed by ``rows``, keeping the last TRAINING_DATA_MAX_ROWS rows"""
+    rows = rows.iloc[-TRAINING_DATA_MAX_ROWS:]
+    keep = TRAINING_DATA_MAX_ROWS - len(rows)
+    return pd.concat([history.iloc[max(len(history) - keep, 0):], rows], ignore_index=True)
+
+
+def run_update(job: Job, upload: UploadStream, snapshot: ModelSnapshot,
+               refresh_fraction: float) -> Dict:
+    """
+    Fold new transactions into the model and publish it (runs in a job worker)
+
+    The update is published only over the snapshot it was built from. If a
+    training run or another update was published meanwhile, the rows are
+    folded into that newer model instead (up to UPDATE_ATTEMPTS times), so
+    neither result is lost.
+    """
+    global training_data
+
+    try:
+        job.start_stage("parsing")
+        df = parse_upload(upload)
+
+        encode_accounts(df)
+
+        job.start_stage("updating")
+        start = time.perf_counter()
+        for _ in range(UPDATE_ATTEMPTS):
+            detector = snapshot.detector
+            try:
+                updated = detector.update(df, refresh_fraction=refresh_fraction)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+
+            try:
+                published = model_registry.publish(updated, updated.explainer,
+                                                   expected_version=snapshot.version)
+            except StaleSnapshotError:
+                snapshot = model_registry.current
+                print(f"🔁 Model changed during the update; retrying on version {snapshot.version}")
+                continue
+            break
+        else:
+            raise HTTPException(
+                status_code=409,
+                detail="The model kept changing during the update; retry later"
+            )
+
+        # Outside the registry lock: publishing never waits for this copy
+        with history_lock:
+            if training_data is not None:
+                training_data = append_history(training_data, df)
+        update_ms = (time.perf_counter() - start) * 1000
+
+        job.start_stage("saving")
+        if AUTO_SAVE_MODEL:
+            try:
+                save_model_artifact(updated)
+                print(f"💾 Model saved to {MODEL_ARTIFACT_DIR}")
+            except Exception as e:
+                print(f"⚠️  Failed to save model: {str(e)}")
+
+        return {
+            "status": "success",
+            "message": "Model updated incrementally",
+            "new_samples": len(df),
+            "trees_replaced": max(1, int(round(refresh_fraction * detector.flat_forest.n_estimators))),
+            "accounts": len(updated.profiles),
+            "update_time_ms": update_ms,
+            "model_version": published.version
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"❌ Update failed: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Update failed: {str(e)}")
+
+
+@app.post("/api/model/update", openapi_extra=UPLOAD_BODY)
+async def update_model(request: Request, refresh_fraction: float = 0.2,
+                       background: bool = False):
+    """
+    Incrementally refresh the current model with a window of new transactions
+
+    Cheaper than /api/train on the full history: account profiles and scaler
+    statistics absorb the new rows and ``refresh_fraction`` of the
+    IsolationForest trees are regrown on them. Supports ``background=true``.
+    """
+    snapshot = model_registry.current
+    if snapshot is None:
+        raise HTTPException(
+            status_code=400,
+            detail="Model not trained. Please train the model first using /api/train endpoint"
+        )
+    if not 0 < refresh_fraction <= 1:
+        raise HTTPException(status_code=400, detail="refresh_fraction must be in (0, 1]")
+
+    job = await submit_upload_job(
+        request, "update", UPDATE_STAGES,
+        lambda job, upload: run_update(job, upload, snapshot, refresh_fraction)
+    )
+    return await job_response(job, background)
+
+
+@app.get("/api/model/info")
+async def model_info():
+    """Describe the saved model artifact, if any"""
+    manifest = read_manifest(MODEL_ARTIFACT_DIR)
+    snapshot = model_registry.current
+    explainer = snapshot.explainer if snapshot else None
+    return {
+        "model_loaded": snapshot is not None,
+        "model_version": snapshot.version if snapshot else None,
+        "published_at": snapshot.published_at if snapshot else None,
+        "artifact_path": MODEL_ARTIFACT_DIR,
+        "artifact_saved": manifest is not None,
+        "format_version": manifest["format_version"] if manifest else None,
+        "created_at": manifest["created_at"] if manifest else None,
+        "has_autoencoder": bool(manifest and "autoencoder" in manifest),
+        "explainer": {
+            "version": explainer.version,
+            "background_rows": explainer.background_rows,
+            "background_clusters": len(explainer.background) if explainer.background is not None else 0,
+            "attribution_cache": ATTRIBUTION_CACHE.stats()
+        } if explainer is not None else None
+    }
+
+
+@app.get("/api/rules")
+async def get_rules():
+    """Active rule definitions with per-rule evaluation time and hit rate"""
+    return {"path": RULES_PATH, **rule_engine.rules.to_dict()}
+
+
+@app.post("/api/rules/reload")
+async def reload_rules():
+    """
+    Recompile the rules file and make it active without a restart
+
+    Requests already scoring finish with the previous rules. The new rules
+    are dry-run on a synthetic batch before they are swapped in; an invalid
+    file, or a rule that fails on arrays, is rejected and the current rules
+    stay in place.
+    """
+    if not os.path.exists(RULES_PATH):
+        raise HTTPException(status_code=404, detail=f"No rules file at {RULES_PATH}")
+
+    try:
+        rules = await asyncio.to_thread(rule_engine.load_rules, RULES_PATH)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid rules: {str(e)}")
+
+    return {
+        "status": "success",
+        "path": RULES_PATH,
+        "rules": rules.names,
+        "loaded_at": rules.loaded_at
+    }
+
+
 @app.get("/api/download/{filename}")
 async def download_file(filename: str):
-    """Download generated result files"""
-    output_dir = os.path.join(tempfile.gettempdir(), "fraudshield_results")
-    file_path = os.path.join(output_dir, filename)
+    """
+    Download a /api/detect result file
 
-    if not os.path.exists(file_path):
+    The file is generated on its first download, off the event loop, and
+    cached until the results expire. A CSV is streamed while it is generated.
+    """
+    try:
+        path = export_store.cached(filename)
+    except ValueError:
         raise HTTPException(status_code=404, detail="File not found")
 
+    try:
+        if path is None and filename.endswith(".csv"):
+            return StreamingResponse(
+                export_store.stream_csv(filename),
+                media_type="text/csv",
+                headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+            )
+        if path is None:
+            path = await asyncio.to_thread(export_store.export, filename)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Results expired; run detection again")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Export failed: {str(e)}")
+
     return FileResponse(
-        path=file_path,
+        path=path,
         filename=filename,
         media_type='application/octet-stream'
     )
@@ -464,14 +1142,15 @@ async def get_statistics():
     if training_data is None:
         raise HTTPException(status_code=400, detail="No data available")
 
+    snapshot = model_registry.current
     return {
         "training_samples": len(training_data),
-        "model_features": len(fraud_detector.feature_columns) if fraud_detector else 0,
-        "model_status": "trained" if fraud_detector else "not_trained"
+        "model_features": len(snapshot.detector.feature_columns) if snapshot else 0,
+        "model_status": "trained" if snapshot else "not_trained"
     }
 
 
-def generate_person_details(account_id: str, df: pd.DataFrame) -> Dict:
+def generate_person_details(account_id: str, total_volume: float) -> Dict:
     """
     Generate mock person details for an account ID
     In a real system, this would query a customer database
@@ -521,8 +1200,6 @@ def generate_person_details(account_id: str, df: pd.DataFrame) -> Dict:
         photo_url = f"https://i.pravatar.cc/300?img={photo_seed % 70}"
 
     # KYC verified based on transaction volume
-    account_txs = df[(df['nameOrig'] == account_id) | (df['nameDest'] == account_id)]
-    total_volume = account_txs['amount'].sum() if len(account_txs) > 0 else 0
     kyc_verified = total_volume > 50000
 
     # Registration date (mock)
@@ -610,6 +1287,28 @@ def calculate_edge_score(row: pd.Series) -> Tuple[float, List[str]]:
     return float(edge_score), reasons
 
 
+class AccountIndex:
+    """
+    Rows of a transaction frame grouped by account code
+
+    One stable argsort of the code column replaces a full ``==`` scan per
+    lookup: an account's rows are a contiguous range found by binary search,
+    in their original order.
+    """
+
+    def __init__(self, codes: np.ndarray):
+        self.order = np.argsort(codes, kind='stable')
+        self.sorted_codes = codes[self.order]
+
+    def rows(self, code: int) -> np.ndarray:
+        lo, hi = np.searchsorted(self.sorted_codes, [code, code + 1])
+        return self.order[lo:hi]
+
+
+def account_label(account_id: str) -> str:
+    return account_id[:10] + '...' if len(account_id) > 10 else account_id
+
+
 def build_ego_tree(client_id: str, df: pd.DataFrame, depth: int = 2,
                    min_fraud_score: float = 0.0, limit: int = 100) -> Dict:
     """
@@ -617,7 +1316,8 @@ def build_ego_tree(client_id: str, df: pd.DataFrame, depth: int = 2,
 
     Args:
         client_id: The account ID to center the graph on
-        df: DataFrame with transaction data (must have fraud scores)
+        df: DataFrame with transaction data (must have fraud scores and
+            account columns encoded with ``encode_accounts``)
         depth: Maximum depth to traverse (1-3)
         min_fraud_score: Minimum fraud score to include edge
         limit: Maximum number of nodes to include
@@ -625,23 +1325,27 @@ def build_ego_tree(client_id: str, df: pd.DataFrame, depth: int = 2,
     Returns:
         Dictionary with nodes, edges, and summary statistics
     """
+    df = df.reset_index(drop=True)
+    by_orig = AccountIndex(df['nameOrig'].to_numpy())
+    by_dest = AccountIndex(df['nameDest'].to_numpy())
+
     # Validate client exists
-    if client_id not in df['nameOrig'].values and client_id not in df['nameDest'].values:
+    client_code = ACCOUNTS.lookup(client_id)
+    if client_code is None or (len(by_orig.rows(client_code)) == 0 and
+                               len(by_dest.rows(client_code)) == 0):
         raise ValueError(f"Client ID '{client_id}' not found in transaction data")
 
-    # Data structures
-    nodes_dict: Dict[str, Dict] = {}
+    # Data structures (keyed by account code; IDs are decoded for the response)
+    nodes_dict: Dict[int, Dict] = {}
     edges_list: List[Dict] = []
-    visited: Set[str] = set()
+    visited: Set[int] = set()
 
-    # BFS queue: (account_id, current_depth)
-    queue: deque = deque([(client_id, 0)])
-    visited.add(client_id)
+    # BFS queue: (account code, current_depth)
+    queue: deque = deque([(client_code, 0)])
+    visited.add(client_code)
 
     # Initialize ego node
-    nodes_dict[client_id] = {
-        'id': client_id,
-        'label': client_id[:10] + '...' if len(client_id) > 10 else client_id,
+    nodes_dict[client_code] = {
         'depth': 0,
         'is_ego': True,
         'transaction_count': 0,
@@ -658,7 +1362,7 @@ def build_ego_tree(client_id: str, df: pd.DataFrame, depth: int = 2,
             continue
 
         # Find all outgoing transactions (current_id as origin)
-        outgoing = df[df['nameOrig'] == current_id].copy()
+        outgoing = df.iloc[by_orig.rows(current_id)]
 
         for _, tx in outgoing.iterrows():
             # Calculate edge score
@@ -668,7 +1372,7 @@ def build_ego_tree(client_id: str, df: pd.DataFrame, depth: int = 2,
             if edge_score < min_fraud_score:
                 continue
 
-            target_id = tx['nameDest']
+            target_id = int(tx['nameDest'])
 
             # Update source node stats
             nodes_dict[current_id]['transaction_count'] += 1
@@ -678,8 +1382,6 @@ def build_ego_tree(client_id: str, df: pd.DataFrame, depth: int = 2,
             # Initialize target node if new
             if target_id not in nodes_dict:
                 nodes_dict[target_id] = {
-                    'id': target_id,
-                    'label': target_id[:10] + '...' if len(target_id) > 10 else target_id,
                     'depth': current_depth + 1,
                     'is_ego': False,
                     'transaction_count': 0,
@@ -705,7 +1407,7 @@ def build_ego_tree(client_id: str, df: pd.DataFrame, depth: int = 2,
                 'step': int(tx['step']),
                 'is_fraud': int(tx.get('isFraud', 0)),
                 'reasons': reasons,
-                'is_outgoing_from_ego': (current_id == client_id)
+                'is_outgoing_from_ego': (current_id == client_code)
             })
 
             # Add to queue for BFS
@@ -714,7 +1416,7 @@ def build_ego_tree(client_id: str, df: pd.DataFrame, depth: int = 2,
                 queue.append((target_id, current_depth + 1))
 
         # Also find incoming transactions (current_id as destination)
-        incoming = df[df['nameDest'] == current_id].copy()
+        incoming = df.iloc[by_dest.rows(current_id)]
 
         for _, tx in incoming.iterrows():
             edge_score, reasons = calculate_edge_score(tx)
@@ -722,7 +1424,7 @@ def build_ego_tree(client_id: str, df: pd.DataFrame, depth: int = 2,
             if edge_score < min_fraud_score:
                 continue
 
-            source_id = tx['nameOrig']
+            source_id = int(tx['nameOrig'])
 
             # Update destination node stats
             nodes_dict[current_id]['transaction_count'] += 1
@@ -732,8 +1434,6 @@ def build_ego_tree(client_id: str, df: pd.DataFrame, depth: int = 2,
             # Initialize source node if new
             if source_id not in nodes_dict:
                 nodes_dict[source_id] = {
-                    'id': source_id,
-                    'label': source_id[:10] + '...' if len(source_id) > 10 else source_id,
                     'depth': current_depth + 1,
                     'is_ego': False,
                     'transaction_count': 0,
@@ -767,18 +1467,25 @@ def build_ego_tree(client_id: str, df: pd.DataFrame, depth: int = 2,
                 visited.add(source_id)
                 queue.append((source_id, current_depth + 1))
 
+    # Decode account IDs once for every node in the graph
+    codes = np.fromiter(nodes_dict.keys(), dtype=np.int64, count=len(nodes_dict))
+    account_ids = dict(zip(nodes_dict.keys(), ACCOUNTS.decode(codes)))
+    amounts = df['amount'].to_numpy()
+
     # Calculate node risk scores (aggregate of edge scores)
     nodes_list = []
-    for node_data in nodes_dict.values():
+    for code, node_data in nodes_dict.items():
         all_scores = node_data['outgoing_scores'] + node_data['incoming_scores']
         node_risk_score = np.mean(all_scores) if all_scores else 0.0
 
         # Generate person details for each node
-        person_details = generate_person_details(node_data['id'], df)
+        account_rows = np.union1d(by_orig.rows(code), by_dest.rows(code))
+        person_details = generate_person_details(account_ids[code],
+                                                 float(amounts[account_rows].sum()))
 
         nodes_list.append({
-            'id': node_data['id'],
-            'label': node_data['label'],
+            'id': account_ids[code],
+            'label': account_label(account_ids[code]),
             'risk_score': float(node_risk_score),
             'risk_level': get_risk_level(node_risk_score),
             'transaction_count': node_data['transaction_count'],
@@ -789,6 +1496,10 @@ def build_ego_tree(client_id: str, df: pd.DataFrame, depth: int = 2,
             'person_details': person_details
         })
 
+    for edge in edges_list:
+        edge['source'] = account_ids[edge['source']]
+        edge['target'] = account_ids[edge['target']]
+
     # Calculate summary statistics
     edge_scores = [e['edge_score'] for e in edges_list]
     node_risk_scores = [n['risk_score'] for n in nodes_list]
@@ -812,6 +1523,46 @@ def build_ego_tree(client_id: str, df: pd.DataFrame, depth: int = 2,
     }
 
 
+def load_default_training_data(path: str) -> pd.DataFrame:
+    """Use the sample dataset as training data unless a training run published some"""
+    global training_data
+    with open(path, 'rb') as f:
+        default_data = encode_accounts(read_transactions(f))
+    with model_registry.lock:
+        if training_data is None:
+            training_data = default_data
+        return training_data
+
+
+def scored_history(snapshot: Optional[ModelSnapshot], history: pd.DataFrame) -> pd.DataFrame:
+    """
+    ``history`` with a ``fraud_score`` column, scored once per model version
+
+    The result is reused until a model is published or ``training_data`` is
+    replaced; without a model, ``isFraud`` (or 0.5) stands in for the score.
+    """
+    global scored_history_cache
+    version = snapshot.version if snapshot is not None else None
+    # Held while scoring, so concurrent graph requests score the history once
+    with scored_history_lock:
+        cached = scored_history_cache
+        if cached is not None and cached[0] == version and cached[1] is history:
+            return cached[2]
+
+        if 'fraud_score' in history.columns:
+            df = history
+        elif snapshot is not None:
+            print("🔍 Running fraud detection on training data...")
+            df = snapshot.detector.predict(history)
+        else:
+            df = history.copy()
+            # If no model trained, use isFraud as fraud_score if available,
+            # else a basic heuristic score
+            df['fraud_score'] = df['isFraud'].astype(float) if 'isFraud' in df.columns else 0.5
+        scored_history_cache = (version, history, df)
+        return df
+
+
 @app.post("/api/graph/ego-tree", response_model=EgoTreeResponse)
 async def get_ego_tree(request: EgoTreeRequest):
     """
@@ -823,7 +1574,7 @@ async def get_ego_tree(request: EgoTreeRequest):
         min_fraud_score: Minimum edge score to include (0-1, default: 0.0)
         limit: Maximum number of nodes (default: 100)
     """
-    global training_data, fraud_detector
+    snapshot = model_registry.current
 
     print(f"\n{'='*60}")
     print(f"📊 Ego-Tree Graph Request")
@@ -840,8 +1591,8 @@ async def get_ego_tree(request: EgoTreeRequest):
         if os.path.exists(default_csv_path):
             print(f"📁 Loading data from {default_csv_path}...")
             try:
-                training_data = pd.read_csv(default_csv_path)
-                print(f"✅ Loaded {len(training_data)} transactions from default dataset")
+                default_data = await asyncio.to_thread(load_default_training_data, default_csv_path)
+                print(f"✅ Loaded {len(default_data)} transactions from default dataset")
             except Exception as e:
                 print(f"❌ Failed to load default data: {str(e)}")
                 raise HTTPException(
@@ -861,23 +1612,13 @@ async def get_ego_tree(request: EgoTreeRequest):
             detail="Depth must be between 1 and 3"
         )
 
-    try:
-        # Run fraud detection if not already done
-        df = training_data.copy()
-
-        if fraud_detector and 'fraud_score' not in df.columns:
-            print("🔍 Running fraud detection on training data...")
-            df = fraud_detector.predict(df)
-        elif 'fraud_score' not in df.columns:
-            # If no model trained, use isFraud as fraud_score if available
-            if 'isFraud' in df.columns:
-                df['fraud_score'] = df['isFraud'].astype(float)
-            else:
-                # Create basic heuristic scores
-                df['fraud_score'] = 0.5
+    history = training_data
 
+    def build() -> Dict:
+        # Scoring and graph traversal are blocking pandas/sklearn work
+        df = scored_history(snapshot, history)
         print(f"🌳 Building ego-tree graph...")
-        graph_data = build_ego_tree(
+        return build_ego_tree(
             client_id=request.client_id,
             df=df,
             depth=request.depth,
@@ -885,6 +1626,9 @@ async def get_ego_tree(request: EgoTreeRequest):
             limit=request.limit
         )
 
+    try:
+        graph_data = await asyncio.to_thread(build)
+
         print(f"✅ Graph built successfully")
         print(f"  Nodes: {graph_data['summary']['total_nodes']}")
         print(f"  Edges: {graph_data['summary']['total_edges']}")
@@ -0,0 +1,311 @@
+"""
+FraudShield AI - Result Exports
+File formats /api/detect results can be downloaded in, written on demand
+
+CSV and XLSX are always available. Parquet and Arrow IPC need pyarrow; they
+keep column types (categorical ``type``, float64 amounts) and load into
+pandas/Arrow/Spark pipelines without text parsing.
+
+Detection only registers its results with an ``ExportStore``, which spills
+them to disk once; a format is written from that copy the first time it is
+downloaded (XLSX alone takes minutes for a million rows) and cached on disk
+until the results expire.
+"""
+
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from functools import lru_cache
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+import pandas as pd
+
+EXPORT_FORMATS = ('csv', 'xlsx', 'parquet', 'arrow')
+
+# Formats that are written with pyarrow
+COLUMNAR_FORMATS = ('parquet', 'arrow')
+
+# Rows formatted per chunk when a CSV is streamed as it is generated
+CSV_CHUNK_ROWS = 20_000
+
+
+@lru_cache(maxsize=1)
+def available_formats() -> Tuple[str, ...]:
+    """Export formats usable in this environment"""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return tuple(fmt for fmt in EXPORT_FORMATS if fmt not in COLUMNAR_FORMATS)
+    return EXPORT_FORMATS
+
+
+def write_export(df: pd.DataFrame, path: str, fmt: str):
+    """
+    Write ``df`` (without its index) to ``path`` in format ``fmt``
+
+    Raises:
+        ValueError: If ``fmt`` is not an available export format
+    """
+    if fmt not in available_formats():
+        raise ValueError(f"Unsupported export format: {fmt}")
+
+    if fmt == 'csv':
+        df.to_csv(path, index=False)
+    elif fmt == 'xlsx':
+        df.to_excel(path, index=False, engine='openpyxl')
+    elif fmt == 'parquet':
+        df.to_parquet(path, index=False, engine='pyarrow')
+    else:
+        import pyarrow as pa
+
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        with pa.OSFile(path, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+
+def _write_spill(df: pd.DataFrame, path: str):
+    if path.endswith('.arrow'):
+        write_export(df, path, 'arrow')
+    else:
+        df.to_pickle(path)
+
+
+def _read_spill(path: str):
+    """The spilled results: a memory-mapped Arrow table, or a DataFrame without pyarrow"""
+    if path.endswith('.arrow'):
+        import pyarrow as pa
+
+        return pa.ipc.open_file(pa.memory_map(path)).read_all()
+    return pd.read_pickle(path)
+
+
+def _rows(spilled, start: int = 0, stop: Optional[int] = None) -> pd.DataFrame:
+    if isinstance(spilled, pd.DataFrame):
+        return spilled.iloc[start:stop]
+    stop = spilled.num_rows if stop is None else min(stop, spilled.num_rows)
+    return spilled.slice(start, max(stop - start, 0)).to_pandas()
+
+
+class ExportStore:
+    """
+    Detection results awaiting download, exported lazily and cached on disk
+
+    ``register`` applies ``prepare`` (e.g. decoding account codes) and spills
+    the exported frame to a hidden file in ``directory`` (Arrow IPC, or a
+    pickle without pyarrow), so no results are held in memory while they
+    await download. Results are kept for ``ttl`` seconds, and at most
+    ``max_results`` at a time. Each export is written once from the
+    memory-mapped spill file, to a temporary name that is renamed into place
+    when complete, so a cached file is always whole; concurrent requests for
+    the same file wait for the first writer. Expired results and files (also
+    those left by an earlier process) are removed on the next ``register``.
+    """
+
+    def __init__(self, directory: str, ttl: float = 3600, max_results: int = 8,
+                 prepare: Callable[[pd.DataFrame], pd.DataFrame] = lambda df: df):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_results = max_results
+        self.prepare = prepare
+        self._results: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._writers: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def register(self, df: pd.DataFrame,
+                 prepare: Optional[Callable[[pd.DataFrame], pd.DataFrame]] = None) -> Dict[str, str]:
+        """
+        Spill ``df`` to disk for download
+
+        Args:
+            prepare: Used instead of the store's ``prepare`` for these results
+                (e.g. decoding with the request's account overlay)
+
+        Returns:
+            File name per available format, e.g. {'csv': 'fraud_results_<time>_<id>.csv'}
+        """
+        result_id = f"fraud_results_{datetime.now():%Y%m%d_%H%M%S}_{uuid.uuid4().hex[:8]}"
+        spill = self._spill_path(result_id)
+        part = self._part_path(os.path.basename(spill))
+        try:
+            _write_spill((prepare or self.prepare)(df), part)
+            os.replace(part, spill)
+        except BaseException:
+            self._discard(part)
+            raise
+        with self._lock:
+            self._results[result_id] = (time.monotonic(), spill)
+            evicted = []
+            while len(self._results) > self.max_results:
+                evicted.append(self._results.popitem(last=False)[0])
+        for old_id in evicted:
+            self._remove_files(old_id)
+        self.expire()
+        return {fmt: f"{result_id}.{fmt}" for fmt in available_formats()}
+
+    def expire(self):
+        """Drop results older than the TTL and delete stale files"""
+        now = time.monotonic()
+        with self._lock:
+            expired = [result_id for result_id, (created, _) in self._results.items()
+                       if now - created > self.ttl]
+            for result_id in expired:
+                del self._results[result_id]
+        for result_id in expired:
+            self._remove_files(result_id)
+
+        cutoff = time.time() - self.ttl
+        try:
+            entries = list(os.scandir(self.directory))
+        except FileNotFoundError:
+            return
+        for entry in entries:
+            try:
+                if entry.is_file() and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+            except OSError:
+                pass
+
+    def cached(self, filename: str) -> Optional[str]:
+        """
+        Path of ``filename`` if it has already been written and is still fresh
+
+        Raises:
+            ValueError: If ``filename`` is not an export file name
+        """
+        self._parse(filename)
+        path = os.path.join(self.directory, filename)
+        try:
+            fresh = time.time() - os.path.getmtime(path) <= self.ttl
+        except OSError:
+            return None
+        return path if fresh else None
+
+    def export(self, filename: str) -> str:
+        """
+        Path of ``filename``, writing it first if needed (blocking)
+
+        Raises:
+            ValueError: If ``filename`` is not an export file name
+            KeyError: If its results have expired or never existed
+        """
+        result_id, fmt = self._parse(filename)
+        with self._writer(filename):
+            path = self.cached(filename)
+            if path is not None:
+                return path
+            spill = self._spill(result_id)
+            path = os.path.join(self.directory, filename)
+            part = self._part_path(filename)
+            try:
+                self._write_from_spill(spill, part, fmt)
+                os.replace(part, path)
+            except BaseException:
+                self._discard(part)
+                raise
+            return path
+
+    def stream_csv(self, filename: str, chunk_rows: int = CSV_CHUNK_ROWS) -> Iterator[bytes]:
+        """
+        Iterator over the CSV export in chunks of ``chunk_rows`` rows, formatted
+        as they are sent
+
+        The first request caches the file as a side effect; a concurrent one
+        streams without caching rather than waiting.
+
+        Raises:
+            ValueError: If ``filename`` is not a CSV export file name
+            KeyError: If its results have expired or never existed
+        """
+        result_id, fmt = self._parse(filename)
+        if fmt != 'csv':
+            raise ValueError(f"Not a CSV export: {filename}")
+        spill = self._spill(result_id)
+        return self._csv_chunks(filename, spill, chunk_rows)
+
+    def _csv_chunks(self, filename: str, spill: str, chunk_rows: int) -> Iterator[bytes]:
+        writer = self._writer(filename)
+        caching = writer.acquire(blocking=False)
+        part = self._part_path(filename) if caching else None
+        sink = open(part, 'wb') if caching else None
+        complete = False
+        try:
+            spilled = _read_spill(spill)
+            # One pass even for no rows, so the header is sent
+            for start in range(0, max(len(spilled), 1), chunk_rows):
+                chunk = _rows(spilled, start, start + chunk_rows)
+                data = chunk.to_csv(index=False, header=start == 0).encode()
+                if sink is not None:
+                    sink.write(data)
+                yield data
+            complete = True
+        finally:
+            if sink is not None:
+                sink.close()
+                if complete:
+                    os.replace(part, os.path.join(self.directory, filename))
+                else:
+                    # Client went away mid-stream
+                    self._discard(part)
+            if caching:
+                writer.release()
+
+    def _parse(self, filename: str) -> Tuple[str, str]:
+        result_id, _, fmt = filename.rpartition('.')
+        if not result_id.startswith("fraud_results_") or fmt not in available_formats() \
+                or os.path.basename(filename) != filename:
+            raise ValueError(f"Unknown export file: {filename}")
+        return result_id, fmt
+
+    def _spill(self, result_id: str) -> str:
+        with self._lock:
+            entry = self._results.get(result_id)
+        if entry is None or time.monotonic() - entry[0] > self.ttl or not os.path.exists(entry[1]):
+            raise KeyError(result_id)
+        return entry[1]
+
+    def _spill_path(self, result_id: str) -> str:
+        # Hidden, so it is never taken for an export file
+        extension = 'arrow' if 'arrow' in available_formats() else 'pkl'
+        return os.path.join(self.directory, f".{result_id}.{extension}")
+
+    @staticmethod
+    def _write_from_spill(spill: str, path: str, fmt: str):
+        if fmt == 'arrow':
+            # The spill file already is the Arrow export
+            shutil.copyfile(spill, path)
+            return
+        spilled = _read_spill(spill)
+        if fmt == 'parquet':
+            import pyarrow.parquet as pq
+
+            pq.write_table(spilled, path)
+        else:
+            write_export(_rows(spilled), path, fmt)
+
+    def _writer(self, filename: str) -> threading.Lock:
+        with self._lock:
+            return self._writers.setdefault(filename, threading.Lock())
+
+    def _part_path(self, filename: str) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        # Keeps the extension, which some writers check
+        return os.path.join(self.directory, f".part-{uuid.uuid4().hex[:8]}-{filename}")
+
+    def _remove_files(self, result_id: str):
+        with self._lock:
+            for filename in [name for name in self._writers if name.startswith(result_id + ".")]:
+                del self._writers[filename]
+        for fmt in EXPORT_FORMATS:
+            self._discard(os.path.join(self.directory, f"{result_id}.{fmt}"))
+        self._discard(self._spill_path(result_id))
+
+    @staticmethod
+    def _discard(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -3,6 +3,11 @@ FraudShield AI - Helper Functions
 Utility functions for backend operations
 """
 
+import numpy as np
+
+# Risk levels from highest to lowest, with the score each must exceed
+RISK_THRESHOLDS = (("CRITICAL", 0.8), ("HIGH", 0.6), ("MEDIUM", 0.4))
+
 
 def get_risk_level(score: float) -> str:
     """
@@ -14,11 +19,19 @@ def get_risk_level(score: float) -> str:
     Returns:
         Risk level classification (CRITICAL, HIGH, MEDIUM, LOW)
     """
-    if score > 0.8:
-        return "CRITICAL"
-    elif score > 0.6:
-        return "HIGH"
-    elif score > 0.4:
-        return "MEDIUM"
-    else:
-        return "LOW"
+    for level, threshold in RISK_THRESHOLDS:
+        if score > threshold:
+            return level
+    return "LOW"
+
+
+def get_risk_levels(scores: np.ndarray) -> np.ndarray:
+    """
+    ``get_risk_level`` for a whole array of fraud scores, vectorized
+
+    Returns:
+        Object array of risk levels
+    """
+    scores = np.asarray(scores)
+    return np.select([scores > threshold for _, threshold in RISK_THRESHOLDS],
+                     [level for level, _ in RISK_THRESHOLDS], "LOW").astype(object)
@@ -0,0 +1,132 @@
+"""
+FraudShield AI - Background Jobs
+Runs heavy training/detection work in a worker pool off the event loop
+"""
+
+import threading
+import traceback
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+
+class Job:
+    """A unit of background work with per-stage progress"""
+
+    def __init__(self, kind: str, stages: List[str]):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = "queued"
+        self.stages = [{"name": name, "status": "pending", "started_at": None, "finished_at": None}
+                       for name in stages]
+        self.created_at = datetime.now().isoformat()
+        self.started_at: Optional[str] = None
+        self.finished_at: Optional[str] = None
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.error_status_code: Optional[int] = None
+        self.future: Optional[Future] = None
+        self._lock = threading.Lock()
+
+    def start_stage(self, name: str):
+        """Mark ``name`` as running and every earlier stage as done"""
+        now = datetime.now().isoformat()
+        with self._lock:
+            for stage in self.stages:
+                if stage["name"] == name:
+                    stage["status"] = "running"
+                    stage["started_at"] = now
+                    break
+                if stage["status"] != "done":
+                    stage["status"] = "done"
+                    stage["finished_at"] = stage["finished_at"] or now
+
+    def _finish_stages(self):
+        now = datetime.now().isoformat()
+        for stage in self.stages:
+            if stage["status"] == "running":
+                stage["status"] = "done" if self.status == "succeeded" else "failed"
+                stage["finished_at"] = now
+
+    @property
+    def progress(self) -> float:
+        """Fraction of stages completed"""
+        if self.status == "succeeded":
+            return 1.0
+        done = sum(1 for stage in self.stages if stage["status"] == "done")
+        return done / len(self.stages) if self.stages else 0.0
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            return {
+                "job_id": self.id,
+                "kind": self.kind,
+                "status": self.status,
+                "progress": self.progress,
+                "stages": [dict(stage) for stage in self.stages],
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                "error": self.error,
+                "result_url": f"/api/jobs/{self.id}/result" if self.status == "succeeded" else None,
+            }
+
+
+class JobManager:
+    """Submits jobs to a thread pool and keeps a bounded history of them"""
+
+    def __init__(self, max_workers: int = 2, history_size: int = 100):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fraudshield-job")
+        self.history_size = history_size
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, stages: List[str], fn: Callable[[Job], Any]) -> Job:
+        """
+        Queue ``fn(job)`` for background execution
+
+        ``fn`` reports progress through ``job.start_stage`` and returns the job
+        result. Exceptions are recorded on the job (and re-raised from
+        ``job.future``); an exception with a ``status_code`` attribute, such as
+        FastAPI's HTTPException, keeps that code for the API response.
+        """
+        job = Job(kind, stages)
+        with self._lock:
+            self._jobs[job.id] = job
+            while len(self._jobs) > self.history_size:
+                oldest = next(iter(self._jobs.values()))
+                if oldest.future is None or not oldest.future.done():
+                    break
+                self._jobs.popitem(last=False)
+
+        job.future = self.executor.submit(self._run, job, fn)
+        return job
+
+    def _run(self, job: Job, fn: Callable[[Job], Any]) -> Any:
+        job.status = "running"
+        job.started_at = datetime.now().isoformat()
+        try:
+            job.result = fn(job)
+            job.status = "succeeded"
+            return job.result
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(getattr(e, "detail", e))
+            job.error_status_code = getattr(e, "status_code", 500)
+            if job.error_status_code >= 500:
+                traceback.print_exc()
+            raise
+        finally:
+            job.finished_at = datetime.now().isoformat()
+            with job._lock:
+                job._finish_stages()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self) -> List[Job]:
+        with self._lock:
+            return list(self._jobs.values())
@@ -0,0 +1,78 @@
+"""
+FraudShield AI - Model Registry
+Publishes immutable model snapshots so scoring never waits on training
+"""
+
+import threading
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+
+class StaleSnapshotError(RuntimeError):
+    """Raised by ``publish`` when the model changed since the expected version"""
+
+
+class ModelSnapshot(NamedTuple):
+    """A trained detector and its explainer, published together"""
+    detector: object
+    explainer: object
+    version: int
+    published_at: str
+
+
+class ModelRegistry:
+    """
+    Holds the current model snapshot
+
+    Readers take ``registry.current`` once per request and use that snapshot
+    to the end without locking; replacing the reference is a single atomic
+    store, so an in-flight request keeps scoring with the model it started
+    with. New models are built off to the side and handed to ``publish``.
+    Published detectors must not be mutated afterwards.
+    """
+
+    def __init__(self):
+        self._snapshot: Optional[ModelSnapshot] = None
+        self._version = 0
+        # Serializes writers only (version numbering); readers never take it
+        self._publish_lock = threading.RLock()
+
+    @property
+    def current(self) -> Optional[ModelSnapshot]:
+        return self._snapshot
+
+    @property
+    def lock(self) -> threading.RLock:
+        """
+        The writers' lock, for publishing together with state that must match
+        the model (e.g. the training data); ``publish`` may be called under it
+        """
+        return self._publish_lock
+
+    def publish(self, detector, explainer, expected_version: Optional[int] = None) -> ModelSnapshot:
+        """
+        Make ``detector`` the model used by every subsequent request
+
+        Args:
+            expected_version: If given, publish only while this is still the
+                current version, i.e. ``detector`` was derived from it
+
+        Raises:
+            StaleSnapshotError: If another model was published after
+                ``expected_version``
+        """
+        with self._publish_lock:
+            current = self._snapshot.version if self._snapshot is not None else None
+            if expected_version is not None and current != expected_version:
+                raise StaleSnapshotError(
+                    f"Model version {current} was published after version {expected_version}"
+                )
+            self._version += 1
+            snapshot = ModelSnapshot(
+                detector=detector,
+                explainer=explainer,
+                version=self._version,
+                published_at=datetime.now().isoformat(),
+            )
+            self._snapshot = snapshot
+        return snapshot
@@ -0,0 +1,87 @@
+"""
+FraudShield AI - Response Encoding
+Fast, compressed JSON bodies for large result payloads
+
+FastAPI serializes a returned dict by walking it with ``jsonable_encoder``
+and then the stdlib encoder, on the event loop. For result pages this module
+encodes directly with orjson (stdlib ``json`` if it is not installed) and
+compresses with brotli or gzip, whichever the client accepts (brotli only if
+the ``brotli`` package is installed). The caller runs it in a worker thread.
+"""
+
+import gzip
+import json
+from typing import Any, Optional
+
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Bodies smaller than this are sent uncompressed
+MIN_COMPRESS_BYTES = 1024
+
+# Fast levels: these bodies are compressed once per request, not stored
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+
+
+def _default(value: Any):
+    # numpy scalars and arrays that reach the stdlib encoder
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def encode_json(payload: Any) -> bytes:
+    """``payload`` (which may hold numpy values) as compact UTF-8 JSON"""
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(payload, separators=(',', ':'), ensure_ascii=False,
+                      default=_default).encode('utf-8')
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Content coding to use for an ``Accept-Encoding`` header value
+
+    Brotli is preferred to gzip; codings with ``q=0`` are refused.
+    """
+    accepted = set()
+    for part in accept_encoding.lower().split(','):
+        coding, _, params = part.strip().partition(';')
+        quality = params.strip()
+        if quality.startswith('q='):
+            try:
+                if float(quality[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(coding.strip())
+    if brotli is not None and ('br' in accepted or '*' in accepted):
+        return 'br'
+    if 'gzip' in accepted or '*' in accepted:
+        return 'gzip'
+    return None
+
+
+def json_response(payload: Any, accept_encoding: str = "", status_code: int = 200) -> Response:
+    """JSON response for ``payload``, compressed if it is large and the client accepts it"""
+    body = encode_json(payload)
+    headers = {"Vary": "Accept-Encoding"}
+    encoding = choose_encoding(accept_encoding) if len(body) >= MIN_COMPRESS_BYTES else None
+    if encoding == 'br':
+        body = brotli.compress(body, quality=BROTLI_QUALITY)
+    elif encoding == 'gzip':
+        body = gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, status_code=status_code,
+                    media_type="application/json", headers=headers)
@@ -0,0 +1,303 @@
+"""
+FraudShield AI - Result Store
+Scored /api/analyze runs kept on disk for paginated, filtered queries
+
+Each run is a directory holding a ``manifest.json`` plus one ``.npy`` file
+per column (the model artifact layout), so a query memory-maps the columns
+and touches only the rows it returns. String columns (``type``, account IDs,
+``risk_level``, ``explanation``) are dictionary-encoded: int32 codes plus a
+fixed-width array of the distinct UTF-8 values, which keeps filters on them
+integer comparisons.
+
+Sorted queries select the requested page with ``np.argpartition`` (top-K)
+and sort only those rows, so the first pages of a multi-million-row run cost
+O(n) instead of O(n log n). Ties are broken by row position, which keeps
+pages disjoint.
+"""
+
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+MANIFEST_FILE = "manifest.json"
+
+# Columns kept per transaction, in response order
+RESULT_COLUMNS = ('transaction_id', 'step', 'type', 'amount', 'nameOrig', 'nameDest',
+                  'fraud_score', 'ml_score', 'rule_score', 'is_suspicious', 'risk_level',
+                  'explanation')
+
+SORT_COLUMNS = ('fraud_score', 'amount', 'step', 'transaction_id')
+
+MAX_PAGE_SIZE = 100_000
+
+_RESULT_ID = re.compile(r"^[0-9a-f]{32}$")
+
+
+def _dictionary_encode(values: pd.Series):
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        codes, categories = values.cat.codes.to_numpy(), values.cat.categories
+    else:
+        codes, categories = pd.factorize(values, use_na_sentinel=False)
+    encoded = np.array([str(value).encode('utf-8') for value in categories], dtype=bytes)
+    # Empty columns still need a width for the .npy file
+    if encoded.dtype.itemsize == 0:
+        encoded = encoded.astype('S1')
+    return codes.astype(np.int32), encoded
+
+
+def top_k(keys: np.ndarray, k: int) -> np.ndarray:
+    """
+    Positions of the ``k`` smallest ``keys`` in ascending order, ties by position
+
+    Selects with ``np.argpartition`` and sorts only the selection.
+    """
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    if k < len(keys):
+        threshold = keys[np.argpartition(keys, k - 1)[k - 1]]
+        below = np.flatnonzero(keys < threshold)
+        # flatnonzero is ascending, so the earliest tied rows are taken
+        ties = np.flatnonzero(keys == threshold)[:k - len(below)]
+        selected = np.concatenate([below, ties])
+    else:
+        selected = np.arange(len(keys))
+    return selected[np.lexsort((selected, keys[selected]))]
+
+
+class ResultStore:
+    """
+    Scored runs on disk, queried by result ID
+
+    Runs are removed ``ttl`` seconds after they are saved, and the oldest are
+    removed once there are more than ``max_results``; both are checked on the
+    next ``save``. Runs left by an earlier process stay queryable until then.
+    """
+
+    def __init__(self, directory: str, ttl: float = 3600, max_results: int = 16,
+                 open_results: int = 4):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_results = max_results
+        self._open: "OrderedDict[str, Dict]" = OrderedDict()
+        self._open_limit = open_results
+        self._lock = threading.Lock()
+
+    def save(self, df: pd.DataFrame) -> str:
+        """
+        Write the ``RESULT_COLUMNS`` of ``df`` (account IDs, not codes) as a new run
+
+        The run is assembled in a temp directory and renamed into place, so a
+        query never sees a partial run.
+
+        Returns:
+            The result ID
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        result_id = uuid.uuid4().hex
+        staging = tempfile.mkdtemp(prefix=f".{result_id}-", dir=self.directory)
+        try:
+            columns = {}
+            for column in RESULT_COLUMNS:
+                values = df[column]
+                if values.dtype.kind in 'biuf':
+                    array = values.to_numpy()
+                    if column == 'is_suspicious':
+                        array = array.astype(bool)
+                    np.save(os.path.join(staging, f"{column}.npy"), np.ascontiguousarray(array))
+                    columns[column] = {"kind": "numeric", "arrays": [f"{column}.npy"]}
+                else:
+                    codes, categories = _dictionary_encode(values)
+                    np.save(os.path.join(staging, f"{column}.codes.npy"), codes)
+                    np.save(os.path.join(staging, f"{column}.values.npy"), categories)
+                    columns[column] = {"kind": "dictionary",
+                                       "arrays": [f"{column}.codes.npy", f"{column}.values.npy"]}
+
+            manifest = {
+                "result_id": result_id,
+                "created_at": time.time(),
+                "rows": len(df),
+                "columns": columns,
+            }
+            with open(os.path.join(staging, MANIFEST_FILE), "w") as f:
+                json.dump(manifest, f, indent=2)
+            os.rename(staging, os.path.join(self.directory, result_id))
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        self.expire()
+        return result_id
+
+    def expire(self):
+        """Remove runs past the TTL, then the oldest beyond ``max_results``"""
+        runs = []
+        try:
+            entries = list(os.scandir(self.directory))
+        except FileNotFoundError:
+            return
+        now = time.time()
+        for entry in entries:
+            if not entry.is_dir():
+                continue
+            if entry.name.startswith("."):
+                # Staging directory of a save that died
+                if now - entry.stat().st_mtime > self.ttl:
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                continue
+            try:
+                with open(os.path.join(entry.path, MANIFEST_FILE)) as f:
+                    runs.append((json.load(f)["created_at"], entry.name))
+            except (OSError, ValueError, KeyError):
+                continue
+
+        runs.sort(reverse=True)
+        for position, (created_at, result_id) in enumerate(runs):
+            if position >= self.max_results or now - created_at > self.ttl:
+                self.delete(result_id)
+
+    def delete(self, result_id: str):
+        """Remove a run (no-op if it does not exist)"""
+        with self._lock:
+            self._open.pop(result_id, None)
+        if _RESULT_ID.match(result_id):
+            shutil.rmtree(os.path.join(self.directory, result_id), ignore_errors=True)
+
+    def query(self, result_id: str, offset: int = 0, limit: int = 100,
+              sort: Optional[str] = None, descending: bool = True,
+              risk_levels: Sequence[str] = (), types: Sequence[str] = (),
+              account: Optional[str] = None, suspicious: Optional[bool] = None,
+              columnar: bool = False) -> Dict:
+        """
+        One page of a run's transactions
+
+        Args:
+            offset, limit: Page position among the matching rows
+            sort: One of ``SORT_COLUMNS``; rows stay in file order if None
+            descending: Sort order (highest first by default)
+            risk_levels, types: Keep rows with any of these values
+            account: Keep rows where it is the sender or the receiver
+            suspicious: Keep only suspicious (True) or unsuspicious (False) rows
+            columnar: Return ``transactions`` as one array per column (numeric
+                columns as numpy arrays) instead of one dict per row
+
+        Returns:
+            {"total": matching rows, "offset", "limit", "transactions": ...}
+
+        Raises:
+            KeyError: If the run does not exist or has expired
+            ValueError: If the page or sort column is invalid
+        """
+        if offset < 0:
+            raise ValueError("offset must be >= 0")
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+        if sort is not None and sort not in SORT_COLUMNS:
+            raise ValueError(f"sort must be one of {list(SORT_COLUMNS)}")
+
+        run = self._load(result_id)
+        columns = run["columns"]
+
+        mask = None
+        for column, wanted in (('risk_level', risk_levels), ('type', types)):
+            if wanted:
+                mask = self._and(mask, self._matches(columns[column], wanted))
+        if account is not None:
+            mask = self._and(mask, self._matches(columns['nameOrig'], [account])
+                             | self._matches(columns['nameDest'], [account]))
+        if suspicious is not None:
+            mask = self._and(mask, columns['is_suspicious'] == suspicious)
+
+        rows = np.flatnonzero(mask) if mask is not None else None
+        total = run["manifest"]["rows"] if rows is None else len(rows)
+
+        if sort is None:
+            page = (np.arange(offset, min(offset + limit, total)) if rows is None
+                    else rows[offset:offset + limit])
+        else:
+            values = columns[sort] if rows is None else columns[sort][rows]
+            keys = -values.astype(np.float64) if descending else values
+            page = top_k(keys, offset + limit)[offset:]
+            if rows is not None:
+                page = rows[page]
+
+        return {
+            "total": int(total),
+            "offset": offset,
+            "limit": limit,
+            "transactions": (self._columns(columns, page) if columnar
+                             else self._rows(columns, page)),
+        }
+
+    @staticmethod
+    def _and(mask: Optional[np.ndarray], other: np.ndarray) -> np.ndarray:
+        return other if mask is None else mask & other
+
+    @staticmethod
+    def _matches(column, wanted: Sequence[str]) -> np.ndarray:
+        codes, values = column
+        wanted_codes = np.flatnonzero(np.isin(values, [value.encode('utf-8') for value in wanted]))
+        return np.isin(codes, wanted_codes)
+
+    @staticmethod
+    def _columns(columns: Dict, page: np.ndarray) -> Dict:
+        arrays = {}
+        for column in RESULT_COLUMNS:
+            data = columns[column]
+            if isinstance(data, tuple):
+                # Decode each distinct value on the page once
+                codes, values = data
+                distinct, inverse = np.unique(codes[page], return_inverse=True)
+                decoded = np.array([value.decode('utf-8') for value in values[distinct]], dtype=object)
+                arrays[column] = decoded[inverse].tolist()
+            else:
+                arrays[column] = data[page]
+        return arrays
+
+    @classmethod
+    def _rows(cls, columns: Dict, page: np.ndarray) -> List[Dict]:
+        lists = {column: values if isinstance(values, list) else values.tolist()
+                 for column, values in cls._columns(columns, page).items()}
+        return [dict(zip(lists, row)) for row in zip(*lists.values())]
+
+    def _load(self, result_id: str) -> Dict:
+        if not _RESULT_ID.match(result_id):
+            raise KeyError(result_id)
+        with self._lock:
+            run = self._open.get(result_id)
+            if run is not None:
+                self._open.move_to_end(result_id)
+        path = os.path.join(self.directory, result_id)
+        if run is None:
+            try:
+                with open(os.path.join(path, MANIFEST_FILE)) as f:
+                    manifest = json.load(f)
+            except OSError:
+                raise KeyError(result_id)
+
+            def read(file_name):
+                return np.load(os.path.join(path, file_name), mmap_mode='r').view(np.ndarray)
+
+            columns = {}
+            for column, info in manifest["columns"].items():
+                arrays = [read(file_name) for file_name in info["arrays"]]
+                columns[column] = arrays[0] if info["kind"] == "numeric" else tuple(arrays)
+            run = {"manifest": manifest, "columns": columns}
+            with self._lock:
+                self._open[result_id] = run
+                while len(self._open) > self._open_limit:
+                    self._open.popitem(last=False)
+
+        if time.time() - run["manifest"]["created_at"] > self.ttl or not os.path.isdir(path):
+            self.delete(result_id)
+            raise KeyError(result_id)
+        return run
@@ -0,0 +1,338 @@
+"""
+FraudShield AI - Streaming Uploads
+Parse uploaded transaction files while they are still arriving
+
+FastAPI only hands an ``UploadFile`` to an endpoint once the whole request
+body has been received, and ``await file.read()`` then holds it in memory.
+Upload endpoints instead read the multipart body themselves: the file part's
+bytes are pushed into an ``UploadStream`` as they come off the socket, and a
+job worker reads that stream through a gzip/zstd decompressor (detected from
+the first bytes) into the ingestion schema's readers
+(``ml_engine.models.schema``): the multithreaded CSV parser, or Parquet /
+Arrow IPC. Transfer, decompression and parsing overlap, and for CSV and
+Arrow streams only a bounded window of the raw upload is ever held.
+"""
+
+import asyncio
+import gzip
+import io
+import shutil
+import threading
+from collections import deque
+from typing import AsyncIterator, Optional
+
+import pandas as pd
+
+from ml_engine.models.schema import read_arrow, read_arrow_stream, read_parquet, read_transactions
+
+try:
+    import python_multipart as multipart
+    from python_multipart.multipart import parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    import multipart
+    from multipart.multipart import parse_options_header
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+PARQUET_MAGIC = b"PAR1"
+ARROW_FILE_MAGIC = b"ARROW1"
+# Arrow IPC streams start with a continuation marker
+ARROW_STREAM_MAGIC = b"\xff\xff\xff\xff"
+
+# Copy size when collecting a Parquet/Arrow file
+COPY_BYTES = 4 * 1024 * 1024
+
+# Raw upload bytes buffered ahead of the parser before the sender is paused
+DEFAULT_BUFFER_BYTES = 32 * 1024 * 1024
+
+
+def multipart_boundary(content_type: Optional[str]) -> bytes:
+    """
+    Boundary of a multipart/form-data request
+
+    Raises:
+        ValueError: If the request is not multipart/form-data
+    """
+    media_type, params = parse_options_header(content_type or "")
+    if media_type != b"multipart/form-data" or b"boundary" not in params:
+        raise ValueError("Expected a multipart/form-data upload with a 'file' field")
+    boundary = params[b"boundary"]
+    return boundary if isinstance(boundary, bytes) else boundary.encode("latin-1")
+
+
+class UploadStream(io.RawIOBase):
+    """
+    Read side of an upload that is still being received
+
+    The event loop calls ``receive`` with the request body; a worker thread
+    reads the file part like a regular binary file. When more than
+    ``max_buffered`` bytes are waiting, ``receive`` stops pulling from the
+    socket until the reader catches up; it waits on an event-loop future the
+    reader resolves, so a paused upload holds no thread. If the reader closes the stream
+    early (e.g. the CSV has the wrong columns) the rest of the body is
+    drained and discarded.
+    """
+
+    def __init__(self, boundary: bytes, field: str = "file",
+                 max_buffered: int = DEFAULT_BUFFER_BYTES):
+        super().__init__()
+        self.boundary = boundary
+        self.field = field
+        self.max_buffered = max_buffered
+        self.filename: Optional[str] = None
+        self.bytes_received = 0
+        self._chunks: deque = deque()
+        self._buffered = 0
+        self._eof = False
+        self._error: Optional[Exception] = None
+        self._abandoned = False
+        self._cond = threading.Condition()
+        # (event loop, future) of a receive paused on a full buffer
+        self._space_waiter = None
+
+    def readable(self) -> bool:
+        return True
+
+    # -- Producer side (event loop) -------------------------------------------
+
+    async def receive(self, body: AsyncIterator[bytes]):
+        """
+        Parse a multipart request body, feeding the file part to the reader
+
+        Raises:
+            ValueError: If the body is not valid multipart data, has no file
+                part, or the client disconnected; the reader sees the same error
+        """
+        part = {"headers": {}, "field": b"", "value": b"", "is_file": False}
+        pending = []
+        state = {"found": False, "done": False}
+
+        def on_part_begin():
+            part.update(headers={}, field=b"", value=b"", is_file=False)
+
+        def on_header_field(data, start, end):
+            part["field"] += data[start:end]
+
+        def on_header_value(data, start, end):
+            part["value"] += data[start:end]
+
+        def on_header_end():
+            part["headers"][part["field"].lower()] = part["value"]
+            part["field"] = b""
+            part["value"] = b""
+
+        def on_headers_finished():
+            _, options = parse_options_header(part["headers"].get(b"content-disposition", b""))
+            name = options.get(b"name", b"").decode("utf-8", "replace")
+            if name == self.field and b"filename" in options and not state["found"]:
+                part["is_file"] = True
+                state["found"] = True
+                self.filename = options[b"filename"].decode("utf-8", "replace")
+
+        def on_part_data(data, start, end):
+            if part["is_file"]:
+                pending.append(bytes(data[start:end]))
+
+        def on_part_end():
+            if part["is_file"]:
+                part["is_file"] = False
+                state["done"] = True
+
+        parser = multipart.MultipartParser(self.boundary, {
+            "on_part_begin": on_part_begin,
+            "on_header_field": on_header_field,
+            "on_header_value": on_header_value,
+            "on_header_end": on_header_end,
+            "on_headers_finished": on_headers_finished,
+            "on_part_data": on_part_data,
+            "on_part_end": on_part_end,
+        })
+
+        try:
+            async for chunk in body:
+                parser.write(chunk)
+                for data in pending:
+                    await self._feed(data)
+                pending.clear()
+            parser.finalize()
+        except Exception as e:
+            # Parser errors and client disconnects reach the reader as bad input
+            self.abort(ValueError(f"Invalid or interrupted upload: {e}"))
+            raise self._error from e
+        except BaseException:
+            self.abort(ValueError("Upload cancelled"))
+            raise
+
+        if not state["found"]:
+            self.abort(ValueError(f"No file uploaded in the '{self.field}' field"))
+            raise self._error
+        if not state["done"]:
+            self.abort(ValueError("Upload ended before the file was complete"))
+            raise self._error
+        self.finish()
+
+    async def _feed(self, data: bytes):
+        if not data:
+            return
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._cond:
+                if self._abandoned:
+                    return
+                if self._buffered < self.max_buffered:
+                    self._chunks.append(memoryview(data))
+                    self._buffered += len(data)
+                    self.bytes_received += len(data)
+                    self._cond.notify_all()
+                    return
+                # Full: wait on the event loop (not in a thread) until the
+                # reader frees space
+                waiter = self._space_waiter = (loop, loop.create_future())
+            await waiter[1]
+
+    def _wake_sender(self):
+        """Resume a ``_feed`` waiting for space (call with ``_cond`` held)"""
+        waiter = self._space_waiter
+        if waiter is not None and (self._buffered < self.max_buffered or self._abandoned):
+            self._space_waiter = None
+            loop, future = waiter
+            loop.call_soon_threadsafe(_resolve, future)
+
+    def finish(self):
+        """Mark the end of the file"""
+        with self._cond:
+            self._eof = True
+            self._cond.notify_all()
+
+    def abort(self, error: Exception):
+        """End the stream with ``error``, raised by the reader's next read"""
+        with self._cond:
+            self._error = error
+            self._cond.notify_all()
+
+    # -- Reader side (job worker) ---------------------------------------------
+
+    def _wait_for(self, n_bytes: int):
+        """Block until ``n_bytes`` are buffered or the stream has ended"""
+        while self._buffered < n_bytes and not self._eof and self._error is None:
+            self._cond.wait()
+        if self._error is not None:
+            raise self._error
+
+    def peek(self, n_bytes: int) -> bytes:
+        """Up to ``n_bytes`` from the start of the unread data, without consuming them"""
+        with self._cond:
+            self._wait_for(n_bytes)
+            head = bytearray()
+            for chunk in self._chunks:
+                head += chunk[:n_bytes - len(head)]
+                if len(head) >= n_bytes:
+                    break
+            return bytes(head)
+
+    def readinto(self, buffer) -> int:
+        target = memoryview(buffer).cast("B")
+        with self._cond:
+            self._wait_for(1)
+            filled = 0
+            while self._chunks and filled < len(target):
+                chunk = self._chunks[0]
+                n = min(len(chunk), len(target) - filled)
+                target[filled:filled + n] = chunk[:n]
+                filled += n
+                if n == len(chunk):
+                    self._chunks.popleft()
+                else:
+                    self._chunks[0] = chunk[n:]
+            self._buffered -= filled
+            self._cond.notify_all()
+            self._wake_sender()
+            return filled
+
+    def close(self):
+        """Stop reading; anything still arriving is discarded"""
+        with self._cond:
+            self._abandoned = True
+            self._chunks.clear()
+            self._buffered = 0
+            self._cond.notify_all()
+            self._wake_sender()
+        super().close()
+
+
+def _resolve(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+def open_decompressed(stream: UploadStream):
+    """
+    Buffered binary file over the upload's contents, decompressing gzip or zstd input
+
+    The format is detected from the first bytes, not the file name.
+
+    Raises:
+        ValueError: For zstd input when the ``zstandard`` package is missing
+    """
+    magic = stream.peek(len(ZSTD_MAGIC))
+    if magic.startswith(GZIP_MAGIC):
+        return gzip.GzipFile(fileobj=stream, mode="rb")
+    if magic.startswith(ZSTD_MAGIC):
+        try:
+            import zstandard
+        except ImportError:
+            raise ValueError("zstd-compressed uploads need the 'zstandard' package")
+        return io.BufferedReader(
+            zstandard.ZstdDecompressor().stream_reader(stream, read_across_frames=True)
+        )
+    return io.BufferedReader(stream)
+
+
+class _Prefixed(io.RawIOBase):
+    """``head`` followed by the rest of ``source``, after sniffing consumed ``head``"""
+
+    def __init__(self, head: bytes, source):
+        super().__init__()
+        self._head = memoryview(head)
+        self._source = source
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if self._head:
+            n = min(len(buffer), len(self._head))
+            buffer[:n] = self._head[:n]
+            self._head = self._head[n:]
+            return n
+        return self._source.readinto(buffer)
+
+
+def read_upload(stream: UploadStream) -> pd.DataFrame:
+    """
+    Parse an uploaded transactions file while it is being received
+
+    CSV, Parquet and Arrow IPC are told apart by their first bytes. CSV and
+    Arrow streams are parsed incrementally; Parquet and Arrow files keep
+    their metadata in a footer, so they are received in full first.
+
+    Raises:
+        ValueError: If the upload failed, is in an unsupported format or does
+            not match the ingestion schema
+    """
+    try:
+        source = open_decompressed(stream)
+        head = source.read(len(ARROW_FILE_MAGIC))
+        if head.startswith(PARQUET_MAGIC) or head.startswith(ARROW_FILE_MAGIC):
+            data = io.BytesIO()
+            data.write(head)
+            shutil.copyfileobj(source, data, COPY_BYTES)
+            read = read_parquet if head.startswith(PARQUET_MAGIC) else read_arrow
+            return read(data.getbuffer())
+
+        source = io.BufferedReader(_Prefixed(head, source))
+        if head.startswith(ARROW_STREAM_MAGIC):
+            return read_arrow_stream(source)
+        return read_transactions(source)
+    finally:
+        stream.close()
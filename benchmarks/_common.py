@@ -0,0 +1,63 @@
+"""
+FraudShield AI - Benchmark Helpers
+Data generation, timing and memory probes shared by the benchmarks
+
+Importing this module puts the repository root and ``backend/`` on
+``sys.path``, so a benchmark run as ``python benchmarks/bench_x.py`` can
+import ``ml_engine`` and the backend ``utils`` package.
+"""
+
+import os
+import resource
+import sys
+import time
+from typing import Callable, Tuple
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for _path in (ROOT, os.path.join(ROOT, "backend")):
+    if _path not in sys.path:
+        sys.path.append(_path)
+
+DATA_PATH = os.path.join(ROOT, "data", "sample_10k.csv")
+
+
+def make_transactions(sample: pd.DataFrame, n_rows: int, step_offset: int = 0) -> pd.DataFrame:
+    """Tile the sample to ``n_rows``, shifting steps so tiles do not overlap"""
+    repeats = -(-n_rows // len(sample))
+    df = pd.concat([sample] * repeats, ignore_index=True).head(n_rows).copy()
+    tile = np.arange(len(df)) // len(sample)
+    df['step'] = df['step'] + step_offset + tile * (sample['step'].max() + 1)
+    return df
+
+
+def timed(fn: Callable, repeats: int = 1, clock: Callable[[], float] = time.perf_counter) -> Tuple[float, object]:
+    """
+    Best time of ``repeats`` calls to ``fn``, in seconds, and the last result
+
+    Args:
+        clock: ``time.perf_counter`` (wall clock) or ``time.process_time``
+            (CPU time of this process, for work that should not be charged
+            for waiting)
+    """
+    best = float("inf")
+    result = None
+    for _ in range(repeats):
+        start = clock()
+        result = fn()
+        best = min(best, clock() - start)
+    return best, result
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process (VmHWM, which exec resets)"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
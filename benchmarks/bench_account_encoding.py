@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark: int32 account codes vs string account IDs
+
+Tiles data/sample_10k.csv, encodes ``nameOrig``/``nameDest`` with
+``encode_accounts`` and compares, for string IDs and codes: memory held by
+the two account columns, the shared account aggregation, and per-account
+row lookups as done by the ego-tree BFS (``==`` scan vs ``AccountIndex``).
+Aggregates must match between the two representations.
+
+Then a scored batch of unseen IDs is encoded through a request
+overlay (``ACCOUNTS.overlay()``): the shared dictionary must not grow, and
+codes must decode back to the original IDs.
+
+Usage:
+    python benchmarks/bench_account_encoding.py [--rows 1000000] [--lookups 200]
+"""
+
+import argparse
+import sys
+
+import numpy as np
+import pandas as pd
+
+from _common import DATA_PATH, make_transactions, timed
+
+from ml_engine.models.account_dictionary import ACCOUNTS, ACCOUNT_COLUMNS, decode_accounts, encode_accounts
+from ml_engine.models.account_profiles import AccountAggregates
+from main import AccountIndex
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--lookups", type=int, default=200)
+    args = parser.parse_args()
+
+    df = make_transactions(pd.read_csv(DATA_PATH), args.rows)
+    encode_time, encoded = timed(lambda: encode_accounts(df.copy()))
+    print(f"\n🔤 Encoded {args.rows:,} rows ({len(ACCOUNTS):,} distinct accounts) "
+          f"in {encode_time:.2f}s")
+
+    string_mb = df[list(ACCOUNT_COLUMNS)].memory_usage(deep=True, index=False).sum() / 1e6
+    code_mb = encoded[list(ACCOUNT_COLUMNS)].memory_usage(deep=True, index=False).sum() / 1e6
+
+    string_agg, string_stats = timed(lambda: AccountAggregates.from_frame(df).row_stats())
+    code_agg, code_stats = timed(lambda: AccountAggregates.from_frame(encoded).row_stats())
+    parity = all(np.array_equal(string_stats[k], code_stats[k], equal_nan=True)
+                 for k in string_stats)
+
+    names = df['nameOrig'].drop_duplicates().head(args.lookups).to_numpy()
+    codes = encoded['nameOrig'].drop_duplicates().head(args.lookups).to_numpy()
+    scan_time, _ = timed(lambda: [np.flatnonzero(df['nameOrig'].to_numpy() == name)
+                                  for name in names])
+
+    def indexed():
+        index = AccountIndex(encoded['nameOrig'].to_numpy())
+        return [index.rows(code) for code in codes]
+
+    index_time, _ = timed(indexed)
+
+    print(f"\n{'':<24} {'strings':>10} {'codes':>10}")
+    print(f"{'account columns (MB)':<24} {string_mb:>10.1f} {code_mb:>10.1f}")
+    print(f"{'aggregation (s)':<24} {string_agg:>10.3f} {code_agg:>10.3f}")
+    print(f"{f'{len(names)} row lookups (s)':<24} {scan_time:>10.3f} {index_time:>10.3f}")
+    print(f"\n🔍 Aggregate parity: {'ok' if parity else 'MISMATCH'}")
+
+    # A scored batch whose senders the model has never seen
+    batch = df.copy()
+    batch['nameOrig'] = 'X' + batch['nameOrig'].astype(str)
+    shared = len(ACCOUNTS)
+    accounts = ACCOUNTS.overlay()
+    overlay_time, overlaid = timed(lambda: encode_accounts(batch.copy(), accounts))
+    decoded = decode_accounts(overlaid, accounts)
+    round_trip = all((decoded[column].to_numpy() == batch[column].to_numpy()).all()
+                     for column in ACCOUNT_COLUMNS)
+    bounded = len(ACCOUNTS) == shared
+    print(f"\n🧾 Overlay encoding of {args.rows:,} rows ({len(accounts):,} unseen accounts) "
+          f"in {overlay_time:.2f}s; shared dictionary "
+          f"{'unchanged' if bounded else f'grew by {len(ACCOUNTS) - shared:,}'}, "
+          f"round trip {'ok' if round_trip else 'MISMATCH'}")
+
+    if not parity:
+        print("❌ Encoded accounts change the aggregates")
+        sys.exit(1)
+    if not (bounded and round_trip):
+        print("❌ Overlay encoding leaked into the shared dictionary or lost IDs")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
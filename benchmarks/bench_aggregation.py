@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Benchmark: shared single-pass account aggregation vs per-consumer groupbys
+
+Before the shared pass, one ``predict`` grouped by ``nameOrig`` twice (rules:
+mean/std; features: count/mean/std/max/step range), by (``nameOrig``,
+``step``) once, and merged each result back into the frame. This script
+replays that legacy sequence next to ``AccountAggregates.from_frame``, checks
+that both produce the same statistics and times them, along with the rules +
+features stage of ``predict`` that consumes them.
+
+Usage:
+    python benchmarks/bench_aggregation.py [--rows 100000 1000000]
+"""
+
+import argparse
+import sys
+
+import numpy as np
+import pandas as pd
+
+from _common import DATA_PATH, make_transactions, timed
+
+from ml_engine.models.account_profiles import AccountAggregates
+from ml_engine.models.hybrid_fraud_detector import HybridFraudDetector, account_stats
+
+
+def legacy_aggregation(df: pd.DataFrame) -> pd.DataFrame:
+    """The three groupby + merge passes one predict call used to make"""
+    # RuleBasedEngine: amount mean/std per account
+    user_stats = df.groupby('nameOrig')['amount'].agg(['mean', 'std']).reset_index()
+    out = df.merge(user_stats, on='nameOrig', how='left')
+
+    # RuleBasedEngine: transactions per (account, step)
+    freq = out.groupby(['nameOrig', 'step']).size().reset_index(name='freq')
+    out = out.merge(freq, on=['nameOrig', 'step'], how='left')
+
+    # prepare_features: a second groupby over the same accounts
+    user_features = out.groupby('nameOrig').agg({
+        'amount': ['count', 'mean', 'std', 'max'],
+        'step': ['min', 'max']
+    }).reset_index()
+    user_features.columns = ['nameOrig', 'user_tx_count', 'user_amount_mean',
+                             'user_amount_std', 'user_amount_max',
+                             'user_step_min', 'user_step_max']
+    return out.merge(user_features, on='nameOrig', how='left')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    args = parser.parse_args()
+
+    sample = pd.read_csv(DATA_PATH)
+    detector = HybridFraudDetector()
+
+    print("\nPasses over the batch per predict call:")
+    print("  legacy: 3 groupbys + 3 merges (each merge rebuilds the frame)")
+    print("  shared: 1 factorize + 1 sort + 1 key hash, no merges")
+
+    # Parity
+    df = make_transactions(sample, min(args.rows))
+    legacy = legacy_aggregation(df)
+    stats = AccountAggregates.from_frame(df).row_stats()
+    checks = {
+        'count': np.array_equal(stats['count'], legacy['user_tx_count']),
+        'mean': np.allclose(stats['mean'], legacy['mean']),
+        'std': np.allclose(stats['std'], legacy['std'], equal_nan=True),
+        'max': np.array_equal(stats['max'], legacy['user_amount_max']),
+        'freq': np.array_equal(stats['freq'], legacy['freq']),
+    }
+    print(f"\n🔍 Parity on {len(df):,} rows: " +
+          ", ".join(f"{name} {'ok' if ok else 'MISMATCH'}" for name, ok in checks.items()))
+    if not all(checks.values()):
+        print("❌ Shared aggregation diverges from the legacy groupbys")
+        sys.exit(1)
+
+    # Timing
+    print(f"\n{'rows':>10} {'legacy (s)':>11} {'shared (s)':>11} {'speedup':>8} "
+          f"{'rules+features (s)':>19}")
+    for n_rows in args.rows:
+        df = make_transactions(sample, n_rows)
+        legacy_time, _ = timed(lambda: legacy_aggregation(df), repeats=3)
+        shared_time, _ = timed(lambda: AccountAggregates.from_frame(df).row_stats(), repeats=3)
+
+        def rules_and_features():
+            batch_stats = account_stats(df)
+            detector.rule_engine.detect_anomalies(df, stats=batch_stats)
+            detector.prepare_features(df, stats=batch_stats)
+
+        stage_time, _ = timed(rules_and_features, repeats=3)
+        print(f"{n_rows:>10,} {legacy_time:>11.3f} {shared_time:>11.3f} "
+              f"{legacy_time / shared_time:>7.1f}x {stage_time:>19.3f}")
+
+
+if __name__ == "__main__":
+    main()
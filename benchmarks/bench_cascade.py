@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Benchmark: tiered scoring cascade vs full hybrid scoring
+
+Trains on data/sample_10k.csv, then scores a tiled copy with
+``predict(cascade=False)`` and ``predict(cascade=True)``. Checks that the
+suspicious flags agree, that fully scored rows have identical scores and
+that every skipped row's score bounds hold, then reports the share of rows
+per tier and the measured throughput of both modes.
+
+Usage:
+    python benchmarks/bench_cascade.py [--rows 1000000]
+
+TensorFlow is optional; without it the cascade has two tiers (rules, full).
+"""
+
+import argparse
+import sys
+
+import numpy as np
+import pandas as pd
+
+from _common import DATA_PATH, make_transactions, timed
+
+from ml_engine.models.hybrid_fraud_detector import CASCADE_TIERS, HybridFraudDetector
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    sample = pd.read_csv(DATA_PATH)
+    detector = HybridFraudDetector()
+    detector.train(sample)
+    df = make_transactions(sample, args.rows)
+
+    full_time, full = timed(lambda: detector.predict(df))
+    cascade_time, tiered = timed(lambda: detector.predict(df, cascade=True))
+
+    fully_scored = tiered['scoring_tier'].to_numpy() == CASCADE_TIERS.index('full')
+    checks = {
+        'suspicious flags': np.array_equal(full['is_suspicious'], tiered['is_suspicious']),
+        'full-tier scores': np.array_equal(full['fraud_score'].to_numpy()[fully_scored],
+                                           tiered['fraud_score'].to_numpy()[fully_scored]),
+        'score bounds': bool((tiered['fraud_score'] <= full['fraud_score']).all() and
+                             (full['fraud_score'] <= tiered['fraud_score_max']).all()),
+    }
+    print(f"\n🔍 Parity on {len(df):,} rows: " +
+          ", ".join(f"{name} {'ok' if ok else 'MISMATCH'}" for name, ok in checks.items()))
+
+    report = tiered.attrs['cascade']
+    print("\nRows per tier:")
+    for name, share in report['tiers'].items():
+        print(f"  {name:<8} {share * 100:6.2f}%")
+
+    print(f"\n{'mode':<8} {'time (s)':>9} {'rows/s':>12}")
+    print(f"{'full':<8} {full_time:>9.2f} {len(df) / full_time:>12,.0f}")
+    print(f"{'cascade':<8} {cascade_time:>9.2f} {len(df) / cascade_time:>12,.0f}")
+    print(f"\n⚡ Measured speedup {full_time / cascade_time:.2f}x "
+          f"(cascade's own estimate {report['estimated_speedup']:.2f}x)")
+
+    if not all(checks.values()):
+        print("❌ Cascade changes results")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Benchmark: CSV vs Parquet vs Arrow IPC input and output
+
+Trains on data/sample_10k.csv and tiles it to the requested size. Each
+input format is pushed through the upload path (``utils.uploads``, as a
+multipart body) and scored with ``predict``; every format must give the same
+scores. Then the results are written in each export format. Reports rows/s
+for ingest and scoring, plus export time and file size.
+
+Usage:
+    python benchmarks/bench_columnar_io.py [--rows 1000000]
+"""
+
+import argparse
+import asyncio
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from _common import DATA_PATH, make_transactions
+
+from ml_engine.models.account_dictionary import decode_accounts, encode_accounts
+from ml_engine.models.hybrid_fraud_detector import HybridFraudDetector
+from utils.exports import available_formats, write_export
+from utils.uploads import UploadStream, read_upload
+
+BOUNDARY = b"fraudshield-bench"
+CHUNK_BYTES = 64 * 1024
+
+
+def payloads(df: pd.DataFrame) -> dict:
+    """The transactions serialized in every input format"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    parquet = io.BytesIO()
+    pq.write_table(table, parquet)
+    arrow_file = pa.BufferOutputStream()
+    with pa.ipc.new_file(arrow_file, table.schema) as writer:
+        writer.write_table(table)
+    arrow_stream = pa.BufferOutputStream()
+    with pa.ipc.new_stream(arrow_stream, table.schema) as writer:
+        writer.write_table(table, max_chunksize=64 * 1024)
+    return {
+        "csv": df.to_csv(index=False).encode(),
+        "parquet": parquet.getvalue(),
+        "arrow file": arrow_file.getvalue().to_pybytes(),
+        "arrow stream": arrow_stream.getvalue().to_pybytes(),
+    }
+
+
+def upload(payload: bytes) -> pd.DataFrame:
+    """Parse ``payload`` through the upload path, fed in network-sized chunks"""
+    header = b"--" + BOUNDARY + b"\r\nContent-Disposition: form-data; name=\"file\"; filename=\"f\"\r\n\r\n"
+    trailer = b"\r\n--" + BOUNDARY + b"--\r\n"
+
+    async def body():
+        yield header
+        for start in range(0, len(payload), CHUNK_BYTES):
+            yield payload[start:start + CHUNK_BYTES]
+        yield trailer
+
+    stream = UploadStream(BOUNDARY)
+    result = {}
+    worker = threading.Thread(target=lambda: result.setdefault("df", read_upload(stream)))
+    worker.start()
+    asyncio.run(stream.receive(body()))
+    worker.join()
+    return result["df"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    if "parquet" not in available_formats():
+        print("❌ Columnar formats need pyarrow")
+        sys.exit(1)
+
+    sample = pd.read_csv(DATA_PATH)
+    detector = HybridFraudDetector()
+    detector.train(sample)
+    inputs = payloads(make_transactions(sample, args.rows))
+
+    print(f"\n📥 Ingest + score {args.rows:,} rows")
+    print(f"{'input':>13} {'size (MB)':>10} {'ingest (s)':>11} {'rows/s':>11} {'score (s)':>10} {'rows/s':>11}")
+    expected = None
+    same = True
+    for name, payload in inputs.items():
+        start = time.perf_counter()
+        df = encode_accounts(upload(payload))
+        ingest = time.perf_counter() - start
+        start = time.perf_counter()
+        results = detector.predict(df)
+        score = time.perf_counter() - start
+        print(f"{name:>13} {len(payload) / 1e6:>10.1f} {ingest:>11.2f} {args.rows / ingest:>11,.0f} "
+              f"{score:>10.2f} {args.rows / score:>11,.0f}")
+        scores = results['fraud_score'].to_numpy()
+        if expected is None:
+            expected = scores
+        same &= np.array_equal(scores, expected)
+
+    export_df = decode_accounts(results)
+    print(f"\n📤 Export {args.rows:,} results")
+    print(f"{'format':>13} {'size (MB)':>10} {'write (s)':>10} {'rows/s':>11}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for fmt in available_formats():
+            if fmt == 'xlsx' and args.rows > 200_000:
+                print(f"{fmt:>13}  skipped (above 200,000 rows)")
+                continue
+            path = os.path.join(tmp, f"results.{fmt}")
+            start = time.perf_counter()
+            write_export(export_df, path, fmt)
+            elapsed = time.perf_counter() - start
+            print(f"{fmt:>13} {os.path.getsize(path) / 1e6:>10.1f} {elapsed:>10.2f} {args.rows / elapsed:>11,.0f}")
+
+    print(f"\n🔍 Scores identical across input formats: {'ok' if same else 'MISMATCH'}")
+    if not same:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Benchmark: peak memory of HybridFraudDetector.prepare_features
+
+Tiles data/sample_10k.csv to the requested size, measures the peak of
+Python-visible allocations (NumPy and pandas buffers, via ``tracemalloc``)
+while building the feature matrix, and fails if the peak per 1M rows exceeds
+the budget. The input frame itself is excluded; it must also come out
+unmodified.
+
+Usage:
+    python benchmarks/bench_feature_memory.py [--rows 1000000] [--budget-mb 160]
+
+The budget can also be set with the FEATURE_MEMORY_BUDGET_MB environment
+variable.
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from _common import DATA_PATH, make_transactions
+
+from ml_engine.models.account_profiles import AccountProfileStore
+from ml_engine.models.hybrid_fraud_detector import HybridFraudDetector
+
+
+def measure(fn):
+    """Run ``fn``; return (result, seconds, peak bytes allocated during the call)"""
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--budget-mb", type=float,
+                        default=float(os.getenv("FEATURE_MEMORY_BUDGET_MB", "160")))
+    args = parser.parse_args()
+
+    df = make_transactions(pd.read_csv(DATA_PATH), args.rows)
+    before = df.copy()
+    profiles = AccountProfileStore.from_frame(df)
+    detector = HybridFraudDetector()
+
+    matrix_mb = args.rows * 14 * 4 / 1e6
+    print(f"\n🧮 prepare_features on {args.rows:,} rows "
+          f"(the float32 matrix itself is {matrix_mb:.1f} MB)")
+    print(f"{'mode':<18} {'time (s)':>9} {'peak (MB)':>10} {'MB / 1M rows':>13}")
+
+    failed = False
+    for mode, source in (("batch aggregates", None), ("profile store", profiles)):
+        X, elapsed, peak = measure(lambda: detector.prepare_features(df, source))
+        per_million = peak / 1e6 * 1_000_000 / args.rows
+        print(f"{mode:<18} {elapsed:>9.2f} {peak / 1e6:>10.1f} {per_million:>13.1f}")
+
+        if X.dtype != np.float32 or X.shape != (args.rows, 14):
+            print(f"❌ Unexpected feature matrix {X.dtype} {X.shape}")
+            failed = True
+        if per_million > args.budget_mb:
+            print(f"❌ {mode}: peak exceeds {args.budget_mb:.0f} MB per 1M rows")
+            failed = True
+        del X
+
+    if not df.equals(before):
+        print("❌ prepare_features modified its input frame")
+        failed = True
+
+    if failed:
+        sys.exit(1)
+    print(f"✅ Peak memory within {args.budget_mb:.0f} MB per 1M rows")
+
+
+if __name__ == "__main__":
+    main()
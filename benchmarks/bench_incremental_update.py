@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Benchmark: incremental model update vs full retrain
+
+Trains on a history of transactions, then folds in a daily delta with
+HybridFraudDetector.update and compares the cost and the resulting scores
+with a full retrain on history + delta.
+
+Usage:
+    python benchmarks/bench_incremental_update.py [--history-rows 1000000] [--delta-rows 20000]
+
+The AutoEncoder is skipped in both paths (update keeps it as trained), so the
+comparison covers profiles, scaler and IsolationForest.
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from _common import DATA_PATH, make_transactions
+
+import ml_engine.models.hybrid_fraud_detector as hybrid_fraud_detector
+from ml_engine.models.hybrid_fraud_detector import HybridFraudDetector
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--history-rows", type=int, default=1_000_000)
+    parser.add_argument("--delta-rows", type=int, default=20_000)
+    parser.add_argument("--refresh-fraction", type=float, default=0.2)
+    args = parser.parse_args()
+
+    hybrid_fraud_detector.TENSORFLOW_AVAILABLE = False
+
+    sample = pd.read_csv(DATA_PATH)
+    history = make_transactions(sample, args.history_rows, 0)
+    delta = make_transactions(sample.sample(frac=1, random_state=7), args.delta_rows,
+                              int(history['step'].max()) + 1)
+
+    start = time.perf_counter()
+    detector = HybridFraudDetector()
+    detector.train(history)
+    train_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    updated = detector.update(delta, refresh_fraction=args.refresh_fraction)
+    update_time = time.perf_counter() - start
+
+    full = pd.concat([history, delta], ignore_index=True)
+    start = time.perf_counter()
+    retrained = HybridFraudDetector()
+    retrained.train(full)
+    retrain_time = time.perf_counter() - start
+
+    probe = full.sample(n=min(50_000, len(full)), random_state=0)
+    updated_scores = updated.predict(probe)
+    retrained_scores = retrained.predict(probe)
+    correlation = np.corrcoef(updated_scores['fraud_score'], retrained_scores['fraud_score'])[0, 1]
+    agreement = (updated_scores['is_suspicious'] == retrained_scores['is_suspicious']).mean()
+
+    print(f"\n⏱️  Initial train on {len(history):,} rows: {train_time:8.2f} s")
+    print(f"⏱️  Full retrain on {len(full):,} rows:   {retrain_time:8.2f} s")
+    print(f"⏱️  Update with {len(delta):,} new rows:      {update_time:8.2f} s "
+          f"({retrain_time / update_time:.1f}x faster)")
+    print(f"\n🔍 Update vs retrain on {len(probe):,} rows: fraud_score correlation = "
+          f"{correlation:.4f}, suspicious flag agreement = {agreement * 100:.2f}%")
+
+
+if __name__ == "__main__":
+    main()
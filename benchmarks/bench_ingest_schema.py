@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Benchmark: typed ingestion schema vs inferred ``pd.read_csv``
+
+Writes data/sample_10k.csv tiled to the requested size, then parses it in a
+fresh process per reader: plain ``pd.read_csv`` (inferred int64/float64/
+object dtypes, every column) and ``ml_engine.models.schema.read_transactions``
+with the pandas C parser and with pyarrow (if installed). Account IDs are then
+encoded as at ingest. Reports parse time, peak RSS growth and the final
+frame's memory; every reader must produce the same values.
+
+Usage:
+    python benchmarks/bench_ingest_schema.py [--rows 10000000]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from _common import DATA_PATH, peak_rss_mb
+
+from ml_engine.models.account_dictionary import decode_accounts, encode_accounts
+from ml_engine.models.schema import REQUIRED_COLUMNS, read_transactions
+
+READERS = ("inferred", "schema-c", "schema-pyarrow")
+
+
+def write_transactions(sample: pd.DataFrame, n_rows: int, path: str, tiles_per_write: int = 100):
+    """Write the sample tiled to ``n_rows``, shifting steps so tiles do not overlap"""
+    step_span = sample['step'].max() + 1
+    block = pd.concat([sample] * tiles_per_write, ignore_index=True)
+    block_tile = np.arange(len(block)) // len(sample)
+    with open(path, "w") as f:
+        for start in range(0, n_rows, len(block)):
+            chunk = block.head(n_rows - start).copy()
+            chunk['step'] = chunk['step'] + (block_tile[:len(chunk)] + start // len(sample)) * step_span
+            chunk.to_csv(f, header=start == 0, index=False)
+
+
+def run_worker(reader: str, path: str):
+    """Child process: parse + encode once, print seconds, memory and a checksum"""
+    before = peak_rss_mb()
+    start = time.perf_counter()
+    if reader == "inferred":
+        df = pd.read_csv(path)
+    else:
+        with open(path, "rb") as f:
+            df = read_transactions(f, engine="c" if reader == "schema-c" else "pyarrow")
+    parse_time = time.perf_counter() - start
+    encode_accounts(df)
+    elapsed = time.perf_counter() - start
+    peak = peak_rss_mb()
+
+    # Codes depend on encounter order, so compare account IDs
+    values = decode_accounts(df[list(REQUIRED_COLUMNS)]).astype({'step': 'int64', 'type': object})
+    checksum = int(pd.util.hash_pandas_object(values, index=False).sum())
+    print(json.dumps({
+        "parse_seconds": parse_time,
+        "seconds": elapsed,
+        "peak_mb": peak - before,
+        "frame_mb": df.memory_usage(deep=True).sum() / 2**20,
+        "checksum": checksum,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--worker", nargs=2, metavar=("READER", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(*args.worker)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "transactions.csv")
+        write_transactions(pd.read_csv(DATA_PATH), args.rows, path)
+        print(f"\n📥 Ingesting {args.rows:,} rows ({os.path.getsize(path) / 1e6:,.0f} MB CSV)")
+        print(f"{'reader':>15} {'parse (s)':>10} {'+encode (s)':>12} {'peak RSS (MB)':>14} {'frame (MB)':>11}")
+
+        checksums = set()
+        for reader in READERS:
+            result = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--worker", reader, path],
+                capture_output=True, text=True
+            )
+            if result.returncode != 0:
+                print(f"{reader:>15}  skipped ({result.stderr.strip().splitlines()[-1]})")
+                continue
+            run = json.loads(result.stdout.strip().splitlines()[-1])
+            checksums.add(run["checksum"])
+            print(f"{reader:>15} {run['parse_seconds']:>10.2f} {run['seconds']:>12.2f} "
+                  f"{run['peak_mb']:>14,.0f} {run['frame_mb']:>11,.0f}")
+
+    if len(checksums) != 1:
+        print("❌ Readers disagree on the parsed values")
+        sys.exit(1)
+    print("🔍 Parsed values match")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Benchmark: flattened-array IsolationForest vs sklearn score_samples
+
+Checks that FlatIsolationForest reproduces sklearn's scores on the sample
+data, then times both at several batch sizes.
+
+Usage:
+    python benchmarks/bench_isolation_forest.py [--sizes 1 100 10000 1000000]
+"""
+
+import argparse
+import sys
+
+import numpy as np
+import pandas as pd
+
+from _common import DATA_PATH, timed
+
+from ml_engine.models.hybrid_fraud_detector import HybridFraudDetector
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 100, 10_000, 1_000_000])
+    args = parser.parse_args()
+
+    df = pd.read_csv(DATA_PATH)
+    detector = HybridFraudDetector()
+    detector.train(df)
+
+    X = detector.prepare_features(df)
+    X_scaled = detector.scaler.transform(X)
+    sklearn_forest = detector.isolation_forest
+    flat_forest = detector.flat_forest
+
+    # Parity
+    expected = sklearn_forest.score_samples(X_scaled)
+    actual = flat_forest.score_samples(X_scaled)
+    max_diff = float(np.abs(expected - actual).max())
+    labels_match = np.array_equal(sklearn_forest.predict(X_scaled), flat_forest.predict(X_scaled))
+    print(f"\n🔍 Parity on {len(X_scaled):,} rows: max |Δscore| = {max_diff:.2e}, "
+          f"labels match = {labels_match}")
+    if max_diff > 1e-12 or not labels_match:
+        print("❌ Flat forest diverges from sklearn")
+        sys.exit(1)
+
+    # Timing
+    print(f"\n{'rows':>10} {'sklearn (ms)':>14} {'flat (ms)':>12} {'speedup':>9}")
+    for size in args.sizes:
+        batch = np.resize(X_scaled, (size, X_scaled.shape[1]))
+        repeats = 20 if size <= 10_000 else 1
+        sklearn_time, _ = timed(lambda: sklearn_forest.score_samples(batch), repeats)
+        flat_time, _ = timed(lambda: flat_forest.score_samples(batch), repeats)
+        print(f"{size:>10,} {sklearn_time * 1000:>14.2f} {flat_time * 1000:>12.2f} "
+              f"{sklearn_time / flat_time:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
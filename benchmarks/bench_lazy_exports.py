@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Benchmark: eager result exports vs lazy, cached exports
+
+Scores data/sample_10k.csv tiled to the requested size, then compares what
+/api/detect used to spend writing every export format up front with what it
+spends now (registering the results with ``utils.exports.ExportStore``).
+For each format it also reports the first download (written on demand; for
+CSV, time to the first streamed chunk and to the last) and a repeated,
+cached one. Downloaded files must match the eager ones.
+
+Usage:
+    python benchmarks/bench_lazy_exports.py [--rows 200000]
+"""
+
+import argparse
+import filecmp
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from _common import DATA_PATH, make_transactions
+
+from ml_engine.models.account_dictionary import decode_accounts, encode_accounts
+from ml_engine.models.hybrid_fraud_detector import HybridFraudDetector
+from utils.exports import ExportStore, available_formats, write_export
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    args = parser.parse_args()
+
+    sample = pd.read_csv(DATA_PATH)
+    detector = HybridFraudDetector()
+    detector.train(sample)
+    results = detector.predict(encode_accounts(make_transactions(sample, args.rows)))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        eager_dir = os.path.join(tmp, "eager")
+        os.makedirs(eager_dir)
+        eager = {}
+        start = time.perf_counter()
+        export_df = decode_accounts(results)
+        for fmt in available_formats():
+            fmt_start = time.perf_counter()
+            write_export(export_df, os.path.join(eager_dir, f"results.{fmt}"), fmt)
+            eager[fmt] = time.perf_counter() - fmt_start
+        eager_total = time.perf_counter() - start
+
+        store = ExportStore(os.path.join(tmp, "lazy"), prepare=decode_accounts)
+        start = time.perf_counter()
+        files = store.register(results)
+        lazy_total = time.perf_counter() - start
+
+        print(f"\n⏱️  Export work inside /api/detect for {args.rows:,} rows")
+        print(f"  eager (all formats): {eager_total:8.2f} s")
+        print(f"  lazy (register):     {lazy_total * 1000:8.2f} ms")
+
+        print("\n📥 Downloads")
+        print(f"{'format':>8} {'eager write (s)':>16} {'first byte (s)':>15} {'first (s)':>10} {'cached (s)':>11}")
+        same = True
+        for fmt, filename in files.items():
+            start = time.perf_counter()
+            if fmt == 'csv':
+                chunks = store.stream_csv(filename)
+                next(chunks)
+                first_byte = time.perf_counter() - start
+                for _ in chunks:
+                    pass
+            else:
+                store.export(filename)
+                first_byte = time.perf_counter() - start
+            first = time.perf_counter() - start
+
+            start = time.perf_counter()
+            path = store.cached(filename)
+            with open(path, "rb") as f:
+                while f.read(1 << 20):
+                    pass
+            cached = time.perf_counter() - start
+
+            print(f"{fmt:>8} {eager[fmt]:>16.2f} {first_byte:>15.2f} {first:>10.2f} {cached:>11.3f}")
+            if fmt in ('csv', 'arrow'):
+                same &= filecmp.cmp(path, os.path.join(eager_dir, f"results.{fmt}"), shallow=False)
+            else:
+                # XLSX and Parquet embed write times/metadata; compare contents
+                read = pd.read_excel if fmt == 'xlsx' else pd.read_parquet
+                same &= read(path).equals(read(os.path.join(eager_dir, f"results.{fmt}")))
+
+    print(f"\n🔍 Lazy exports match eager ones: {'ok' if same else 'MISMATCH'}")
+    if not same:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
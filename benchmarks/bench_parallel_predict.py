@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark: account-partitioned multi-process predict
+
+Trains on data/sample_10k.csv, tiles it to the requested size (account IDs
+encoded as at ingest) and scores it with ``predict(workers=n)`` for each
+worker count. Every run must equal single-process ``predict`` exactly;
+reports throughput and parallel efficiency (speedup / workers). Each pool is
+started, and the model written for its workers, by an untimed warm-up call;
+that one-off cost is reported separately.
+
+Usage:
+    python benchmarks/bench_parallel_predict.py [--rows 10000000] [--workers 1 2 4 8]
+
+The default worker counts are powers of two up to the number of CPUs;
+scaling needs a machine with more than one.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+from _common import DATA_PATH, make_transactions, timed
+
+from ml_engine.models.account_dictionary import encode_accounts
+from ml_engine.models.hybrid_fraud_detector import HybridFraudDetector
+from ml_engine.models.partitioning import start_method
+
+
+def default_workers():
+    cpus = os.cpu_count() or 1
+    counts = [1]
+    while counts[-1] * 2 <= cpus:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != cpus:
+        counts.append(cpus)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=default_workers())
+    args = parser.parse_args()
+
+    sample = pd.read_csv(DATA_PATH)
+    detector = HybridFraudDetector()
+    detector.train(sample)
+    df = encode_accounts(make_transactions(sample, args.rows))
+
+    start = time.perf_counter()
+    expected = detector.predict(df)
+    base_time = time.perf_counter() - start
+
+    print(f"\n⚙️  predict on {args.rows:,} rows, {os.cpu_count()} CPUs, {start_method()} workers")
+    if (os.cpu_count() or 1) < 2:
+        print("⚠️  One CPU: workers time-share it, so this shows overhead, not scaling")
+    print(f"{'workers':>7} {'time (s)':>9} {'rows/s':>12} {'speedup':>8} {'efficiency':>11} {'parity':>7}")
+    print(f"{'serial':>7} {base_time:>9.2f} {args.rows / base_time:>12,.0f} {1:>7.2f}x {1:>11.0%} {'-':>7}")
+
+    failed = False
+    for workers in args.workers:
+        warmup, _ = timed(lambda: detector.predict(df.head(1000), workers=workers))
+        start = time.perf_counter()
+        result = detector.predict(df, workers=workers)
+        elapsed = time.perf_counter() - start
+        same = result.equals(expected)
+        failed |= not same
+        speedup = base_time / elapsed
+        print(f"{workers:>7} {elapsed:>9.2f} {args.rows / elapsed:>12,.0f} "
+              f"{speedup:>7.2f}x {speedup / workers:>11.0%} {'ok' if same else 'DIFF':>7}"
+              f"  (pool start + model write {warmup:.2f} s)")
+        del result
+
+    if failed:
+        print("❌ Partitioned predict changes results")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
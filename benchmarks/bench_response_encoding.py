@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Benchmark: analyze response encoding, row objects vs columnar + compressed
+
+Builds a synthetic scored run of the requested size and times producing the
+``transactions`` part of an /api/analyze response for all of it:
+
+- the previous path: ``iterrows()`` with per-field casts into a list of
+  dicts, then FastAPI's ``jsonable_encoder`` and ``JSONResponse``
+- ``utils.result_store`` pages (rows and columns layouts) encoded by
+  ``utils.responses.json_response``, uncompressed, gzip and brotli
+
+Reports CPU time and bytes on the wire; every variant must decode to the
+same transactions.
+
+Usage:
+    python benchmarks/bench_response_encoding.py [--rows 100000]
+"""
+
+import argparse
+import gzip
+import json
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from _common import timed
+
+from utils import responses
+from utils.helpers import get_risk_level
+from utils.result_store import ResultStore
+
+TYPES = np.array(['PAYMENT', 'TRANSFER', 'CASH_OUT', 'DEBIT', 'CASH_IN'], dtype=object)
+REPEATS = 3
+
+
+def make_results(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    """A scored run shaped like /api/analyze results"""
+    rng = np.random.default_rng(seed)
+    fraud_score = rng.beta(2, 6, n_rows)
+    suspicious = fraud_score > 0.5
+    accounts = np.array([f"C{i:09d}" for i in range(max(n_rows // 3, 1))], dtype=object)
+    return pd.DataFrame({
+        'transaction_id': np.arange(1, n_rows + 1),
+        'step': rng.integers(1, 744, n_rows).astype(np.int32),
+        'type': TYPES[rng.integers(0, len(TYPES), n_rows)],
+        'amount': np.round(rng.lognormal(10, 1.5, n_rows), 2),
+        'nameOrig': accounts[rng.integers(0, len(accounts), n_rows)],
+        'nameDest': accounts[rng.integers(0, len(accounts), n_rows)],
+        'fraud_score': fraud_score,
+        'ml_score': rng.random(n_rows),
+        'rule_score': np.round(rng.random(n_rows), 1),
+        'is_suspicious': suspicious.astype(np.int64),
+        'risk_level': [get_risk_level(score) for score in fraud_score],
+        'explanation': np.where(suspicious, "High-risk transaction type: TRANSFER", ""),
+    })
+
+
+def previous(df: pd.DataFrame) -> bytes:
+    transactions = []
+    for _, row in df.iterrows():
+        transactions.append({
+            "transaction_id": int(row['transaction_id']),
+            "step": int(row['step']),
+            "type": row['type'],
+            "amount": float(row['amount']),
+            "nameOrig": row['nameOrig'],
+            "nameDest": row['nameDest'],
+            "fraud_score": float(row['fraud_score']),
+            "ml_score": float(row['ml_score']),
+            "rule_score": float(row['rule_score']),
+            "is_suspicious": bool(row['is_suspicious']),
+            "risk_level": row['risk_level'],
+            "explanation": row['explanation'],
+        })
+    return JSONResponse(content=jsonable_encoder({"transactions": transactions})).body
+
+
+def decode(body: bytes, encoding) -> list:
+    if encoding == 'br':
+        body = responses.brotli.decompress(body)
+    elif encoding == 'gzip':
+        body = gzip.decompress(body)
+    transactions = json.loads(body)["transactions"]
+    if isinstance(transactions, dict):
+        transactions = [dict(zip(transactions, row)) for row in zip(*transactions.values())]
+    return transactions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    df = make_results(args.rows)
+    encoder = "orjson" if responses.orjson is not None else "json"
+    print(f"\n📦 {args.rows:,} transactions (encoder: {encoder}, "
+          f"brotli: {'yes' if responses.brotli is not None else 'not installed'})")
+    print(f"{'variant':>30} {'CPU (ms)':>9} {'bytes':>12}")
+
+    base_time, base_body = timed(lambda: previous(df), REPEATS, time.process_time)
+    expected = decode(base_body, None)
+    print(f"{'iterrows + jsonable_encoder':>30} {base_time * 1000:>9.0f} {len(base_body):>12,}")
+
+    same = True
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ResultStore(tmp)
+        result_id = store.save(df)
+        store.query(result_id)  # open the memory maps
+
+        variants = [("rows", "identity"), ("columns", "identity"),
+                    ("columns", "gzip"), ("columns", "br")]
+        for layout, accept in variants:
+            if accept == "br" and responses.brotli is None:
+                continue
+
+            def build():
+                page = store.query(result_id, limit=args.rows, columnar=layout == "columns")
+                return responses.json_response({"transactions": page["transactions"]}, accept)
+
+            elapsed, response = timed(build, REPEATS, time.process_time)
+            encoding = response.headers.get("content-encoding")
+            same &= decode(response.body, encoding) == expected
+            name = f"{layout} + {encoding or 'uncompressed'}"
+            print(f"{name:>30} {elapsed * 1000:>9.0f} {len(response.body):>12,}  "
+                  f"({base_time / elapsed:.0f}x CPU, {len(base_body) / len(response.body):.0f}x bytes)")
+
+    print(f"\n🔍 All variants decode to the same transactions: {'ok' if same else 'MISMATCH'}")
+    if not same:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
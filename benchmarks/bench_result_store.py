@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Benchmark: paginated queries on the server-side result store
+
+Saves a synthetic scored run of the requested size (scores, risk levels,
+types and account IDs shaped like /api/analyze output) with
+``utils.result_store.ResultStore`` and times typical dashboard queries: the
+first page, a deep page, top-K by fraud_score (argpartition) against a full
+sort, and filtered pages. Every sorted page must equal the same slice of a
+full stable sort.
+
+Usage:
+    python benchmarks/bench_result_store.py [--rows 5000000]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from _common import timed
+
+from utils.helpers import get_risk_level
+from utils.result_store import ResultStore
+
+TYPES = np.array(['PAYMENT', 'TRANSFER', 'CASH_OUT', 'DEBIT', 'CASH_IN'], dtype=object)
+REPEATS = 5
+
+
+def make_results(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    """A scored run with realistic cardinalities (rounded scores, so ties occur)"""
+    rng = np.random.default_rng(seed)
+    fraud_score = np.round(rng.beta(2, 6, n_rows), 4)
+    suspicious = fraud_score > 0.5
+    n_accounts = max(n_rows // 3, 1)
+    accounts = np.array([f"C{i:09d}" for i in range(n_accounts)], dtype=object)
+    risk_levels = {score: get_risk_level(score) for score in np.unique(fraud_score)}
+    return pd.DataFrame({
+        'transaction_id': np.arange(1, n_rows + 1),
+        'step': rng.integers(1, 744, n_rows).astype(np.int32),
+        'type': pd.Categorical(TYPES[rng.integers(0, len(TYPES), n_rows)]),
+        'amount': np.round(rng.lognormal(10, 1.5, n_rows), 2),
+        'nameOrig': accounts[rng.integers(0, n_accounts, n_rows)],
+        'nameDest': accounts[rng.integers(0, n_accounts, n_rows)],
+        'fraud_score': fraud_score,
+        'ml_score': fraud_score,
+        'rule_score': np.round(rng.random(n_rows), 1),
+        'is_suspicious': suspicious.astype(np.int64),
+        'risk_level': pd.Series(fraud_score).map(risk_levels).to_numpy(),
+        'explanation': np.where(suspicious, "High-risk transaction type: TRANSFER", ""),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    args = parser.parse_args()
+
+    df = make_results(args.rows)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ResultStore(tmp)
+        start = time.perf_counter()
+        result_id = store.save(df)
+        save_time = time.perf_counter() - start
+        disk = sum(os.path.getsize(os.path.join(tmp, result_id, name))
+                   for name in os.listdir(os.path.join(tmp, result_id)))
+        print(f"\n💾 Saved {args.rows:,} rows in {save_time:.2f} s ({disk / 1e6:,.0f} MB on disk, "
+              f"{df.memory_usage(deep=True).sum() / 1e6:,.0f} MB as a DataFrame)")
+
+        account = df['nameOrig'].iloc[args.rows // 2]
+        queries = [
+            ("first page (file order)", {}),
+            ("deep page (file order)", {"offset": args.rows // 2}),
+            ("top 100 by fraud_score", {"sort": "fraud_score"}),
+            ("page 50 by fraud_score", {"sort": "fraud_score", "offset": 5000}),
+            ("HIGH+CRITICAL TRANSFERs", {"sort": "fraud_score", "risk_levels": ["HIGH", "CRITICAL"],
+                                         "types": ["TRANSFER"]}),
+            ("one account", {"account": account}),
+            ("suspicious by amount", {"sort": "amount", "suspicious": True}),
+        ]
+
+        print(f"\n🔎 Queries (100 rows per page, best of {REPEATS})")
+        print(f"{'query':>26} {'time (ms)':>10} {'matching':>12}")
+        store.query(result_id)  # open the memory maps
+        for name, params in queries:
+            elapsed, page = timed(lambda: store.query(result_id, **params), REPEATS)
+            print(f"{name:>26} {elapsed * 1000:>10.1f} {page['total']:>12,}")
+
+        # Top-K by partial selection vs sorting every row
+        scores = df['fraud_score'].to_numpy()
+        full_time, order = timed(lambda: np.argsort(-scores, kind='stable'), REPEATS)
+        part_time, page = timed(lambda: store.query(result_id, sort="fraud_score", limit=100), REPEATS)
+        print(f"\n🏁 Top 100 by fraud_score: full argsort {full_time * 1000:.1f} ms, "
+              f"store query {part_time * 1000:.1f} ms")
+
+        same = [row['transaction_id'] for row in page['transactions']] == \
+            df['transaction_id'].to_numpy()[order[:100]].tolist()
+        deep = store.query(result_id, sort="fraud_score", offset=5000, limit=100)
+        same &= [row['transaction_id'] for row in deep['transactions']] == \
+            df['transaction_id'].to_numpy()[order[5000:5100]].tolist()
+        amount = df['amount'].to_numpy()
+        suspicious = np.flatnonzero(df['is_suspicious'].to_numpy() == 1)
+        by_amount = suspicious[np.argsort(amount[suspicious], kind='stable')][:100]
+        page = store.query(result_id, sort="amount", descending=False, suspicious=True)
+        same &= [row['transaction_id'] for row in page['transactions']] == \
+            df['transaction_id'].to_numpy()[by_amount].tolist()
+
+    print(f"🔍 Sorted pages match a full stable sort: {'ok' if same else 'MISMATCH'}")
+    if not same:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark: cold-start import cost of the backend API
+
+Imports backend/main.py in fresh interpreters, reports the most expensive
+top-level packages (from ``python -X importtime``) and fails if the import
+exceeds the startup budget or pulls in training-only dependencies.
+
+Usage:
+    python benchmarks/bench_startup.py [--budget-ms 1500] [--runs 3]
+
+The budget can also be set with the STARTUP_BUDGET_MS environment variable.
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+from typing import Dict, Tuple
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend")
+
+# Must not be imported just to serve requests with a trained model
+TRAINING_ONLY_MODULES = ["tensorflow", "shap", "sklearn"]
+
+PROBE = (
+    "import sys, time\n"
+    "start = time.perf_counter()\n"
+    "import main\n"
+    "print('IMPORT_MS', (time.perf_counter() - start) * 1000)\n"
+    "print('LOADED', ','.join(m for m in {modules!r} if m in sys.modules))\n"
+)
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+\d+ \|\s*(\S+)")
+
+
+def run_probe() -> Tuple[float, list, Dict[str, float]]:
+    """Import main once; return (import ms, heavy modules loaded, per-package self ms)"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE.format(modules=TRAINING_ONLY_MODULES)],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+    )
+
+    import_ms = float(re.search(r"IMPORT_MS ([\d.]+)", result.stdout).group(1))
+    loaded = re.search(r"LOADED (.*)", result.stdout).group(1)
+    loaded = [name for name in loaded.split(",") if name]
+
+    # Sum each module's own import time into its top-level package
+    packages = {}
+    for match in IMPORTTIME_LINE.finditer(result.stderr):
+        self_us, name = int(match.group(1)), match.group(2)
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0.0) + self_us / 1000
+
+    return import_ms, loaded, packages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--budget-ms", type=float,
+                        default=float(os.getenv("STARTUP_BUDGET_MS", "1500")))
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    runs = [run_probe() for _ in range(args.runs)]
+    import_ms, loaded, packages = min(runs, key=lambda run: run[0])
+
+    print(f"\n📦 Import cost by top-level package (best of {args.runs} runs):")
+    for package, cost in sorted(packages.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {package:<24} {cost:>9.1f} ms")
+
+    print(f"\n⏱️  import main: {import_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+
+    failed = False
+    if loaded:
+        print(f"❌ Training-only modules imported at startup: {', '.join(loaded)}")
+        failed = True
+    if import_ms > args.budget_ms:
+        print(f"❌ Startup exceeds budget by {import_ms - args.budget_ms:.1f} ms")
+        failed = True
+
+    if failed:
+        sys.exit(1)
+    print("✅ Startup within budget")
+
+
+if __name__ == "__main__":
+    main()
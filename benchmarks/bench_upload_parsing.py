@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Benchmark: streaming upload parsing vs read-then-parse
+
+Tiles data/sample_10k.csv to the requested size (plain and gzip) and
+"uploads" it as a multipart body in 64 KB chunks, optionally throttled to a
+network rate. The previous path collects the whole body (``await
+file.read()``) and then runs ``pd.read_csv``; the streaming path parses it
+with ``utils.uploads`` and the ingestion schema while it arrives. Each run
+happens in a fresh process so peak RSS is comparable; parsed values must
+match.
+
+Usage:
+    python benchmarks/bench_upload_parsing.py [--rows 2000000] [--mbps 0]
+"""
+
+import argparse
+import asyncio
+import gzip
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import pandas as pd
+
+from _common import DATA_PATH, make_transactions, peak_rss_mb
+
+from ml_engine.models.schema import REQUIRED_COLUMNS
+from utils.uploads import UploadStream, read_upload
+
+BOUNDARY = b"fraudshield-bench"
+CHUNK_BYTES = 64 * 1024
+
+
+async def multipart_body(path: str, mbps: float):
+    """The file as a multipart request body, in chunks, at ``mbps`` (0 = unthrottled)"""
+    yield (b"--" + BOUNDARY + b"\r\nContent-Disposition: form-data; name=\"file\"; "
+           b"filename=\"" + os.path.basename(path).encode() + b"\"\r\n\r\n")
+    with open(path, "rb") as f:
+        while chunk := f.read(CHUNK_BYTES):
+            if mbps:
+                await asyncio.sleep(len(chunk) * 8 / (mbps * 1e6))
+            yield chunk
+    yield b"\r\n--" + BOUNDARY + b"--\r\n"
+
+
+async def read_then_parse(path: str, mbps: float) -> pd.DataFrame:
+    upload = UploadStream(BOUNDARY, max_buffered=1 << 62)
+    reader = asyncio.create_task(upload.receive(multipart_body(path, mbps)))
+    await reader
+    contents = upload.read()
+    upload.close()
+    if contents[:2] == b"\x1f\x8b":
+        contents = gzip.decompress(contents)
+    return pd.read_csv(io.BytesIO(contents))
+
+
+async def stream_parse(path: str, mbps: float) -> pd.DataFrame:
+    upload = UploadStream(BOUNDARY)
+    result = {}
+    worker = threading.Thread(target=lambda: result.setdefault("df", read_upload(upload)))
+    worker.start()
+    await upload.receive(multipart_body(path, mbps))
+    await asyncio.to_thread(worker.join)
+    return result["df"]
+
+
+def run_worker(mode: str, path: str, mbps: float):
+    """Child process: parse once, print seconds, peak RSS growth and a checksum"""
+    before = peak_rss_mb()
+    start = time.perf_counter()
+    fn = stream_parse if mode == "stream" else read_then_parse
+    df = asyncio.run(fn(path, mbps))
+    elapsed = time.perf_counter() - start
+    peak = peak_rss_mb()
+    # The streaming path applies the ingestion schema; compare values
+    values = df[list(REQUIRED_COLUMNS)].astype({'step': 'int64', 'type': object,
+                                                'nameOrig': object, 'nameDest': object})
+    checksum = int(pd.util.hash_pandas_object(values, index=False).sum())
+    print(json.dumps({"seconds": elapsed, "peak_mb": peak - before,
+                      "rows": len(df), "checksum": checksum}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--mbps", type=float, default=0,
+                        help="Simulated network rate in Mbit/s (0 = unthrottled)")
+    parser.add_argument("--worker", nargs=2, metavar=("MODE", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(*args.worker, args.mbps)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "transactions.csv")
+        make_transactions(pd.read_csv(DATA_PATH), args.rows).to_csv(csv_path, index=False)
+        gz_path = csv_path + ".gz"
+        with open(csv_path, "rb") as src, gzip.open(gz_path, "wb", compresslevel=6) as dst:
+            while chunk := src.read(1 << 24):
+                dst.write(chunk)
+
+        rate = f"{args.mbps:g} Mbit/s" if args.mbps else "unthrottled"
+        print(f"\n📤 Uploading {args.rows:,} rows ({rate})")
+        print(f"{'input':>6} {'size (MB)':>10} {'path':>16} {'time (s)':>9} {'peak RSS (MB)':>14}")
+
+        failed = False
+        for label, path in (("csv", csv_path), ("gzip", gz_path)):
+            runs = {}
+            for mode, name in (("read", "read-then-parse"), ("stream", "streaming")):
+                output = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), "--mbps", str(args.mbps),
+                     "--worker", mode, path],
+                    check=True, capture_output=True, text=True
+                ).stdout
+                runs[mode] = json.loads(output.strip().splitlines()[-1])
+                print(f"{label:>6} {os.path.getsize(path) / 1e6:>10.1f} {name:>16} "
+                      f"{runs[mode]['seconds']:>9.2f} {runs[mode]['peak_mb']:>14.0f}")
+            if runs["read"]["checksum"] != runs["stream"]["checksum"]:
+                print(f"❌ {label}: parsed frames differ")
+                failed = True
+
+        if failed:
+            sys.exit(1)
+        print("🔍 Parsed frames match")
+
+
+if __name__ == "__main__":
+    main()
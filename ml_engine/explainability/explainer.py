@@ -1,72 +1,253 @@
 """
 FraudShield AI - Explainability Module
-SHAP-based explanations for fraud predictions
+Path-based feature attributions for fraud predictions
 """
 
+import threading
+import uuid
+from collections import OrderedDict
 import numpy as np
 import pandas as pd
-import shap
-from typing import Dict, List
+from typing import Dict, List, Optional
 import warnings
 warnings.filterwarnings('ignore')
 
 
-class FraudExplainer:
-    """Generate explanations for fraud predictions"""
-
-    def __init__(self, model, feature_columns: List[str]):
-        self.model = model
-        self.feature_columns = feature_columns
-        self.explainer = None
+class AttributionCache:
+    """
+    LRU cache of per-row attributions, shared by every explainer in the process
+
+    Keys are (explainer version, row bytes), where the row is the float32
+    feature vector the forest compares against its thresholds. Rounding to
+    float32 is the quantization: rows with the same key take the same path
+    through every tree, so a hit returns exactly what recomputing would.
+    """
+
+    def __init__(self, maxsize: int = 50_000):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def resize(self, maxsize: int):
+        """Change the capacity, evicting least recently used entries if needed"""
+        with self._lock:
+            self.maxsize = maxsize
+            while len(self._entries) > max(maxsize, 0):
+                self._entries.popitem(last=False)
+
+    def get_many(self, keys: List) -> List[Optional[np.ndarray]]:
+        """Cached value per key (None on a miss), marking hits as recently used"""
+        with self._lock:
+            values = []
+            for key in keys:
+                value = self._entries.get(key)
+                if value is not None:
+                    self._entries.move_to_end(key)
+                values.append(value)
+            found = sum(value is not None for value in values)
+            self.hits += found
+            self.misses += len(keys) - found
+            return values
+
+    def put_many(self, keys: List, values):
+        """
+        Cache a value per key
 
-    def initialize_explainer(self, X_background: np.ndarray, max_samples: int = 100):
-        """Initialize SHAP explainer with background data"""
-        # Use a subset for efficiency
-        background_sample = X_background[:max_samples] if len(X_background) > max_samples else X_background
+        Each value is stored as its own copy: a row view would keep the whole
+        array it came from alive for as long as any of its rows is cached.
+        """
+        with self._lock:
+            if self.maxsize <= 0:
+                return
+            for key, value in zip(keys, values):
+                self._entries[key] = np.array(value, copy=True)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+
+# The cache used by explainers unless they are given their own
+ATTRIBUTION_CACHE = AttributionCache()
 
-        # Use KernelExplainer for compatibility with sklearn models
-        self.explainer = shap.KernelExplainer(
-            lambda x: self.model.predict_proba(x)[:, 1] if hasattr(self.model, 'predict_proba')
-            else self.model.decision_function(x),
-            background_sample
-        )
 
-    def explain_prediction(self, X: np.ndarray, max_display: int = 5) -> Dict:
+class FraudExplainer:
+    """
+    Generate explanations for fraud predictions
+
+    Attributions come straight from the IsolationForest's tree paths: a row's
+    average path length is split up by the features whose splits isolated it
+    (``FlatIsolationForest.path_attributions``), and compared with the average
+    split-up of a background set. A feature's contribution is how many levels
+    shorter than usual it made the path; positive values push the row towards
+    an anomaly. Contributions sum to the row's path-length shortfall, and a
+    batch costs about as much as scoring it.
+
+    The background is summarized once per model by k-means: centroids
+    weighted by cluster size stand in for the training rows. Each explainer
+    gets a fresh ``version`` when its background is built, which keys its
+    entries in the attribution cache.
+    """
+
+    def __init__(self, model, feature_columns: List[str], scaler=None,
+                 cache: Optional[AttributionCache] = None):
         """
-        Generate SHAP-based explanation for a single prediction
+        Args:
+            model: FlatIsolationForest to explain
+            feature_columns: Feature names, in feature matrix order
+            scaler: Transform applied to features before the forest sees them;
+                explanations take (and report) the untransformed values
+            cache: Attribution cache (default: the process-wide ATTRIBUTION_CACHE)
+        """
+        self.model = model
+        self.feature_columns = feature_columns
+        self.scaler = scaler
+        self.cache = cache if cache is not None else ATTRIBUTION_CACHE
+        self.version: Optional[str] = None
+        # k-means centroids (in forest input space) and their weights
+        self.background: Optional[np.ndarray] = None
+        self.background_weights: Optional[np.ndarray] = None
+        self.baseline: Optional[np.ndarray] = None
+        self.background_rows = 0
+
+    def _forest_input(self, X: np.ndarray) -> np.ndarray:
+        return self.scaler.transform(X) if self.scaler is not None else X
+
+    def initialize_explainer(self, X_background: np.ndarray, n_clusters: int = 32,
+                             max_samples: int = 10_000, random_state: int = 0):
+        """
+        Summarize background data with k-means and compute the baseline attribution
 
-        Returns:
-            Dictionary with feature contributions
+        Args:
+            X_background: Background feature rows (e.g. the training set)
+            n_clusters: Number of centroids to keep
+            max_samples: Rows to cluster, sampled from ``X_background``
+            random_state: Seed for sampling and clustering
         """
-        if self.explainer is None:
-            return {"error": "Explainer not initialized"}
+        from sklearn.cluster import KMeans
+
+        if len(X_background) > max_samples:
+            rows = np.random.default_rng(random_state).choice(
+                len(X_background), max_samples, replace=False
+            )
+            X_background = X_background[np.sort(rows)]
+        X_forest = np.asarray(self._forest_input(X_background), dtype=np.float64)
 
-        try:
-            shap_values = self.explainer.shap_values(X, nsamples=100)
+        kmeans = KMeans(n_clusters=min(n_clusters, len(X_forest)), n_init=1,
+                        random_state=random_state).fit(X_forest)
+        weights = np.bincount(kmeans.labels_, minlength=kmeans.n_clusters).astype(np.float64)
 
-            # Get top contributing features
-            if isinstance(shap_values, list):
-                shap_values = shap_values[0]
+        self.set_background(kmeans.cluster_centers_, weights / weights.sum(), len(X_forest))
+
+    def set_background(self, background: np.ndarray, weights: np.ndarray, background_rows: int,
+                       version: Optional[str] = None):
+        """
+        Use a summarized background (forest input space) and derive the baseline
 
-            abs_shap = np.abs(shap_values[0])
-            top_indices = np.argsort(abs_shap)[-max_display:][::-1]
+        Args:
+            background: Centroids, one row each
+            weights: Share of background rows per centroid (sums to 1)
+            background_rows: Number of rows the centroids summarize
+            version: Explainer version to keep (e.g. when loading a saved
+                model); a new one is generated by default
+        """
+        credit = self.model.path_attributions(background, len(self.feature_columns))
+        self.background = background
+        self.background_weights = weights
+        self.background_rows = background_rows
+        self.baseline = weights @ credit
+        self.version = version or uuid.uuid4().hex
+
+    def attributions(self, X: np.ndarray) -> np.ndarray:
+        """
+        Per-feature contributions to the anomaly score
 
-            contributions = {}
-            for idx in top_indices:
-                feature_name = self.feature_columns[idx]
-                contribution = float(shap_values[0][idx])
-                feature_value = float(X[0][idx])
+        Rows already explained under this model version come from the
+        attribution cache; the rest are computed in one batch and cached.
 
-                contributions[feature_name] = {
-                    'value': feature_value,
+        Returns:
+            (n_rows x n_features) array in path-length levels; positive means
+            the feature made the row look more anomalous than the background
+        """
+        if self.baseline is None:
+            raise ValueError("Explainer not initialized")
+
+        X_forest = np.ascontiguousarray(self._forest_input(X), dtype=np.float32)
+        keys = [(self.version, row.tobytes()) for row in X_forest]
+        cached = self.cache.get_many(keys)
+
+        result = np.empty((len(X_forest), len(self.feature_columns)))
+        missing = [i for i, value in enumerate(cached) if value is None]
+        for i, value in enumerate(cached):
+            if value is not None:
+                result[i] = value
+
+        if missing:
+            computed = self.baseline - self.model.path_attributions(
+                X_forest[missing], len(self.feature_columns)
+            )
+            result[missing] = computed
+            self.cache.put_many([keys[i] for i in missing], computed)
+
+        return result
+
+    def top_contributions(self, X: np.ndarray, contributions: np.ndarray,
+                          max_display: int = 5) -> List[Dict]:
+        """Largest contributions per row, as {feature: {value, contribution, impact}}"""
+        k = min(max_display, contributions.shape[1])
+        top = np.argpartition(-np.abs(contributions), k - 1, axis=1)[:, :k]
+        # Order the k picks by magnitude
+        picked = np.take_along_axis(np.abs(contributions), top, axis=1)
+        top = np.take_along_axis(top, np.argsort(-picked, axis=1, kind='stable'), axis=1)
+
+        explanations = []
+        for row, indices in enumerate(top.tolist()):
+            explanation = {}
+            for idx in indices:
+                contribution = float(contributions[row, idx])
+                explanation[self.feature_columns[idx]] = {
+                    'value': float(X[row, idx]),
                     'contribution': contribution,
                     'impact': 'increases' if contribution > 0 else 'decreases'
                 }
+            explanations.append(explanation)
+        return explanations
+
+    def explain_batch(self, X: np.ndarray, max_display: int = 5) -> List[Dict]:
+        """Top feature contributions for every row of ``X``"""
+        return self.top_contributions(X, self.attributions(X), max_display)
 
-            return contributions
+    def explain_prediction(self, X: np.ndarray, max_display: int = 5) -> Dict:
+        """
+        Generate an explanation for a single prediction
 
-        except Exception as e:
-            return {"error": f"SHAP explanation failed: {str(e)}"}
+        Returns:
+            Dictionary with feature contributions
+        """
+        if self.baseline is None:
+            return {"error": "Explainer not initialized"}
+        return self.explain_batch(X[:1], max_display)[0]
 
     def generate_text_explanation(self, row: pd.Series, shap_contributions: Dict = None) -> str:
         """
@@ -74,7 +255,7 @@ class FraudExplainer:
 
         Args:
             row: Transaction data
-            shap_contributions: SHAP feature contributions (optional)
+            shap_contributions: Feature contributions from ``explain_prediction`` (optional)
 
         Returns:
             Human-readable explanation string
@@ -155,14 +336,14 @@ class FraudExplainer:
 
         explanation_parts.extend(risk_indicators)
 
-        # SHAP contributions (if available)
+        # Feature contributions (if available)
         if shap_contributions and 'error' not in shap_contributions:
             explanation_parts.append(f"\n🧠 ML MODEL INSIGHTS:")
             for feature, info in list(shap_contributions.items())[:5]:
                 impact = info['impact']
                 contribution = abs(info['contribution'])
                 explanation_parts.append(
-                    f"  • {feature}: {impact} fraud probability (contribution: {contribution:.3f})"
+                    f"  • {feature}: {impact} anomaly score (contribution: {contribution:.3f})"
                 )
 
         # Recommendation
@@ -0,0 +1,181 @@
+"""
+FraudShield AI - Reason Codes
+Vectorized human-readable explanations for scored transactions
+
+Every reason a transaction can be flagged for is one bit of a per-row mask,
+computed with a single vectorized pass over the result columns. Reasons are
+derived from the active rule set (one per rule, plus the ML score and a few
+raw-column checks), so a reloaded rules file is explained without code
+changes. The explanation text for a mask is compiled once into a format
+template, so a batch costs one ``str.format`` per row and no per-row
+DataFrame access.
+"""
+
+import string
+from functools import lru_cache
+from typing import Callable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Reasons that come from the model and the raw columns, not from a rule:
+# (reason code, template, condition) with the condition over a column getter.
+# Templates reference result columns by name.
+ML_REASON = ('ml_anomaly', "ML models detected highly anomalous pattern (score: {ml_score:.2f})",
+             lambda column: column('ml_score') > 0.7)
+COLUMN_REASONS = (
+    ('large_amount', "Very large transaction amount: ${amount:,.2f}",
+     lambda column: column('amount') > 100000),
+    ('account_emptied', "Account completely emptied after transaction",
+     lambda column: (column('newbalanceOrig') == 0) & (column('oldbalanceOrg') > 0)),
+)
+
+# Text for the built-in rules, which quotes the values involved; any other
+# rule is explained by its description
+RULE_TEMPLATES = {
+    'amount_anomaly': "Transaction amount ${amount:,.2f} is unusually high for this user",
+    'balance_error': "Balance calculations don't match (possible data manipulation)",
+    'zero_balance': "Large transaction leaving zero balance (possible account draining)",
+    'high_frequency': "High-frequency transactions detected ({freq} in same time period)",
+    'risky_type': "Risky transaction type: {type}",
+}
+
+# Used when no reason applies
+FALLBACK = "Moderately suspicious based on behavioral patterns (fraud score: {fraud_score:.2f})"
+
+SEPARATOR = " | "
+
+# Mask dtypes by the number of reasons they hold; more use Python ints
+_MASK_DTYPES = ((8, np.uint8), (16, np.uint16), (32, np.uint32), (64, np.uint64))
+
+
+def _column(results: pd.DataFrame, name: str, rows: np.ndarray) -> np.ndarray:
+    """Values of a result column at ``rows``; 0 if the column is absent"""
+    if name not in results.columns:
+        return np.zeros(len(rows))
+    return results[name].to_numpy()[rows]
+
+
+def _escape(text: str) -> str:
+    return text.replace('{', '{{').replace('}', '}}')
+
+
+class ReasonTable:
+    """
+    Every reason a transaction can be flagged for under one rule set
+
+    Bit i of a mask is ``reasons[i]``: the ML reason, one per rule of the
+    set (in rule order, set when its ``rule_<name>`` flag is), then the
+    column reasons. Masks use the smallest unsigned dtype with a bit per
+    reason.
+    """
+
+    def __init__(self, reasons: Tuple[Tuple[str, str, Callable], ...]):
+        self.reasons = reasons
+        self.dtype = next((dtype for bits, dtype in _MASK_DTYPES if len(reasons) <= bits), object)
+        self.template = lru_cache(maxsize=None)(self._template)
+
+    @classmethod
+    def for_rules(cls, rules) -> 'ReasonTable':
+        """Table for a ``RuleSet``: its rules' names and descriptions"""
+        rule_reasons = tuple(
+            (rule.name,
+             RULE_TEMPLATES.get(rule.name) or _escape(rule.description or rule.name),
+             lambda column, flag=f'rule_{rule.name}': column(flag) == 1)
+            for rule in rules.rules
+        )
+        return cls((ML_REASON,) + rule_reasons + COLUMN_REASONS)
+
+    def mask(self, results: pd.DataFrame, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Reason bitmask per row of a ``predict`` result
+
+        Args:
+            results: Scored transactions
+            rows: Positions of the rows to compute (default: every row)
+
+        Returns:
+            Array of ``self.dtype``; bit i is set when ``reasons[i]`` applies
+        """
+        rows = np.arange(len(results)) if rows is None else np.asarray(rows)
+
+        def column(name):
+            return _column(results, name, rows)
+
+        mask = np.zeros(len(rows), dtype=self.dtype)
+        for bit, (_, _, condition) in enumerate(self.reasons):
+            flags = condition(column)
+            if self.dtype is object:
+                mask[np.asarray(flags, dtype=bool)] |= 1 << bit
+            else:
+                mask |= flags.astype(self.dtype) << self.dtype(bit)
+        return mask
+
+    def _template(self, mask: int) -> Tuple[str, Tuple[str, ...]]:
+        """
+        Positional format string for a reason mask, and the columns it reads
+
+        ``template(mask)[0].format(*values)`` renders the explanation, with
+        ``values`` taken from the listed columns in order.
+        """
+        parts = [text for bit, (_, text, _) in enumerate(self.reasons) if mask >> bit & 1]
+        named = SEPARATOR.join(parts) if parts else FALLBACK
+
+        fields = []
+        positional = []
+        for literal, field, spec, _ in string.Formatter().parse(named):
+            positional.append(_escape(literal))
+            if field is not None:
+                positional.append(f"{{{len(fields)}:{spec}}}" if spec else f"{{{len(fields)}}}")
+                fields.append(field)
+        return ''.join(positional), tuple(fields)
+
+    def codes(self, mask: int) -> Tuple[str, ...]:
+        """Names of the reasons set in ``mask``"""
+        return tuple(code for bit, (code, _, _) in enumerate(self.reasons) if mask >> bit & 1)
+
+    def render(self, results: pd.DataFrame, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Explanation text per row of a ``predict`` result
+
+        Rows are grouped by reason mask; each group is rendered from its cached
+        template with the columns it needs pulled out once.
+
+        Args:
+            results: Scored transactions
+            rows: Positions of the rows to explain (default: every row)
+
+        Returns:
+            Object array of strings, one per row
+        """
+        rows = np.arange(len(results)) if rows is None else np.asarray(rows)
+        masks = self.mask(results, rows)
+        explanations = np.empty(len(rows), dtype=object)
+
+        distinct, group = np.unique(masks, return_inverse=True)
+        for k, mask in enumerate(distinct.tolist()):
+            members = np.flatnonzero(group == k)
+            fmt, fields = self.template(mask)
+            if not fields:
+                explanations[members] = fmt.format()
+                continue
+            values = [_column(results, field, rows[members]).tolist() for field in fields]
+            explanations[members] = [fmt.format(*args) for args in zip(*values)]
+
+        return explanations
+
+
+@lru_cache(maxsize=8)
+def reason_table(rules) -> ReasonTable:
+    """The ReasonTable of a ``RuleSet``, built once per set"""
+    return ReasonTable.for_rules(rules)
+
+
+def render_explanations(results: pd.DataFrame, rules,
+                        rows: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Explanation text per row of a ``predict`` result, for the reasons of ``rules``
+
+    See ``ReasonTable.render``.
+    """
+    return reason_table(rules).render(results, rows)
@@ -0,0 +1,222 @@
+"""
+FraudShield AI - Account Dictionary
+Process-wide integer encoding of account IDs
+
+Account IDs (``nameOrig`` / ``nameDest``) are replaced by int32 codes when a
+file is ingested, so grouping, joins and graph lookups work on integers and
+each row stores 4 bytes per account instead of a Python string. Codes are
+stable for the life of the process; names are decoded only where results
+leave the API.
+
+Only the model's data (training and update batches) adds IDs to the shared
+dictionary. Batches that are just scored encode through a request-scoped
+``AccountOverlay``: known IDs keep their shared codes, unseen ones get
+negative codes that are dropped with the overlay, so the dictionary does not
+grow with every scored file.
+"""
+
+import threading
+from typing import Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+ACCOUNT_COLUMNS = ('nameOrig', 'nameDest')
+
+# Code for a missing (NaN) account ID
+MISSING_CODE = -1
+
+
+def _factorize(values: Iterable) -> Tuple[np.ndarray, np.ndarray]:
+    """(per-row index into uniques, -1 for NaN; distinct IDs as an object array)"""
+    values = getattr(values, 'array', values)
+    if isinstance(values, pd.Categorical):
+        return values.codes, values.categories.to_numpy(dtype=object)
+    return pd.factorize(np.asarray(values, dtype=object))
+
+
+def _expand(batch_codes: np.ndarray, mapped: List[int]) -> np.ndarray:
+    """Per-row codes from the code of each distinct ID"""
+    mapped = np.asarray(mapped, dtype=np.int32)
+    if len(mapped) == 0:
+        return np.full(len(batch_codes), MISSING_CODE, dtype=np.int32)
+    codes = mapped[np.maximum(batch_codes, 0)]
+    codes[batch_codes < 0] = MISSING_CODE
+    return codes
+
+
+class AccountDictionary:
+    """
+    Append-only mapping between account IDs and dense int32 codes
+
+    Encoding hashes the batch once (``pd.factorize``) and only touches the
+    dictionary for its distinct IDs. Readers never block: decoding uses an
+    array snapshot (a prefix view of a buffer that doubles when full, so
+    adding IDs costs amortized O(1) each and published entries never change).
+    """
+
+    def __init__(self):
+        self._codes = {}
+        self._buffer = np.empty(0, dtype=object)
+        self._names_array = self._buffer
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._names_array)
+
+    def encode(self, values: Iterable, add: bool = True) -> np.ndarray:
+        """
+        Codes for ``values``
+
+        Args:
+            values: Account IDs (array-like of strings, or categorical, in
+                which case only its categories are hashed)
+            add: Give unseen IDs new codes; otherwise they map to MISSING_CODE
+
+        Returns:
+            int32 array of codes, MISSING_CODE for NaN (and unseen IDs when
+            ``add`` is False)
+        """
+        batch_codes, uniques = _factorize(values)
+        return _expand(batch_codes, self._map(uniques, add))
+
+    def _map(self, uniques: np.ndarray, add: bool) -> List[int]:
+        with self._lock:
+            get = self._codes.get
+            mapped = [get(name, MISSING_CODE) for name in uniques]
+            if add:
+                new = [i for i, code in enumerate(mapped) if code == MISSING_CODE]
+                if new:
+                    self._append(uniques, new, mapped)
+        return mapped
+
+    def _append(self, uniques: np.ndarray, new: List[int], mapped: List[int]):
+        size = len(self._names_array)
+        needed = size + len(new)
+        if needed > len(self._buffer):
+            buffer = np.empty(max(needed, 2 * len(self._buffer), 1024), dtype=object)
+            buffer[:size] = self._names_array
+            self._buffer = buffer
+        for offset, i in enumerate(new):
+            name = uniques[i]
+            mapped[i] = self._codes[name] = size + offset
+            self._buffer[size + offset] = name
+        # Publish after the entries are written; older snapshots stay valid
+        self._names_array = self._buffer[:needed]
+
+    def lookup(self, name: str) -> Optional[int]:
+        """Code of a single account ID, or None if it was never ingested"""
+        return self._codes.get(name)
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        """Account IDs (object array) for ``codes``; negative codes decode to None"""
+        codes = np.asarray(codes)
+        names = self._names_array
+        if len(names) == 0:
+            return np.full(len(codes), None, dtype=object)
+        decoded = names[np.clip(codes, 0, len(names) - 1)]
+        decoded[codes < 0] = None
+        return decoded
+
+    def overlay(self) -> 'AccountOverlay':
+        """A request-scoped view that encodes unseen IDs without adding them here"""
+        return AccountOverlay(self)
+
+
+# First code an overlay hands out; codes count down from here
+OVERLAY_FIRST_CODE = -2
+
+
+class AccountOverlay:
+    """
+    An AccountDictionary plus the IDs of one request that it does not know
+
+    IDs known to ``base`` encode to their shared codes (so they match the
+    model's account profiles and training data); unseen IDs get codes
+    ``-2, -3, ...`` local to this overlay, which never collide with shared
+    codes added meanwhile and, being negative, are never found in a profile.
+    Decoding needs the overlay that encoded the codes. Meant for one request
+    at a time (not locked).
+    """
+
+    def __init__(self, base: AccountDictionary):
+        self.base = base
+        self._codes = {}
+        self._names: List[object] = []
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def encode(self, values: Iterable) -> np.ndarray:
+        """Codes for ``values``: shared codes, or overlay codes for unseen IDs"""
+        batch_codes, uniques = _factorize(values)
+        mapped = self.base._map(uniques, add=False)
+        local = self._codes
+        for i, code in enumerate(mapped):
+            # An ID this overlay has already coded keeps that code even if it
+            # was added to the base since, so a request sees one code per ID
+            name = uniques[i]
+            local_code = local.get(name)
+            if local_code is not None:
+                mapped[i] = local_code
+            elif code == MISSING_CODE:
+                mapped[i] = local[name] = OVERLAY_FIRST_CODE - len(self._names)
+                self._names.append(name)
+        return _expand(batch_codes, mapped)
+
+    def lookup(self, name: str) -> Optional[int]:
+        """Code of a single account ID in this overlay, or None if it was never encoded"""
+        code = self._codes.get(name)
+        return code if code is not None else self.base.lookup(name)
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        """Account IDs (object array) for shared and overlay codes; MISSING_CODE decodes to None"""
+        codes = np.asarray(codes)
+        decoded = self.base.decode(codes)
+        local = codes <= OVERLAY_FIRST_CODE
+        if local.any():
+            names = np.empty(len(self._names), dtype=object)
+            names[:] = self._names
+            decoded[local] = names[OVERLAY_FIRST_CODE - codes[local]]
+        return decoded
+
+
+# The dictionary shared by every subsystem in the process
+ACCOUNTS = AccountDictionary()
+
+
+def is_encoded(values) -> bool:
+    """True if ``values`` holds account codes rather than IDs"""
+    dtype = values.dtype if hasattr(values, 'dtype') else np.asarray(values).dtype
+    return dtype.kind in 'iu'
+
+
+def encode_accounts(df: pd.DataFrame,
+                    accounts: Union[AccountDictionary, AccountOverlay] = None) -> pd.DataFrame:
+    """
+    Replace the account ID columns of a freshly ingested frame with int32 codes
+
+    The frame is modified in place (and returned) so the string columns can
+    be freed right away.
+
+    Args:
+        accounts: Where codes come from: ``ACCOUNTS`` (the default) for data
+            the model is built from, an overlay for batches that are only scored
+    """
+    accounts = ACCOUNTS if accounts is None else accounts
+    for column in ACCOUNT_COLUMNS:
+        if column in df.columns and not is_encoded(df[column]):
+            df[column] = accounts.encode(df[column])
+    return df
+
+
+def decode_accounts(df: pd.DataFrame,
+                    accounts: Union[AccountDictionary, AccountOverlay] = None) -> pd.DataFrame:
+    """Copy of ``df`` with account codes turned back into IDs, for output"""
+    accounts = ACCOUNTS if accounts is None else accounts
+    decoded = {
+        column: accounts.decode(df[column].to_numpy())
+        for column in ACCOUNT_COLUMNS
+        if column in df.columns and is_encoded(df[column])
+    }
+    return df.assign(**decoded) if decoded else df
@@ -0,0 +1,374 @@
+"""
+FraudShield AI - Account Profile Store
+Per-account aggregates for single-transaction and chunked scoring
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from ml_engine.models.account_dictionary import ACCOUNTS, is_encoded
+
+# (account index, step) pairs are packed into one int64 key
+STEP_KEY_SHIFT = np.int64(2 ** 32)
+
+
+class AccountAggregates:
+    """
+    Account-level statistics of one batch, computed in a single pass
+
+    Accounts are hash-encoded once (``pd.factorize``); count, mean and M2 come
+    from ``np.bincount`` over the codes, max from one stable sort, and
+    per-(account, step) counts from hashing the packed keys. The rule engine,
+    feature builder and profile store all read from the same instance instead
+    of each running its own groupby and merge. Arrays are per account in
+    first-seen order, except ``codes`` and ``freq`` which are per row.
+    """
+
+    def __init__(self, codes: np.ndarray, accounts: np.ndarray, tx_count: np.ndarray,
+                 amount_mean: np.ndarray, amount_m2: np.ndarray, amount_max: np.ndarray,
+                 step_keys: np.ndarray, step_counts: np.ndarray, freq: np.ndarray):
+        self.codes = codes
+        self.accounts = accounts
+        self.tx_count = tx_count
+        self.amount_mean = amount_mean
+        self.amount_m2 = amount_m2
+        self.amount_max = amount_max
+        self.step_keys = step_keys
+        self.step_counts = step_counts
+        self.freq = freq
+
+    def __len__(self) -> int:
+        return len(self.accounts)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> 'AccountAggregates':
+        """Aggregate a transaction DataFrame by ``nameOrig``"""
+        amounts = df['amount'].to_numpy(dtype=np.float64)
+        steps = df['step'].to_numpy(dtype=np.int64)
+
+        codes, accounts = pd.factorize(df['nameOrig'], use_na_sentinel=False)
+        n_accounts = len(accounts)
+
+        tx_count = np.bincount(codes, minlength=n_accounts)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            amount_mean = np.bincount(codes, weights=amounts, minlength=n_accounts) / tx_count
+        amount_m2 = np.bincount(codes, weights=(amounts - amount_mean[codes]) ** 2, minlength=n_accounts)
+
+        # One stable sort groups each account's rows for the max
+        if len(codes):
+            order = np.argsort(codes, kind='stable')
+            group_starts = np.concatenate([[0], np.cumsum(tx_count)[:-1]])
+            amount_max = np.maximum.reduceat(amounts[order], group_starts)
+        else:
+            amount_max = np.array([], dtype=np.float64)
+
+        # Transactions per (account, step)
+        key_codes, step_keys = pd.factorize(codes.astype(np.int64) * STEP_KEY_SHIFT + steps)
+        step_counts = np.bincount(key_codes)
+
+        return cls(
+            codes=codes,
+            accounts=np.asarray(accounts),
+            tx_count=tx_count.astype(np.int64),
+            amount_mean=amount_mean,
+            amount_m2=amount_m2,
+            amount_max=amount_max,
+            step_keys=np.asarray(step_keys, dtype=np.int64),
+            step_counts=step_counts.astype(np.int64),
+            freq=step_counts[key_codes],
+        )
+
+    def row_stats(self) -> Dict[str, np.ndarray]:
+        """
+        Per-row statistics, in the same form as ``AccountProfileStore.row_stats``
+
+        Returns:
+            Dictionary of per-row arrays: count, mean, std (ddof=1, NaN for a
+            single transaction), max and freq (transactions in the same step)
+        """
+        count = self.tx_count.astype(np.float64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            std = np.where(count > 1, np.sqrt(self.amount_m2 / (count - 1)), np.nan)
+
+        return {
+            'count': count[self.codes],
+            'mean': self.amount_mean[self.codes],
+            'std': std[self.codes],
+            'max': self.amount_max[self.codes],
+            'freq': self.freq,
+        }
+
+    def to_profiles(self) -> 'AccountProfileStore':
+        """Profile store over these accounts (sorted by name for lookups)"""
+        accounts = np.asarray(self.accounts)
+        if is_encoded(accounts):
+            accounts = ACCOUNTS.decode(accounts)
+        accounts = accounts.astype(str)
+        order = np.argsort(accounts, kind='stable')
+        rank = np.empty(len(order), dtype=np.int64)
+        rank[order] = np.arange(len(order))
+
+        step_keys = rank[self.step_keys // STEP_KEY_SHIFT] * STEP_KEY_SHIFT + self.step_keys % STEP_KEY_SHIFT
+        key_order = np.argsort(step_keys)
+
+        return AccountProfileStore(
+            accounts=accounts[order],
+            tx_count=self.tx_count[order],
+            amount_mean=self.amount_mean[order],
+            amount_m2=self.amount_m2[order],
+            amount_max=self.amount_max[order],
+            step_keys=step_keys[key_order],
+            step_counts=self.step_counts[key_order],
+        )
+
+
+class AccountProfileStore:
+    """
+    Per-``nameOrig`` amount statistics and per-(``nameOrig``, ``step``) counts
+
+    Accounts are kept as a sorted string array and looked up with
+    ``np.searchsorted``, so the store can be memory-mapped from an artifact
+    without rebuilding a dictionary. Rows whose accounts are already encoded
+    (see ``account_dictionary``) are looked up through an index from account
+    code to profile row instead, built on first use. Amount spread is stored
+    as Welford's M2 (sum of squared deviations) so new transactions can be
+    folded in exactly.
+    """
+
+    ARRAY_NAMES = ('accounts', 'tx_count', 'amount_mean', 'amount_m2',
+                   'amount_max', 'step_keys', 'step_counts')
+
+    def __init__(self, accounts: np.ndarray, tx_count: np.ndarray,
+                 amount_mean: np.ndarray, amount_m2: np.ndarray,
+                 amount_max: np.ndarray, step_keys: np.ndarray,
+                 step_counts: np.ndarray):
+        self.accounts = accounts
+        self.tx_count = tx_count
+        self.amount_mean = amount_mean
+        self.amount_m2 = amount_m2
+        self.amount_max = amount_max
+        self.step_keys = step_keys
+        self.step_counts = step_counts
+        self._index_by_code: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self.accounts)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> 'AccountProfileStore':
+        """Build profiles from a transaction DataFrame"""
+        return AccountAggregates.from_frame(df).to_profiles()
+
+    @classmethod
+    def empty(cls) -> 'AccountProfileStore':
+        return cls(
+            accounts=np.array([], dtype=str),
+            tx_count=np.array([], dtype=np.int64),
+            amount_mean=np.array([], dtype=np.float64),
+            amount_m2=np.array([], dtype=np.float64),
+            amount_max=np.array([], dtype=np.float64),
+            step_keys=np.array([], dtype=np.int64),
+            step_counts=np.array([], dtype=np.int64),
+        )
+
+    @classmethod
+    def combine(cls, stores: Iterable['AccountProfileStore']) -> 'AccountProfileStore':
+        """
+        Merge stores built from disjoint sets of transactions
+
+        The result equals ``from_frame`` on the concatenated transactions (up
+        to floating-point rounding), which lets aggregates be built one chunk
+        at a time. ``stores`` is consumed as it is iterated: stores are merged
+        pairwise like a binary counter (a store is merged with the previous
+        one once both cover the same number of inputs), so at most
+        log2(inputs) partial stores are alive at once and each account is
+        re-merged O(log inputs) times.
+        """
+        # (inputs covered, store), sizes strictly decreasing towards the top
+        pending: List[Tuple[int, 'AccountProfileStore']] = []
+        for store in stores:
+            if len(store) == 0:
+                continue
+            covered = 1
+            while pending and pending[-1][0] == covered:
+                covered += pending[-1][0]
+                store = cls._merge([pending.pop()[1], store])
+            pending.append((covered, store))
+
+        if not pending:
+            return cls.empty()
+        return cls._merge([store for _, store in pending])
+
+    @classmethod
+    def _merge(cls, stores: List['AccountProfileStore']) -> 'AccountProfileStore':
+        if len(stores) == 1:
+            return stores[0]
+
+        accounts, inverse = np.unique(
+            np.concatenate([store.accounts for store in stores]), return_inverse=True
+        )
+        part_count = np.concatenate([store.tx_count for store in stores]).astype(np.float64)
+        part_mean = np.concatenate([store.amount_mean for store in stores])
+        part_m2 = np.concatenate([store.amount_m2 for store in stores])
+        part_max = np.concatenate([store.amount_max for store in stores])
+
+        # Pooled mean and M2 across parts
+        count = np.bincount(inverse, weights=part_count)
+        mean = np.bincount(inverse, weights=part_count * part_mean) / count
+        m2 = np.bincount(inverse, weights=part_m2 + part_count * (part_mean - mean[inverse]) ** 2)
+
+        order = np.argsort(inverse, kind='stable')
+        group_starts = np.searchsorted(inverse[order], np.arange(len(accounts)))
+        amount_max = np.maximum.reduceat(part_max[order], group_starts)
+
+        # Re-key (local account index, step) pairs onto the merged account index
+        keys, counts = [], []
+        offset = 0
+        for store in stores:
+            global_idx = inverse[offset:offset + len(store)]
+            local_idx = store.step_keys // STEP_KEY_SHIFT
+            steps = store.step_keys % STEP_KEY_SHIFT
+            keys.append(global_idx[local_idx].astype(np.int64) * STEP_KEY_SHIFT + steps)
+            counts.append(store.step_counts)
+            offset += len(store)
+
+        step_keys, key_inverse = np.unique(np.concatenate(keys), return_inverse=True)
+        step_counts = np.bincount(key_inverse, weights=np.concatenate(counts))
+
+        return cls(
+            accounts=accounts,
+            tx_count=count.astype(np.int64),
+            amount_mean=mean,
+            amount_m2=m2,
+            amount_max=amount_max,
+            step_keys=step_keys.astype(np.int64),
+            step_counts=step_counts.astype(np.int64),
+        )
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """Arrays to persist, keyed by name"""
+        return {name: getattr(self, name) for name in self.ARRAY_NAMES}
+
+    def _code_index(self) -> np.ndarray:
+        """Profile row per account code (-1 where the account has no profile)"""
+        index = self._index_by_code
+        if index is None:
+            # Every stored account gets a code, so codes issued later are
+            # accounts without a profile
+            codes = ACCOUNTS.encode(self.accounts)
+            index = np.full(len(ACCOUNTS), -1, dtype=np.int64)
+            index[codes] = np.arange(len(codes))
+            self._index_by_code = index
+        return index
+
+    def lookup(self, names: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (index, found mask) for each account name or account code"""
+        names = np.asarray(names)
+        if len(self.accounts) == 0:
+            return np.zeros(len(names), dtype=np.int64), np.zeros(len(names), dtype=bool)
+
+        if is_encoded(names):
+            index = self._code_index()
+            in_range = (names >= 0) & (names < len(index))
+            idx = np.where(in_range, index[np.clip(names, 0, len(index) - 1)], -1)
+            found = idx >= 0
+            return np.maximum(idx, 0), found
+
+        names = names.astype(str)
+        idx = np.searchsorted(self.accounts, names)
+        idx = np.minimum(idx, len(self.accounts) - 1)
+        found = self.accounts[idx] == names
+        return idx, found
+
+    def _step_count(self, idx: np.ndarray, found: np.ndarray, steps: np.ndarray) -> np.ndarray:
+        keys = idx.astype(np.int64) * STEP_KEY_SHIFT + steps.astype(np.int64)
+        if len(self.step_keys) == 0:
+            return np.zeros(len(keys), dtype=np.int64)
+        pos = np.minimum(np.searchsorted(self.step_keys, keys), len(self.step_keys) - 1)
+        hit = found & (self.step_keys[pos] == keys)
+        return np.where(hit, self.step_counts[pos], 0)
+
+    def row_stats(self, names: np.ndarray, steps: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Account statistics for rows that are already part of this store
+
+        Returns the same per-row arrays as ``combined_stats`` (count, mean,
+        std, max, freq), i.e. what ``predict`` derives from a groupby over the
+        full dataset the store was built from.
+        """
+        idx, found = self.lookup(names)
+        if not found.all():
+            raise ValueError("Some accounts are missing from the profile store")
+
+        count = self.tx_count[idx]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            std = np.where(count > 1, np.sqrt(self.amount_m2[idx] / (count - 1)), np.nan)
+
+        return {
+            'count': count.astype(np.float64),
+            'mean': self.amount_mean[idx],
+            'std': std,
+            'max': self.amount_max[idx],
+            'freq': self._step_count(idx, found, np.asarray(steps, dtype=np.int64)),
+        }
+
+    def combined_stats(self, names: np.ndarray, amounts: np.ndarray,
+                       steps: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Account statistics for a small batch, as if it were appended to the
+        training data
+
+        Each row sees its account's stored profile merged with every row of
+        the batch for the same account, matching what ``predict`` would compute
+        on the concatenated frame.
+
+        Returns:
+            Dictionary of per-row arrays: count, mean, std (ddof=1, NaN for a
+            single transaction), max and freq (transactions in the same step)
+        """
+        names = np.asarray(names)
+        if not is_encoded(names):
+            names = names.astype(str)
+        amounts = np.asarray(amounts, dtype=np.float64)
+        steps = np.asarray(steps, dtype=np.int64)
+
+        # Aggregate the batch itself per account
+        batch_names, inverse = np.unique(names, return_inverse=True)
+        n_b = np.bincount(inverse).astype(np.float64)
+        mean_b = np.bincount(inverse, weights=amounts) / n_b
+        m2_b = np.bincount(inverse, weights=(amounts - mean_b[inverse]) ** 2)
+        max_b = np.full(len(batch_names), -np.inf)
+        np.maximum.at(max_b, inverse, amounts)
+
+        # Merge with stored profiles (Chan et al. parallel variance)
+        idx, found = self.lookup(batch_names)
+        if len(self.accounts) > 0:
+            n_a = np.where(found, self.tx_count[idx], 0).astype(np.float64)
+            mean_a = np.where(found, self.amount_mean[idx], 0.0)
+            m2_a = np.where(found, self.amount_m2[idx], 0.0)
+            max_a = np.where(found, self.amount_max[idx], -np.inf)
+        else:
+            n_a = mean_a = m2_a = np.zeros(len(batch_names))
+            max_a = np.full(len(batch_names), -np.inf)
+
+        n = n_a + n_b
+        delta = mean_b - mean_a
+        mean = mean_a + delta * n_b / n
+        m2 = m2_a + m2_b + delta ** 2 * n_a * n_b / n
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            std = np.where(n > 1, np.sqrt(m2 / (n - 1)), np.nan)
+
+        # Transactions in the same step: stored count + batch count
+        batch_keys = inverse.astype(np.int64) * STEP_KEY_SHIFT + steps
+        _, key_inverse, key_counts = np.unique(batch_keys, return_inverse=True, return_counts=True)
+        freq = self._step_count(idx[inverse], found[inverse], steps) + key_counts[key_inverse]
+
+        return {
+            'count': n[inverse],
+            'mean': mean[inverse],
+            'std': std[inverse],
+            'max': np.maximum(max_a, max_b)[inverse],
+            'freq': freq,
+        }
@@ -0,0 +1,224 @@
+"""
+FraudShield AI - Model Artifacts
+Versioned on-disk format for trained HybridFraudDetector models
+
+An artifact is a directory holding a ``manifest.json`` plus one ``.npy`` file
+per array, so every array can be memory-mapped on load instead of unpickled.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime
+from typing import Dict, Optional
+
+import numpy as np
+
+ARTIFACT_FORMAT_VERSION = 5
+MANIFEST_FILE = "manifest.json"
+
+
+def _write_arrays(directory: str, prefix: str, arrays: Dict[str, np.ndarray]) -> list:
+    names = []
+    for name, array in arrays.items():
+        file_name = f"{prefix}{name}.npy"
+        np.save(os.path.join(directory, file_name), np.ascontiguousarray(array))
+        names.append(file_name)
+    return names
+
+
+def _read_array(directory: str, file_name: str, mmap: bool) -> np.ndarray:
+    array = np.load(os.path.join(directory, file_name), mmap_mode='r' if mmap else None)
+    # Plain ndarray view of the mapping: np.memmap adds overhead to every indexing call
+    return array.view(np.ndarray)
+
+
+def _scaler_info(directory: str, prefix: str, scaler) -> Dict:
+    arrays = {"mean": scaler.mean_, "scale": scaler.scale_}
+    if scaler.var_ is not None:
+        arrays["var"] = scaler.var_
+    return {
+        "n_samples": scaler.n_samples_seen_,
+        "arrays": _write_arrays(directory, prefix, arrays),
+    }
+
+
+def save_detector(detector, path: str) -> Dict:
+    """
+    Write a trained detector to ``path``
+
+    The artifact is assembled in a sibling temp directory and swapped in with
+    a rename, so a crash mid-save never leaves a half-written model behind.
+
+    Returns:
+        The manifest that was written
+    """
+    if not detector.is_trained:
+        raise ValueError("Cannot save an untrained detector")
+
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=".artifact-", dir=parent)
+
+    try:
+        manifest = {
+            "format_version": ARTIFACT_FORMAT_VERSION,
+            "created_at": datetime.now().isoformat(),
+            "feature_columns": list(detector.feature_columns),
+            "scaler": _scaler_info(staging, "scaler_", detector.scaler),
+        }
+
+        forest = detector.flat_forest
+        manifest["forest"] = {
+            "max_samples": forest.max_samples,
+            "offset": forest.offset_,
+            "n_estimators": forest.n_estimators,
+            "score_min": detector.iso_score_min,
+            "score_max": detector.iso_score_max,
+            "arrays": _write_arrays(staging, "forest_", forest.to_arrays()),
+        }
+
+        if detector.profiles is not None:
+            manifest["profiles"] = {
+                "n_accounts": len(detector.profiles),
+                "arrays": _write_arrays(staging, "profile_", detector.profiles.to_arrays()),
+            }
+
+        explainer = detector.explainer
+        if explainer is not None and explainer.baseline is not None:
+            manifest["explainer"] = {
+                "version": explainer.version,
+                "background_rows": explainer.background_rows,
+                "arrays": _write_arrays(staging, "explainer_", {
+                    "baseline": explainer.baseline,
+                    "background": explainer.background,
+                    "background_weights": explainer.background_weights,
+                }),
+            }
+
+        autoencoder = detector.autoencoder
+        if autoencoder is not None and autoencoder.layers:
+            layer_arrays = {}
+            for i, (kernel, bias) in enumerate(autoencoder.layers):
+                layer_arrays[f"{i}_kernel"] = kernel
+                layer_arrays[f"{i}_bias"] = bias
+            manifest["autoencoder"] = {
+                "input_dim": autoencoder.input_dim,
+                "encoding_dim": autoencoder.encoding_dim,
+                "threshold": float(autoencoder.threshold),
+                "activations": list(autoencoder.activations),
+                "scaler": _scaler_info(staging, "ae_scaler_", autoencoder.scaler),
+                "weight_arrays": _write_arrays(staging, "ae_", layer_arrays),
+            }
+
+        with open(os.path.join(staging, MANIFEST_FILE), "w") as f:
+            json.dump(manifest, f, indent=2)
+
+        # Swap the new artifact in place of the old one
+        if os.path.exists(path):
+            backup = f"{path}.old"
+            shutil.rmtree(backup, ignore_errors=True)
+            os.replace(path, backup)
+            os.replace(staging, path)
+            shutil.rmtree(backup, ignore_errors=True)
+        else:
+            os.replace(staging, path)
+
+        return manifest
+
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+
+def read_manifest(path: str) -> Optional[Dict]:
+    """Return the manifest of the artifact at ``path``, or None if there is none"""
+    manifest_path = os.path.join(path, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path) as f:
+        return json.load(f)
+
+
+def load_detector(path: str, mmap: bool = True):
+    """
+    Load a detector written by ``save_detector``
+
+    Args:
+        path: Artifact directory
+        mmap: Memory-map arrays instead of reading them into RAM
+
+    Returns:
+        A ready-to-predict HybridFraudDetector
+    """
+    from ml_engine.explainability.explainer import FraudExplainer
+    from ml_engine.models.account_profiles import AccountProfileStore
+    from ml_engine.models.flat_forest import FlatIsolationForest
+    from ml_engine.models.hybrid_fraud_detector import (
+        AutoEncoder, FittedScaler, HybridFraudDetector
+    )
+
+    manifest = read_manifest(path)
+    if manifest is None:
+        raise FileNotFoundError(f"No model artifact found at {path}")
+
+    version = manifest.get("format_version")
+    if version != ARTIFACT_FORMAT_VERSION:
+        raise ValueError(
+            f"Unsupported artifact format version {version} "
+            f"(expected {ARTIFACT_FORMAT_VERSION})"
+        )
+
+    def restore_scaler(info: Dict) -> FittedScaler:
+        # Arrays are written as mean, scale[, var]
+        arrays = [_read_array(path, name, mmap) for name in info["arrays"]]
+        var = arrays[2] if len(arrays) > 2 else None
+        return FittedScaler(arrays[0], arrays[1], var, info.get("n_samples"))
+
+    detector = HybridFraudDetector()
+    detector.feature_columns = list(manifest["feature_columns"])
+    detector.scaler = restore_scaler(manifest["scaler"])
+
+    forest_info = manifest["forest"]
+    forest_arrays = {
+        name: _read_array(path, file_name, mmap)
+        for name, file_name in zip(FlatIsolationForest.ARRAY_NAMES, forest_info["arrays"])
+    }
+    detector.flat_forest = FlatIsolationForest(
+        max_samples=forest_info["max_samples"],
+        offset=forest_info["offset"],
+        **forest_arrays,
+    )
+    detector.isolation_forest = detector.flat_forest
+    detector.iso_score_min = forest_info["score_min"]
+    detector.iso_score_max = forest_info["score_max"]
+
+    profile_info = manifest.get("profiles")
+    if profile_info is not None:
+        detector.profiles = AccountProfileStore(**{
+            name: _read_array(path, file_name, mmap)
+            for name, file_name in zip(AccountProfileStore.ARRAY_NAMES, profile_info["arrays"])
+        })
+
+    explainer_info = manifest.get("explainer")
+    if explainer_info is not None:
+        explainer = FraudExplainer(detector.flat_forest, detector.feature_columns, detector.scaler)
+        arrays = [_read_array(path, name, mmap) for name in explainer_info["arrays"]]
+        explainer.baseline, explainer.background, explainer.background_weights = arrays
+        explainer.background_rows = explainer_info["background_rows"]
+        explainer.version = explainer_info["version"]
+        detector.explainer = explainer
+
+    ae_info = manifest.get("autoencoder")
+    if ae_info is not None:
+        # Inference runs on the NumPy weights; TensorFlow is not needed
+        autoencoder = AutoEncoder(ae_info["input_dim"], ae_info["encoding_dim"])
+        weights = [_read_array(path, name, mmap) for name in ae_info["weight_arrays"]]
+        autoencoder.layers = list(zip(weights[0::2], weights[1::2]))
+        autoencoder.activations = list(ae_info["activations"])
+        autoencoder.scaler = restore_scaler(ae_info["scaler"])
+        autoencoder.threshold = ae_info["threshold"]
+        detector.autoencoder = autoencoder
+
+    return detector
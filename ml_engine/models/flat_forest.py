@@ -0,0 +1,348 @@
+"""
+FraudShield AI - Flattened Isolation Forest
+Array-backed IsolationForest scoring that does not need sklearn tree objects
+"""
+
+import numpy as np
+from typing import Dict, Optional
+
+# Sentinel used by sklearn for leaf nodes in children_left / children_right
+TREE_LEAF = -1
+
+
+def average_path_length(n_samples: np.ndarray) -> np.ndarray:
+    """Average path length of an unsuccessful BST search (c(n) in the paper)"""
+    n_samples = np.asarray(n_samples, dtype=np.float64)
+    result = np.zeros_like(n_samples)
+
+    mask_two = n_samples == 2
+    mask_big = n_samples > 2
+    result[mask_two] = 1.0
+    n = n_samples[mask_big]
+    result[mask_big] = 2.0 * (np.log(n - 1.0) + np.euler_gamma) - 2.0 * (n - 1.0) / n
+    return result
+
+
+class FlatIsolationForest:
+    """
+    IsolationForest compiled into contiguous NumPy arrays
+
+    All trees are concatenated node-wise; ``tree_offsets[i]`` is the index of
+    the root of tree ``i``. Child indices are stored as global node indices so
+    the arrays can be memory-mapped straight from an artifact, without copying.
+
+    Scoring walks every (tree, row) pair of a block one level per step, over
+    all trees at once. For that the trees are laid out level by level as
+    complete binary trees (built on first use, a few hundred KB for the
+    default 256-sample trees): level ``d`` holds ``n_trees * 2**d`` slots and
+    the children of slot ``s`` are slots ``2s`` and ``2s + 1`` of the next
+    level, so a step is three gathers and no child lookup. Leaves above the
+    last level are padded with splits that always go left.
+    """
+
+    ARRAY_NAMES = ('feature', 'threshold', 'threshold32', 'children',
+                   'leaf_path_length', 'tree_offsets')
+
+    # Rows per traversal block; keeps the (trees x rows) work arrays cache-sized
+    block_size = 512
+
+    def __init__(self, feature: np.ndarray, threshold: np.ndarray, children: np.ndarray,
+                 leaf_path_length: np.ndarray, tree_offsets: np.ndarray,
+                 max_samples: int, offset: float, threshold32: Optional[np.ndarray] = None):
+        """
+        Args:
+            children: (n_nodes x 2) int32 array of (left, right) child ids;
+                leaves point to themselves
+            threshold32: Float32 thresholds as built here; derived from
+                ``threshold`` when not given
+        """
+        # np.asarray returns arrays that already have the dtype (e.g. mmapped
+        # artifact arrays) as they are
+        self.feature = np.asarray(feature, dtype=np.int32)
+        self.threshold = threshold
+        self.children = np.ascontiguousarray(children, dtype=np.int32)
+        self.leaf_path_length = leaf_path_length
+        self.tree_offsets = np.asarray(tree_offsets, dtype=np.int32)
+        self.max_samples = int(max_samples)
+        self.offset_ = float(offset)
+
+        if threshold32 is None:
+            # Largest float32 <= each threshold: for float32 x, ``x > t32`` is
+            # exactly ``x > t`` while keeping the comparison in float32
+            threshold32 = np.asarray(threshold, dtype=np.float32)
+            too_high = threshold32 > threshold
+            threshold32[too_high] = np.nextafter(threshold32[too_high], np.float32(-np.inf))
+        self.threshold32 = threshold32
+        self.max_depth = self._compute_max_depth()
+        # Built on first use by ``_levels`` and ``path_attributions``
+        self._level_arrays = None
+        self._leaf_credit = None
+
+    @property
+    def children_left(self) -> np.ndarray:
+        return self.children[:, 0]
+
+    @property
+    def children_right(self) -> np.ndarray:
+        return self.children[:, 1]
+
+    def _compute_max_depth(self) -> int:
+        """Number of levels to walk so every root reaches a leaf"""
+        is_leaf = self.children_left == np.arange(len(self.children_left))
+        depth = 0
+        frontier = self.tree_offsets[~is_leaf[self.tree_offsets]]
+        while len(frontier):
+            frontier = self.children[frontier].ravel()
+            frontier = frontier[~is_leaf[frontier]]
+            depth += 1
+        return depth
+
+    @property
+    def n_estimators(self) -> int:
+        return len(self.tree_offsets)
+
+    @classmethod
+    def from_sklearn(cls, forest) -> 'FlatIsolationForest':
+        """Compile a fitted sklearn IsolationForest"""
+        n_features = forest.n_features_in_
+        subsample_features = forest._max_features != n_features
+
+        features, thresholds, children, path_lengths, offsets = [], [], [], [], []
+        start = 0
+        for estimator, tree_features in zip(forest.estimators_, forest.estimators_features_):
+            tree = estimator.tree_
+            is_leaf = tree.children_left == TREE_LEAF
+
+            # Leaf nodes carry a negative feature id; point them at column 0
+            feature = np.maximum(tree.feature, 0)
+            if subsample_features:
+                feature = np.asarray(tree_features)[feature]
+            feature = np.where(is_leaf, 0, feature).astype(np.int32)
+
+            # Leaves point to themselves so traversal can run a fixed number of steps
+            node_ids = np.arange(tree.node_count, dtype=np.int32)
+            left = np.where(is_leaf, node_ids, tree.children_left) + start
+            right = np.where(is_leaf, node_ids, tree.children_right) + start
+
+            depths = tree.compute_node_depths() - 1
+            path_length = np.where(
+                is_leaf, depths + average_path_length(tree.n_node_samples), 0.0
+            )
+
+            features.append(feature)
+            thresholds.append(tree.threshold.astype(np.float64))
+            children.append(np.stack([left, right], axis=1).astype(np.int32))
+            path_lengths.append(path_length.astype(np.float64))
+            offsets.append(start)
+            start += tree.node_count
+
+        return cls(
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds),
+            children=np.concatenate(children),
+            leaf_path_length=np.concatenate(path_lengths),
+            tree_offsets=np.asarray(offsets, dtype=np.int32),
+            max_samples=forest._max_samples,
+            offset=forest.offset_,
+        )
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """Arrays to persist, keyed by name"""
+        return {name: getattr(self, name) for name in self.ARRAY_NAMES}
+
+    def rescaled(self, old_mean: np.ndarray, old_scale: np.ndarray,
+                 new_mean: np.ndarray, new_scale: np.ndarray) -> 'FlatIsolationForest':
+        """
+        Same forest with thresholds moved from one standardization to another
+
+        Trees fit on ``(x - old_mean) / old_scale`` keep their raw-space split
+        points when fed ``(x - new_mean) / new_scale``.
+        """
+        feature = self.feature
+        raw = np.asarray(self.threshold) * old_scale[feature] + old_mean[feature]
+        return FlatIsolationForest(
+            feature=self.feature,
+            threshold=(raw - new_mean[feature]) / new_scale[feature],
+            children=self.children,
+            leaf_path_length=self.leaf_path_length,
+            tree_offsets=self.tree_offsets,
+            max_samples=self.max_samples,
+            offset=self.offset_,
+        )
+
+    def replace_oldest(self, n_trees: int, newer: 'FlatIsolationForest',
+                       offset: float) -> 'FlatIsolationForest':
+        """
+        Drop the first ``n_trees`` trees and append every tree of ``newer``
+
+        Trees are kept oldest first, so repeated calls slide a window over the
+        data the forest has seen. Both forests must use the same ``max_samples``
+        for their path lengths to be comparable.
+        """
+        if newer.max_samples != self.max_samples:
+            raise ValueError(
+                f"Replacement trees use max_samples={newer.max_samples}, "
+                f"expected {self.max_samples}"
+            )
+
+        # Node range of the trees that are kept, re-based to start at 0
+        start = int(self.tree_offsets[n_trees]) if n_trees < self.n_estimators else len(self.feature)
+        kept_nodes = len(self.feature) - start
+
+        def kept(array):
+            return np.asarray(array[start:])
+
+        return FlatIsolationForest(
+            feature=np.concatenate([kept(self.feature), newer.feature]),
+            threshold=np.concatenate([kept(self.threshold), newer.threshold]),
+            children=np.concatenate([kept(self.children) - start,
+                                     newer.children + kept_nodes]).astype(np.int32),
+            leaf_path_length=np.concatenate([kept(self.leaf_path_length), newer.leaf_path_length]),
+            tree_offsets=np.concatenate([np.asarray(self.tree_offsets[n_trees:]) - start,
+                                         np.asarray(newer.tree_offsets) + kept_nodes]).astype(np.int32),
+            max_samples=self.max_samples,
+            offset=offset,
+        )
+
+    def _levels(self):
+        """
+        Level-major complete-tree layout: (features, thresholds) per level,
+        plus the leaf node and path length of every slot of the last level
+        """
+        levels = self._level_arrays
+        if levels is not None:
+            return levels
+
+        is_leaf = self.children_left == np.arange(len(self.feature))
+        node = self.tree_offsets.astype(np.intp)
+        features, thresholds = [], []
+        for _ in range(self.max_depth):
+            leaf = is_leaf[node]
+            features.append(np.where(leaf, 0, self.feature[node]).astype(np.intp))
+            # NaN > inf is False too, so padded splits send every row left
+            thresholds.append(np.where(leaf, np.float32(np.inf), self.threshold32[node]))
+            # Interleave (left, right); a leaf is its own child on both sides
+            node = np.asarray(self.children)[node].ravel().astype(np.intp)
+
+        levels = (features, thresholds, node, np.asarray(self.leaf_path_length)[node])
+        self._level_arrays = levels
+        return levels
+
+    def _path_lengths(self, X: np.ndarray) -> np.ndarray:
+        """Sum of path lengths over all trees for each row"""
+        # sklearn evaluates trees on float32 input
+        X = np.asarray(X, dtype=np.float32)
+        slot_path_length = self._levels()[3]
+        depths = np.empty(X.shape[0], dtype=np.float64)
+        for start in range(0, X.shape[0], self.block_size):
+            stop = start + self.block_size
+            slots = self._block_slots(X[start:stop])
+            # Trees are added one after another, as sklearn does
+            depths[start:stop] = np.take(slot_path_length, slots, mode='wrap').sum(axis=0)
+        return depths
+
+    def _block_slots(self, X: np.ndarray) -> np.ndarray:
+        """Last-level slot reached in every tree, as a (trees x rows) array"""
+        features, thresholds, _, _ = self._levels()
+        n_rows, n_features = X.shape
+        X = np.ascontiguousarray(X)
+        X_flat = X.ravel()
+        row_offsets = np.arange(n_rows, dtype=np.intp) * n_features
+
+        slot = np.empty((self.n_estimators, n_rows), dtype=np.intp)
+        if self.max_depth == 0:
+            slot[:] = np.arange(self.n_estimators)[:, None]
+            return slot
+
+        # Level 0: every row of a tree is at its root, one broadcast comparison
+        go_right = np.greater(X[:, features[0]].T, thresholds[0][:, None])
+        np.add(np.arange(self.n_estimators, dtype=np.intp)[:, None] * 2, go_right, out=slot)
+
+        # Indices are valid by construction; mode='wrap' skips the bounds
+        # check and the output buffering that mode='raise' implies
+        index = np.empty_like(slot)
+        x = np.empty(slot.shape, dtype=np.float32)
+        threshold = np.empty(slot.shape, dtype=np.float32)
+        for feature, level_threshold in zip(features[1:], thresholds[1:]):
+            np.take(feature, slot, out=index, mode='wrap')
+            index += row_offsets
+            np.take(X_flat, index, out=x, mode='wrap')
+            np.take(level_threshold, slot, out=threshold, mode='wrap')
+            np.greater(x, threshold, out=go_right)
+            slot += slot
+            slot += go_right
+
+        return slot
+
+    def _block_leaves(self, X: np.ndarray) -> np.ndarray:
+        """Leaf reached in every tree, as a (trees x rows) array of node indices"""
+        return np.take(self._levels()[2], self._block_slots(X), mode='wrap')
+
+    def _leaf_feature_credit(self, n_features: int) -> np.ndarray:
+        """
+        Path length of each leaf split up by feature, as an (n_nodes x n_features) array
+
+        Every split on the way down adds one level, credited to the split's
+        feature; the leaf's expected remaining depth c(n) goes to the feature
+        of the split right above it. A leaf's row therefore sums to its
+        ``leaf_path_length`` (trees that are a single leaf credit nothing).
+        """
+        credit = self._leaf_credit
+        if credit is not None and credit.shape[1] == n_features:
+            return credit
+
+        n_nodes = len(self.feature)
+        is_leaf = self.children_left == np.arange(n_nodes)
+        credit = np.zeros((n_nodes, n_features))
+        depth = np.zeros(n_nodes)
+        parent_feature = np.full(n_nodes, -1, dtype=np.int64)
+
+        # Top-down: children inherit their parent's credit plus its split
+        frontier = self.tree_offsets[~is_leaf[self.tree_offsets]]
+        while len(frontier):
+            for children in (self.children_left[frontier], self.children_right[frontier]):
+                credit[children] = credit[frontier]
+                credit[children, self.feature[frontier]] += 1
+                depth[children] = depth[frontier] + 1
+                parent_feature[children] = self.feature[frontier]
+            frontier = np.concatenate([self.children_left[frontier], self.children_right[frontier]])
+            frontier = frontier[~is_leaf[frontier]]
+
+        leaves = np.flatnonzero(is_leaf & (parent_feature >= 0))
+        credit[leaves, parent_feature[leaves]] += self.leaf_path_length[leaves] - depth[leaves]
+
+        self._leaf_credit = credit
+        return credit
+
+    def path_attributions(self, X: np.ndarray, n_features: int) -> np.ndarray:
+        """
+        Average path length per row, split up by the features that isolated it
+
+        Returns:
+            (n_rows x n_features) array; each row sums to the row's average
+            path length over the trees. Short paths mean anomalies, so a
+            feature with less credit than usual made the row more anomalous.
+        """
+        credit = self._leaf_feature_credit(n_features)
+        X = np.asarray(X, dtype=np.float32)
+        result = np.empty((X.shape[0], n_features))
+        for start in range(0, X.shape[0], self.block_size):
+            stop = start + self.block_size
+            node = self._block_leaves(X[start:stop])
+            result[start:stop] = credit[node].sum(axis=0)
+        return result / self.n_estimators
+
+    def score_samples(self, X: np.ndarray) -> np.ndarray:
+        """Opposite of the anomaly score, identical to IsolationForest.score_samples"""
+        depths = self._path_lengths(X)
+        denominator = self.n_estimators * average_path_length([self.max_samples])[0]
+        if denominator == 0:
+            return -np.ones(len(depths))
+        return -(2.0 ** (-depths / denominator))
+
+    def decision_function(self, X: np.ndarray) -> np.ndarray:
+        return self.score_samples(X) - self.offset_
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """-1 for anomalies, 1 for inliers"""
+        return np.where(self.decision_function(X) < 0, -1, 1)
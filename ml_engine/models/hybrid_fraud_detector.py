@@ -3,36 +3,221 @@ FraudShield AI - Hybrid Fraud Detection Model
 Combines ML (Isolation Forest + AutoEncoder) with Rule-Based Engine
 """
 
+import importlib.util
+import os
+import time
 import numpy as np
 import pandas as pd
-from sklearn.ensemble import IsolationForest
-from sklearn.preprocessing import StandardScaler
-from typing import Dict, List, Tuple
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 import warnings
 warnings.filterwarnings('ignore')
 
-# Try to import TensorFlow, but make it optional
-try:
-    import tensorflow as tf
+from ml_engine.explainability.explainer import FraudExplainer
+from ml_engine.explainability.reasons import render_explanations
+from ml_engine.models.account_profiles import AccountAggregates, AccountProfileStore
+from ml_engine.models.flat_forest import FlatIsolationForest
+from ml_engine.models.partitioning import partition_by_account, scoring_pool
+from ml_engine.models.rules import RuleSet
+from ml_engine.models.schema import iter_transactions
+
+# sklearn and TensorFlow are only needed for training, so they are imported
+# on first use; scoring a loaded model touches neither.
+TENSORFLOW_AVAILABLE = importlib.util.find_spec('tensorflow') is not None
+if not TENSORFLOW_AVAILABLE:
+    print("⚠️  TensorFlow not available. AutoEncoder training will be disabled.")
+
+
+def _keras():
+    """Import Keras on demand (several seconds and hundreds of MB of RSS)"""
     from tensorflow import keras
-    TENSORFLOW_AVAILABLE = True
-except ImportError:
-    TENSORFLOW_AVAILABLE = False
-    print("⚠️  TensorFlow not available. AutoEncoder will be disabled.")
+    return keras
+
+
+class FittedScaler:
+    """Mean/scale of a fitted StandardScaler, applied without sklearn"""
+
+    def __init__(self, mean: np.ndarray, scale: np.ndarray,
+                 var: Optional[np.ndarray] = None, n_samples: Optional[int] = None):
+        self.mean_ = mean
+        self.scale_ = scale
+        # Variance and sample count, kept so new data can be folded in
+        self.var_ = var
+        self.n_samples_seen_ = n_samples
+
+    @classmethod
+    def from_sklearn(cls, scaler) -> 'FittedScaler':
+        return cls(scaler.mean_, scaler.scale_, scaler.var_, int(scaler.n_samples_seen_))
+
+    def updated(self, X: np.ndarray) -> 'FittedScaler':
+        """
+        Scaler fit on the original data plus ``X`` (pooled mean and variance)
+
+        Raises:
+            ValueError: If the scaler was restored without its sample count
+        """
+        if self.var_ is None or self.n_samples_seen_ is None:
+            raise ValueError("Scaler has no sample statistics; retrain to enable updates")
+
+        X = np.asarray(X, dtype=np.float64)
+        n_a, n_b = float(self.n_samples_seen_), float(len(X))
+        mean_b = X.mean(axis=0)
+        var_b = X.var(axis=0)
+
+        n = n_a + n_b
+        delta = mean_b - self.mean_
+        mean = self.mean_ + delta * n_b / n
+        var = (self.var_ * n_a + var_b * n_b + delta ** 2 * n_a * n_b / n) / n
+
+        # Near-constant features are left unscaled, as in StandardScaler
+        scale = np.sqrt(var)
+        scale[scale < 10 * np.finfo(scale.dtype).eps] = 1.0
+        return FittedScaler(mean, scale, var, int(n))
+
+    def transform(self, X: np.ndarray) -> np.ndarray:
+        """Same arithmetic as StandardScaler.transform"""
+        X = np.array(X, dtype=np.float64)
+        X -= self.mean_
+        X /= self.scale_
+        return X
+
+# Expected share of anomalies; sets the IsolationForest decision offset
+CONTAMINATION = 0.1
+
+# fraud_score = ML_WEIGHT * ml_score + RULE_WEIGHT * rule_score, both scores in 0-1;
+# a transaction is suspicious above SUSPICIOUS_THRESHOLD
+ML_WEIGHT = 0.6
+RULE_WEIGHT = 0.4
+SUSPICIOUS_THRESHOLD = 0.6
+
+# Cascade tiers: the last stage that scored a row (see HybridFraudDetector.predict)
+CASCADE_TIERS = ('rules', 'forest', 'full')
+
+TYPE_ENCODING = {'PAYMENT': 0, 'TRANSFER': 1, 'CASH_OUT': 2, 'DEBIT': 3, 'CASH_IN': 4}
+
+FEATURE_COLUMNS = [
+    'type_encoded', 'amount_log', 'amount_ratio',
+    'balance_change_orig', 'balance_change_dest',
+    'balance_orig_log', 'balance_dest_log',
+    'is_zero_balance_orig', 'is_zero_balance_dest',
+    'user_tx_count', 'user_amount_mean', 'user_amount_std',
+    'user_amount_max', 'step'
+]
+
+# TYPE_ENCODING as an index, so type codes come from one hash lookup per row
+TYPE_INDEX = pd.Index(sorted(TYPE_ENCODING, key=TYPE_ENCODING.get))
+
+
+def feature_matrix(columns, stats: Dict[str, np.ndarray]) -> np.ndarray:
+    """
+    Build the FEATURE_COLUMNS matrix for a batch of transactions
+
+    Every feature is written straight into one preallocated float32 array
+    (column-major, so each feature is a contiguous write); arithmetic runs in
+    the input precision and is only rounded on store. Nothing is added to or
+    copied from ``columns``.
+
+    Args:
+        columns: DataFrame or dict of arrays with the PaySim columns
+        stats: Per-row account statistics (count, mean, std, max), as
+            returned by ``AccountProfileStore.row_stats``
+
+    Returns:
+        (n_rows, len(FEATURE_COLUMNS)) float32 array, NaN replaced by 0
+    """
+    amount = np.asarray(columns['amount'])
+    old_orig = np.asarray(columns['oldbalanceOrg'])
+    new_orig = np.asarray(columns['newbalanceOrig'])
+    old_dest = np.asarray(columns['oldbalanceDest'])
+    new_dest = np.asarray(columns['newbalanceDest'])
+
+    X = np.empty((len(amount), len(FEATURE_COLUMNS)), dtype=np.float32, order='F')
+
+    # Transaction type (unknown types encode as 0)
+    np.maximum(TYPE_INDEX.get_indexer(columns['type']), 0, out=X[:, 0])
+
+    # Amount features
+    np.log1p(amount, out=X[:, 1])
+    np.divide(amount, old_orig + 1, out=X[:, 2])
+
+    # Balance features
+    np.subtract(old_orig, new_orig, out=X[:, 3])
+    np.subtract(new_dest, old_dest, out=X[:, 4])
+    np.log1p(old_orig, out=X[:, 5])
+    np.log1p(old_dest, out=X[:, 6])
+
+    # Transaction patterns
+    np.equal(new_orig, 0, out=X[:, 7], casting='unsafe')
+    np.equal(old_dest, 0, out=X[:, 8], casting='unsafe')
+
+    # User behavior features
+    X[:, 9] = stats['count']
+    X[:, 10] = stats['mean']
+    X[:, 11] = stats['std']
+    X[:, 12] = stats['max']
+    X[:, 13] = columns['step']
+
+    for j in range(X.shape[1]):
+        column = X[:, j]
+        np.copyto(column, 0, where=np.isnan(column))
+
+    return X
+
+
+def account_stats(df: pd.DataFrame,
+                  profiles: Optional[AccountProfileStore] = None) -> Dict[str, np.ndarray]:
+    """
+    Per-row account statistics for one batch, shared by rules and features
+
+    Args:
+        df: Transactions being scored
+        profiles: Precomputed account aggregates covering ``df``; when
+            omitted the statistics are aggregated from ``df`` in one pass
+
+    Returns:
+        Dictionary of per-row arrays: count, mean, std, max and freq
+    """
+    if profiles is not None:
+        return profiles.row_stats(df['nameOrig'].to_numpy(), df['step'].to_numpy())
+    return AccountAggregates.from_frame(df).row_stats()
+
+
+def _relu(h: np.ndarray) -> np.ndarray:
+    return np.maximum(h, 0, out=h)
+
+
+def _sigmoid(h: np.ndarray) -> np.ndarray:
+    np.negative(h, out=h)
+    np.exp(h, out=h)
+    h += 1
+    return np.reciprocal(h, out=h)
+
+
+NUMPY_ACTIVATIONS = {
+    'relu': _relu,
+    'sigmoid': _sigmoid,
+    'linear': lambda h: h,
+}
 
 
 class AutoEncoder:
     """AutoEncoder for anomaly detection"""
 
+    # Rows per NumPy forward-pass block; bounds the size of hidden activations
+    block_size = 65536
+
     def __init__(self, input_dim: int, encoding_dim: int = 8):
         self.input_dim = input_dim
         self.encoding_dim = encoding_dim
         self.model = None
         self.threshold = None
-        self.scaler = StandardScaler()
+        self.scaler = None
+        # Dense (kernel, bias) pairs and activation names for TensorFlow-free inference
+        self.layers: List[Tuple[np.ndarray, np.ndarray]] = []
+        self.activations: List[str] = []
 
     def build_model(self):
         """Build AutoEncoder architecture"""
+        keras = _keras()
         input_layer = keras.layers.Input(shape=(self.input_dim,))
 
         # Encoder
@@ -52,10 +237,14 @@ class AutoEncoder:
 
     def train(self, X: np.ndarray, epochs: int = 50, batch_size: int = 32):
         """Train the autoencoder"""
+        from sklearn.preprocessing import StandardScaler
+
         if self.model is None:
             self.build_model()
 
-        X_scaled = self.scaler.fit_transform(X)
+        scaler = StandardScaler()
+        X_scaled = scaler.fit_transform(X)
+        self.scaler = FittedScaler.from_sklearn(scaler)
 
         history = self.model.fit(
             X_scaled, X_scaled,
@@ -65,18 +254,51 @@ class AutoEncoder:
             verbose=0
         )
 
+        self.export_weights()
+
         # Calculate threshold based on reconstruction error
-        reconstructions = self.model.predict(X_scaled, verbose=0)
-        mse = np.mean(np.power(X_scaled - reconstructions, 2), axis=1)
-        self.threshold = np.percentile(mse, 95)
+        self.threshold = np.percentile(self.reconstruction_error(X), 95)
 
         return history
 
+    def export_weights(self):
+        """Copy the trained Dense layers into NumPy arrays for inference"""
+        keras = _keras()
+        dense_layers = [layer for layer in self.model.layers
+                        if isinstance(layer, keras.layers.Dense)]
+        self.layers = [
+            (kernel.astype(np.float32), bias.astype(np.float32))
+            for kernel, bias in (layer.get_weights() for layer in dense_layers)
+        ]
+        self.activations = [layer.activation.__name__ for layer in dense_layers]
+
+    def reconstruction_error(self, X: np.ndarray) -> np.ndarray:
+        """
+        Per-row mean squared reconstruction error
+
+        Runs the forward pass as float32 matmuls over the exported weights,
+        so inference never touches TensorFlow.
+        """
+        mean = np.asarray(self.scaler.mean_, dtype=np.float32)
+        scale = np.asarray(self.scaler.scale_, dtype=np.float32)
+        mse = np.empty(len(X), dtype=np.float32)
+
+        for start in range(0, len(X), self.block_size):
+            X_scaled = (np.asarray(X[start:start + self.block_size], dtype=np.float32) - mean) / scale
+            h = X_scaled
+            for (kernel, bias), activation in zip(self.layers, self.activations):
+                h = h @ kernel
+                h += bias
+                h = NUMPY_ACTIVATIONS[activation](h)
+            h -= X_scaled
+            np.square(h, out=h)
+            mse[start:start + self.block_size] = h.mean(axis=1)
+
+        return mse
+
     def predict_anomaly_score(self, X: np.ndarray) -> np.ndarray:
         """Predict anomaly scores based on reconstruction error"""
-        X_scaled = self.scaler.transform(X)
-        reconstructions = self.model.predict(X_scaled, verbose=0)
-        mse = np.mean(np.power(X_scaled - reconstructions, 2), axis=1)
+        mse = self.reconstruction_error(X)
 
         # Normalize to 0-1 range
         scores = np.clip(mse / (self.threshold * 2), 0, 1)
@@ -84,124 +306,157 @@ class AutoEncoder:
 
 
 class RuleBasedEngine:
-    """Rule-based fraud detection engine"""
-
-    def __init__(self):
-        self.rules = {}
-
-    def detect_anomalies(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Apply rule-based detection"""
-
-        # Rule 1: Unusual amount (> 3 std dev from user mean)
-        user_stats = df.groupby('nameOrig')['amount'].agg(['mean', 'std']).reset_index()
-        df = df.merge(user_stats, on='nameOrig', how='left')
-        df['rule_amount_anomaly'] = (
-            (df['amount'] > df['mean'] + 3 * df['std']) |
-            (df['amount'] > 100000)
-        ).astype(int)
-
-        # Rule 2: Balance inconsistency
-        df['rule_balance_error'] = (
-            df['oldbalanceOrg'] - df['amount'] != df['newbalanceOrig']
-        ).astype(int)
-
-        # Rule 3: Zero balance after large transaction
-        df['rule_zero_balance'] = (
-            (df['oldbalanceOrg'] > 0) &
-            (df['newbalanceOrig'] == 0) &
-            (df['amount'] > 50000)
-        ).astype(int)
-
-        # Rule 4: High-frequency transactions (more than 5 in same step)
-        freq = df.groupby(['nameOrig', 'step']).size().reset_index(name='freq')
-        df = df.merge(freq, on=['nameOrig', 'step'], how='left')
-        df['rule_high_frequency'] = (df['freq'] > 5).astype(int)
-
-        # Rule 5: Risky transaction types
-        df['rule_risky_type'] = df['type'].isin(['TRANSFER', 'CASH_OUT']).astype(int)
-
-        # Calculate rule score (0-1)
-        rule_cols = [col for col in df.columns if col.startswith('rule_')]
-        df['rule_score'] = df[rule_cols].mean(axis=1)
-
-        return df
+    """
+    Rule-based fraud detection engine
+
+    Rules are declarative (see ``ml_engine.models.rules``) and compiled into a
+    RuleSet. ``load_rules`` swaps in a new set with a single reference store,
+    so rules can be reloaded while requests are being scored; each call works
+    with the set it started with.
+    """
+
+    def __init__(self, rules: Optional[RuleSet] = None):
+        self.rules = rules if rules is not None else RuleSet.default()
+
+    def load_rules(self, path: str) -> RuleSet:
+        """
+        Compile rules from a JSON file and make them active
+
+        The new set is dry-run on a synthetic batch first; if it fails, the
+        current rules stay active.
+
+        Raises:
+            ValueError: If the file or a rule is invalid
+        """
+        rules = RuleSet.from_file(path)
+        rules.dry_run()
+        self.rules = rules
+        return rules
+
+    def detect_anomalies(self, df: pd.DataFrame,
+                         profiles: Optional[AccountProfileStore] = None,
+                         stats: Optional[Dict[str, np.ndarray]] = None) -> pd.DataFrame:
+        """
+        Apply rule-based detection
+
+        Adds a ``rule_<name>`` flag column per rule, the weighted
+        ``rule_score`` (0-1) and the account statistics the rules read.
+
+        Args:
+            df: Transactions to check
+            profiles: Precomputed account aggregates covering ``df``; when
+                omitted they are computed from ``df`` itself
+            stats: Per-row account statistics from ``account_stats``, to
+                reuse aggregates already computed for this batch
+        """
+        rules = self.rules
+        if stats is None and rules.aggregates:
+            stats = account_stats(df, profiles)
+
+        hits, rule_score = rules.evaluate(df, stats)
+
+        new_columns = {}
+        if stats is not None:
+            new_columns.update(mean=stats['mean'], std=stats['std'], freq=stats['freq'])
+        for name, flags in zip(rules.names, hits):
+            new_columns[f'rule_{name}'] = flags.view(np.int8)
+        new_columns['rule_score'] = rule_score
+
+        return df.assign(**new_columns)
 
 
 class HybridFraudDetector:
     """Main hybrid fraud detection system"""
 
-    def __init__(self):
-        self.isolation_forest = IsolationForest(
-            contamination=0.1,
-            random_state=42,
-            n_estimators=100
-        )
+    def __init__(self, rule_engine: Optional[RuleBasedEngine] = None):
+        self.isolation_forest = None
         self.autoencoder = None
-        self.rule_engine = RuleBasedEngine()
-        self.scaler = StandardScaler()
+        # May be shared between detectors so reloaded rules apply to all of them
+        self.rule_engine = rule_engine if rule_engine is not None else RuleBasedEngine()
+        self.scaler = None
         self.feature_columns = []
-
-    def prepare_features(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, np.ndarray]:
-        """Feature engineering for ML models"""
-
-        # Create a copy to avoid modifying original
-        df_features = df.copy()
-
-        # Encode transaction type
-        type_encoding = {'PAYMENT': 0, 'TRANSFER': 1, 'CASH_OUT': 2, 'DEBIT': 3, 'CASH_IN': 4}
-        df_features['type_encoded'] = df_features['type'].map(type_encoding).fillna(0)
-
-        # Amount features
-        df_features['amount_log'] = np.log1p(df_features['amount'])
-        df_features['amount_ratio'] = df_features['amount'] / (df_features['oldbalanceOrg'] + 1)
-
-        # Balance features
-        df_features['balance_change_orig'] = df_features['oldbalanceOrg'] - df_features['newbalanceOrig']
-        df_features['balance_change_dest'] = df_features['newbalanceDest'] - df_features['oldbalanceDest']
-        df_features['balance_orig_log'] = np.log1p(df_features['oldbalanceOrg'])
-        df_features['balance_dest_log'] = np.log1p(df_features['oldbalanceDest'])
-
-        # Transaction patterns
-        df_features['is_zero_balance_orig'] = (df_features['newbalanceOrig'] == 0).astype(int)
-        df_features['is_zero_balance_dest'] = (df_features['oldbalanceDest'] == 0).astype(int)
-
-        # User behavior features
-        user_features = df_features.groupby('nameOrig').agg({
-            'amount': ['count', 'mean', 'std', 'max'],
-            'step': ['min', 'max']
-        }).reset_index()
-        user_features.columns = ['nameOrig', 'user_tx_count', 'user_amount_mean',
-                                 'user_amount_std', 'user_amount_max',
-                                 'user_step_min', 'user_step_max']
-
-        df_features = df_features.merge(user_features, on='nameOrig', how='left')
-        df_features['user_amount_std'] = df_features['user_amount_std'].fillna(0)
-
-        # Select feature columns for ML
-        self.feature_columns = [
-            'type_encoded', 'amount_log', 'amount_ratio',
-            'balance_change_orig', 'balance_change_dest',
-            'balance_orig_log', 'balance_dest_log',
-            'is_zero_balance_orig', 'is_zero_balance_dest',
-            'user_tx_count', 'user_amount_mean', 'user_amount_std',
-            'user_amount_max', 'step'
-        ]
-
-        X = df_features[self.feature_columns].fillna(0).values
-
-        return df_features, X
+        self.flat_forest = None
+        self.profiles = None
+        # Path-based attributions for the forest (baseline from training data)
+        self.explainer = None
+        # Range of training-set IsolationForest scores; normalizing against it
+        # (rather than the batch being scored) keeps scores a per-row function
+        self.iso_score_min = None
+        self.iso_score_max = None
+
+    @property
+    def is_trained(self) -> bool:
+        return self.flat_forest is not None
+
+    def save(self, path: str) -> Dict:
+        """Persist the trained model as a versioned artifact directory"""
+        from ml_engine.models.artifacts import save_detector
+        return save_detector(self, path)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> 'HybridFraudDetector':
+        """Load a model saved with ``save``; arrays are memory-mapped by default"""
+        from ml_engine.models.artifacts import load_detector
+        return load_detector(path, mmap=mmap)
+
+    def prepare_features(self, df: pd.DataFrame,
+                         profiles: Optional[AccountProfileStore] = None,
+                         stats: Optional[Dict[str, np.ndarray]] = None) -> np.ndarray:
+        """
+        Feature engineering for ML models
+
+        ``df`` is read but never modified or copied; see ``feature_matrix``.
+
+        Args:
+            df: Transactions to featurize
+            profiles: Precomputed account aggregates covering ``df``; when
+                omitted user behaviour features are computed from ``df`` itself
+            stats: Per-row account statistics from ``account_stats``, to
+                reuse aggregates already computed for this batch
+
+        Returns:
+            float32 feature matrix with columns in FEATURE_COLUMNS order
+        """
+        # No writes to self: a published detector is shared by concurrent
+        # scoring threads
+        if stats is None:
+            stats = account_stats(df, profiles)
+        return feature_matrix(df, stats)
 
     def train(self, df: pd.DataFrame):
         """Train all models"""
+        from sklearn.ensemble import IsolationForest
+        from sklearn.preprocessing import StandardScaler
+
         print("🔧 Training FraudShield AI models...")
 
         # Prepare features
-        df_features, X = self.prepare_features(df)
+        self.feature_columns = list(FEATURE_COLUMNS)
+        aggregates = AccountAggregates.from_frame(df)
+        X = self.prepare_features(df, stats=aggregates.row_stats())
 
-        # Train Isolation Forest
+        # Train Isolation Forest (on the same float64 scaling predict applies)
         print("  → Training Isolation Forest...")
-        X_scaled = self.scaler.fit_transform(X)
+        self.scaler = FittedScaler.from_sklearn(StandardScaler().fit(X))
+        X_scaled = self.scaler.transform(X)
+        self.isolation_forest = IsolationForest(
+            contamination=CONTAMINATION,
+            random_state=42,
+            n_estimators=100
+        )
         self.isolation_forest.fit(X_scaled)
+        self.flat_forest = FlatIsolationForest.from_sklearn(self.isolation_forest)
+        train_scores = self.flat_forest.score_samples(X_scaled)
+        self.iso_score_min = float(train_scores.min())
+        self.iso_score_max = float(train_scores.max())
+
+        # Per-account profiles for single-transaction scoring
+        print("  → Building account profiles...")
+        self.profiles = aggregates.to_profiles()
+
+        print("  → Computing attribution baseline...")
+        self.explainer = FraudExplainer(self.flat_forest, self.feature_columns, self.scaler)
+        self.explainer.initialize_explainer(X)
 
         # Train AutoEncoder (if TensorFlow is available)
         if TENSORFLOW_AVAILABLE:
@@ -213,85 +468,467 @@ class HybridFraudDetector:
 
         print("✅ Training complete!")
 
-    def predict(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Detect fraud with hybrid approach"""
+    def update(self, df: pd.DataFrame, refresh_fraction: float = 0.2,
+               random_state: Optional[int] = 42) -> 'HybridFraudDetector':
+        """
+        Fold a window of new transactions into the model without a full retrain
+
+        Account profiles and scaler statistics absorb the new rows exactly;
+        the IsolationForest drops its oldest ``refresh_fraction`` of trees and
+        grows the same number on the new window, so the forest tracks drift
+        like a sliding window. Old trees keep their raw-space split points
+        under the updated scaler. The AutoEncoder is left as trained; the
+        attribution baseline is recomputed on the new window.
+
+        The detector itself is not modified (it may be serving requests); a
+        new detector is returned.
+
+        Args:
+            df: New transactions (not already seen by the model)
+            refresh_fraction: Share of trees to replace, in (0, 1]
+            random_state: Seed for the replacement trees
+
+        Returns:
+            The updated detector
+        """
+        from sklearn.ensemble import IsolationForest
+
+        if not self.is_trained:
+            raise ValueError("Cannot update an untrained detector")
+        if not 0 < refresh_fraction <= 1:
+            raise ValueError("refresh_fraction must be in (0, 1]")
+
+        forest = self.flat_forest
+        if len(df) < forest.max_samples:
+            raise ValueError(
+                f"Need at least {forest.max_samples} new transactions to grow replacement trees"
+            )
+
+        print(f"🔄 Updating model with {len(df)} new transactions...")
+
+        # Per-account aggregates over history + new window
+        profiles = AccountProfileStore.combine([
+            self.profiles if self.profiles is not None else AccountProfileStore.empty(),
+            AccountProfileStore.from_frame(df),
+        ])
+
+        # Features for the new rows see the merged account history
+        X = self.prepare_features(df, profiles)
+        scaler = self.scaler.updated(X)
+        X_scaled = scaler.transform(X)
+
+        # Sliding-window forest: oldest trees out, trees on the new window in
+        n_trees = max(1, int(round(refresh_fraction * forest.n_estimators)))
+        print(f"  → Replacing {n_trees} of {forest.n_estimators} trees...")
+        window_forest = IsolationForest(
+            n_estimators=n_trees,
+            max_samples=forest.max_samples,
+            contamination=CONTAMINATION,
+            random_state=random_state
+        ).fit(X_scaled)
+
+        kept = forest.rescaled(self.scaler.mean_, self.scaler.scale_, scaler.mean_, scaler.scale_)
+        combined = kept.replace_oldest(n_trees, FlatIsolationForest.from_sklearn(window_forest), 0.0)
+        window_scores = combined.score_samples(X_scaled)
+        combined.offset_ = float(np.percentile(window_scores, 100 * CONTAMINATION))
+
+        updated = HybridFraudDetector(self.rule_engine)
+        updated.feature_columns = list(self.feature_columns)
+        updated.autoencoder = self.autoencoder
+        updated.scaler = scaler
+        updated.flat_forest = combined
+        updated.isolation_forest = combined
+        updated.profiles = profiles
+        updated.explainer = FraudExplainer(combined, updated.feature_columns, scaler)
+        updated.explainer.initialize_explainer(X)
+        # Widen (never narrow) the calibration range so existing scores stay put
+        updated.iso_score_min = min(self.iso_score_min, float(window_scores.min()))
+        updated.iso_score_max = max(self.iso_score_max, float(window_scores.max()))
+
+        print("✅ Update complete!")
+        return updated
+
+    def normalize_iso_scores(self, iso_scores: np.ndarray) -> np.ndarray:
+        """
+        Map raw ``score_samples`` output to 0-1 (higher = more anomalous)
+
+        Calibrated once on the training set, so a transaction gets the same
+        score whatever else is in the batch, and chunked or streamed scoring
+        matches scoring the whole file at once.
+        """
+        score_range = self.iso_score_max - self.iso_score_min
+        if score_range == 0:
+            return np.zeros(len(iso_scores))
+        return np.clip(1 - (iso_scores - self.iso_score_min) / score_range, 0, 1)
+
+    def predict(self, df: pd.DataFrame,
+                profiles: Optional[AccountProfileStore] = None,
+                cascade: bool = False, workers: int = 1) -> pd.DataFrame:
+        """
+        Detect fraud with hybrid approach
+
+        Args:
+            df: Transactions to score
+            profiles: Account aggregates to use instead of aggregating ``df``;
+                lets a chunk be scored with statistics of the whole dataset
+            cascade: Score in tiers and skip the ML models for rows that can
+                no longer cross the suspicious threshold (see ``_cascade_ml_scores``).
+                ``is_suspicious`` is unchanged; for skipped rows ``fraud_score``
+                is a lower bound and ``fraud_score_max`` an upper bound. A
+                report is left in ``result.attrs['cascade']``.
+            workers: Score in this many processes, with the batch partitioned
+                by account (see ``_predict_partitioned``)
+        """
+        if workers > 1 and len(df) > 0:
+            return self._predict_partitioned(df, profiles, cascade, workers)
+
+        start = time.perf_counter()
+
+        # Account statistics are aggregated once and shared by rules and features
+        stats = account_stats(df, profiles)
 
         # Apply rule-based detection
-        df_rules = self.rule_engine.detect_anomalies(df)
-
-        # Prepare features for ML
-        df_features, X = self.prepare_features(df_rules)
-        X_scaled = self.scaler.transform(X)
+        df_rules = self.rule_engine.detect_anomalies(df, stats=stats)
+        rule_score = df_rules['rule_score'].to_numpy()
 
-        # Isolation Forest predictions (-1 for anomaly, 1 for normal)
-        iso_predictions = self.isolation_forest.predict(X_scaled)
-        iso_scores = self.isolation_forest.score_samples(X_scaled)
-        # Normalize to 0-1 (higher = more anomalous) with safe division
-        score_range = iso_scores.max() - iso_scores.min()
-        if score_range == 0:
-            iso_scores_norm = np.zeros(len(iso_scores))
+        if cascade:
+            iso_scores_norm, ae_scores, tier, stage_times = self._cascade_ml_scores(df, stats, rule_score)
         else:
-            iso_scores_norm = 1 - (iso_scores - iso_scores.min()) / score_range
+            # Prepare features for ML
+            X = self.prepare_features(df, stats=stats)
+            X_scaled = self.scaler.transform(X)
 
-        # AutoEncoder predictions (if available)
-        if TENSORFLOW_AVAILABLE and self.autoencoder is not None:
-            ae_scores = self.autoencoder.predict_anomaly_score(X)
+            # Isolation Forest scores, normalized against the training distribution
+            iso_scores_norm = self.normalize_iso_scores(self.flat_forest.score_samples(X_scaled))
+
+            # AutoEncoder predictions (if available)
+            if self.autoencoder is not None:
+                ae_scores = self.autoencoder.predict_anomaly_score(X)
+            else:
+                ae_scores = np.zeros(len(df))
+
+        if self.autoencoder is not None:
             ml_score = (iso_scores_norm + ae_scores) / 2
         else:
-            ae_scores = np.zeros(len(df))
             ml_score = iso_scores_norm
 
-        # Combine scores
-        df_result = df_rules.copy()
+        # Combine scores (df_rules is already a new frame; no need to copy it)
+        df_result = df_rules
         df_result['ml_isolation_forest_score'] = iso_scores_norm
         df_result['ml_autoencoder_score'] = ae_scores
         df_result['ml_score'] = ml_score
 
         # Final combined fraud score (ML + Rules)
-        df_result['fraud_score'] = (
-            0.6 * df_result['ml_score'] +
-            0.4 * df_result['rule_score']
-        )
+        df_result['fraud_score'] = ML_WEIGHT * ml_score + RULE_WEIGHT * rule_score
 
         # Flag as suspicious if fraud_score > 0.6
-        df_result['is_suspicious'] = (df_result['fraud_score'] > 0.6).astype(int)
+        df_result['is_suspicious'] = (df_result['fraud_score'] > SUSPICIOUS_THRESHOLD).astype(int)
+
+        if cascade:
+            df_result['fraud_score_max'] = self._max_fraud_score(rule_score, iso_scores_norm, ml_score, tier)
+            df_result['scoring_tier'] = tier
+            df_result.attrs['cascade'] = self._cascade_report(
+                tier, stage_times, time.perf_counter() - start
+            )
 
         return df_result
 
-    def explain_transaction(self, row: pd.Series) -> str:
-        """Generate human-readable explanation for suspicious transaction"""
+    def _predict_partitioned(self, df: pd.DataFrame,
+                             profiles: Optional[AccountProfileStore],
+                             cascade: bool, workers: int) -> pd.DataFrame:
+        """
+        ``predict`` across worker processes
+
+        Rows are hash-partitioned by ``nameOrig`` so each account's
+        transactions, and therefore its aggregates, stay in one partition;
+        results equal single-process ``predict`` and come back in input
+        order. Partitions are scored by the process-wide ``ScoringPool`` with
+        ``workers`` processes, which loads the model memory-mapped.
+        """
+        start = time.perf_counter()
+        order, bounds = partition_by_account(df['nameOrig'].to_numpy(), workers)
+        new_columns, reports = scoring_pool(workers).score(self, df, order, bounds, profiles, cascade)
+        df_result = df.assign(**new_columns)
+
+        if cascade:
+            elapsed = time.perf_counter() - start
+            # Partitions ran side by side, so their skipped ML time overlaps too
+            skipped = sum(r['estimated_full_seconds'] - r['seconds'] for r in reports) / len(reports)
+            report = self._cascade_report(new_columns['scoring_tier'], {}, elapsed)
+            report['estimated_full_seconds'] = elapsed + skipped
+            report['estimated_speedup'] = (elapsed + skipped) / elapsed if elapsed else 1.0
+            report['workers'] = len(reports)
+            df_result.attrs['cascade'] = report
 
-        reasons = []
+        return df_result
 
-        # Check ML scores
-        if row.get('ml_score', 0) > 0.7:
-            reasons.append(f"ML models detected highly anomalous pattern (score: {row['ml_score']:.2f})")
+    def _cascade_ml_scores(self, df: pd.DataFrame, stats: Dict[str, np.ndarray],
+                           rule_score: np.ndarray
+                           ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, Dict[str, Tuple[float, int]]]:
+        """
+        ML scores for the rows the rules alone cannot clear
+
+        With ml_score <= 1, a row whose ``RULE_WEIGHT * rule_score + ML_WEIGHT``
+        does not exceed the threshold cannot be suspicious and stops after the
+        rules. Of the rest, with an AutoEncoder, ml_score <= (iso + 1) / 2
+        bounds the rows that stop after the IsolationForest. Model scores of
+        skipped rows are left at 0.
+
+        Returns:
+            (iso scores, AutoEncoder scores, per-row tier index into
+            CASCADE_TIERS, {stage: (seconds, rows)} for the forest and
+            AutoEncoder stages)
+        """
+        n_rows = len(rule_score)
+        iso_scores = np.zeros(n_rows)
+        ae_scores = np.zeros(n_rows)
+        tier = np.zeros(n_rows, dtype=np.int8)
+        stage_times = {}
+
+        start = time.perf_counter()
+        rows = np.flatnonzero(RULE_WEIGHT * rule_score + ML_WEIGHT > SUSPICIOUS_THRESHOLD)
+        if len(rows) == 0:
+            return iso_scores, ae_scores, tier, stage_times
+
+        X = self._features_for_rows(df, stats, rows)
+        iso_scores[rows] = self.normalize_iso_scores(
+            self.flat_forest.score_samples(self.scaler.transform(X))
+        )
+        stage_times['forest'] = (time.perf_counter() - start, len(rows))
+
+        if self.autoencoder is None:
+            # Without an AutoEncoder the forest score is the full ML score
+            tier[rows] = CASCADE_TIERS.index('full')
+            return iso_scores, ae_scores, tier, stage_times
+
+        tier[rows] = CASCADE_TIERS.index('forest')
+        start = time.perf_counter()
+        ml_max = (iso_scores[rows] + 1) / 2
+        keep = RULE_WEIGHT * rule_score[rows] + ML_WEIGHT * ml_max > SUSPICIOUS_THRESHOLD
+        ae_scores[rows[keep]] = self.autoencoder.predict_anomaly_score(X[keep])
+        tier[rows[keep]] = CASCADE_TIERS.index('full')
+        stage_times['autoencoder'] = (time.perf_counter() - start, int(keep.sum()))
+
+        return iso_scores, ae_scores, tier, stage_times
+
+    @staticmethod
+    def _features_for_rows(df: pd.DataFrame, stats: Dict[str, np.ndarray],
+                           rows: np.ndarray, stat_rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Feature matrix for the rows at positions ``rows`` of a batch
+
+        ``stats`` are read at ``stat_rows`` (default ``rows``), for statistics
+        computed over part of the batch.
+        """
+        stat_rows = rows if stat_rows is None else stat_rows
+        columns = {name: np.asarray(df[name])[rows] for name in
+                   ('type', 'amount', 'step', 'oldbalanceOrg', 'newbalanceOrig',
+                    'oldbalanceDest', 'newbalanceDest')}
+        return feature_matrix(columns, {name: values[stat_rows] for name, values in stats.items()})
+
+    def explain(self, df: pd.DataFrame, rows: Optional[np.ndarray] = None,
+                profiles: Optional[AccountProfileStore] = None,
+                max_features: int = 5) -> List[Dict]:
+        """
+        IsolationForest feature attributions for transactions of a batch
+
+        Args:
+            df: The batch; account statistics are computed over all of it,
+                as in ``predict`` (without ``profiles``, only over the
+                transactions of the explained rows' accounts, which gives the
+                same statistics)
+            rows: Positions of the rows to explain (default: every row)
+            profiles: Precomputed account aggregates, as for ``predict``
+            max_features: Features to report per row
+
+        Returns:
+            Per explained row, its largest contributions as
+            ``{feature: {value, contribution, impact}}`` (see ``FraudExplainer``)
+        """
+        if self.explainer is None or self.explainer.baseline is None:
+            raise ValueError("Model has no attribution baseline; retrain to enable explanations")
+        rows = np.arange(len(df)) if rows is None else np.asarray(rows)
+        if profiles is None and len(rows) < len(df):
+            # Aggregates are per sender: every transaction of the explained
+            # rows' senders is all they need
+            codes, uniques = pd.factorize(df['nameOrig'], use_na_sentinel=False)
+            wanted = np.zeros(len(uniques), dtype=bool)
+            wanted[codes[rows]] = True
+            related = np.flatnonzero(wanted[codes])
+            stats = account_stats(df[['nameOrig', 'amount', 'step']].take(related))
+            X = self._features_for_rows(df, stats, rows, np.searchsorted(related, rows))
+        else:
+            X = self._features_for_rows(df, account_stats(df, profiles), rows)
+        return self.explainer.explain_batch(X, max_features)
+
+    @staticmethod
+    def _max_fraud_score(rule_score: np.ndarray, iso_scores: np.ndarray,
+                         ml_score: np.ndarray, tier: np.ndarray) -> np.ndarray:
+        """Highest fraud_score each row could have had if fully scored"""
+        ml_max = np.select(
+            [tier == CASCADE_TIERS.index('rules'), tier == CASCADE_TIERS.index('forest')],
+            [1.0, (iso_scores + 1) / 2],
+            ml_score
+        )
+        return ML_WEIGHT * ml_max + RULE_WEIGHT * rule_score
+
+    @staticmethod
+    def _cascade_report(tier: np.ndarray, stage_times: Dict[str, Tuple[float, int]],
+                        total_time: float) -> Dict:
+        """
+        Share of rows per tier and the throughput gained over full scoring
+
+        The full-scoring time is estimated by charging the rows each ML stage
+        skipped that stage's measured per-row cost.
+        """
+        n_rows = len(tier)
+        counts = np.bincount(tier, minlength=len(CASCADE_TIERS))
+        full_time = total_time + sum(
+            seconds / rows * (n_rows - rows) for seconds, rows in stage_times.values() if rows
+        )
+        return {
+            'rows': n_rows,
+            'tiers': {name: float(count / n_rows) if n_rows else 0.0
+                      for name, count in zip(CASCADE_TIERS, counts)},
+            'seconds': total_time,
+            'rows_per_second': n_rows / total_time if total_time else 0.0,
+            'estimated_full_seconds': full_time,
+            'estimated_speedup': full_time / total_time if total_time else 1.0,
+        }
+
+    def predict_iter(self, source: Union[str, os.PathLike, Callable[[], Iterable[pd.DataFrame]]],
+                     chunksize: int = 100_000, cascade: bool = False,
+                     workers: int = 1) -> Iterator[pd.DataFrame]:
+        """
+        Out-of-core ``predict`` for files too large to load at once
+
+        Makes two passes over the data: the first folds every chunk into
+        per-account aggregates, the second scores chunk by chunk against those
+        aggregates. Results match ``predict`` on the whole file while peak
+        memory is bounded by the chunk size plus the per-account tables.
+
+        Args:
+            source: CSV path (parsed with the ingestion schema, see
+                ``iter_transactions``), or a callable returning a fresh
+                iterable of DataFrame chunks (it is called once per pass)
+            chunksize: Rows per chunk when reading a CSV path
+            cascade: Score each chunk in cascade mode (see ``predict``)
+            workers: Processes to score each chunk with (see ``predict``)
+
+        Yields:
+            Scored chunks, in input order
+        """
+        if callable(source):
+            read_chunks = source
+        else:
+            def read_chunks():
+                # Typed like an upload; account IDs stay categorical (not added
+                # to the shared account dictionary, which holds the model's)
+                with open(source, 'rb') as f:
+                    yield from iter_transactions(f, chunksize)
+
+        # Pass 1: account aggregates over the full input, merged as chunks arrive
+        profiles = AccountProfileStore.combine(
+            AccountProfileStore.from_frame(chunk) for chunk in read_chunks()
+        )
 
-        # Check rule violations
-        if row.get('rule_amount_anomaly', 0) == 1:
-            reasons.append(f"Transaction amount ${row['amount']:,.2f} is unusually high for this user")
+        # Pass 2: score each chunk against the global aggregates
+        for chunk in read_chunks():
+            yield self.predict(chunk, profiles, cascade, workers)
+
+    def score_records(self, records: List[Dict], max_features: int = 0) -> Dict[str, np.ndarray]:
+        """
+        Score a handful of transactions against the training-time account profiles
+
+        NumPy-only fast path for online scoring: no DataFrame is built and
+        account statistics come from ``self.profiles`` merged with the records
+        themselves, instead of from the (tiny) batch alone.
+
+        Args:
+            records: Transactions as dicts with the PaySim columns
+            max_features: If positive, also explain each record with its
+                largest feature attributions (see ``explain``)
+
+        Returns:
+            Dictionary of per-record arrays (fraud_score, ml_score, rule_score,
+            is_suspicious, individual rule flags and model scores), plus a
+            ``feature_contributions`` list when ``max_features`` is set
+        """
+        if self.profiles is None:
+            raise ValueError("Model has no account profiles; retrain to enable scoring")
+        if max_features and (self.explainer is None or self.explainer.baseline is None):
+            raise ValueError("Model has no attribution baseline; retrain to enable explanations")
+
+        tx_type = [r['type'] for r in records]
+        step = np.array([r['step'] for r in records], dtype=np.int64)
+        amount = np.array([r['amount'] for r in records], dtype=np.float64)
+        old_orig = np.array([r['oldbalanceOrg'] for r in records], dtype=np.float64)
+        new_orig = np.array([r['newbalanceOrig'] for r in records], dtype=np.float64)
+        old_dest = np.array([r['oldbalanceDest'] for r in records], dtype=np.float64)
+        new_dest = np.array([r['newbalanceDest'] for r in records], dtype=np.float64)
+
+        names = np.array([r['nameOrig'] for r in records])
+        stats = self.profiles.combined_stats(names, amount, step)
+
+        columns = {
+            'type': tx_type, 'amount': amount, 'step': step,
+            'nameOrig': names, 'nameDest': [r['nameDest'] for r in records],
+            'oldbalanceOrg': old_orig, 'newbalanceOrig': new_orig,
+            'oldbalanceDest': old_dest, 'newbalanceDest': new_dest,
+        }
+
+        # Rules (the same compiled set as RuleBasedEngine)
+        rules = self.rule_engine.rules
+        hits, rule_score = rules.evaluate(columns, stats)
+
+        # Features (same builder as predict)
+        X = feature_matrix(columns, stats)
+        X_scaled = self.scaler.transform(X)
 
-        if row.get('rule_balance_error', 0) == 1:
-            reasons.append("Balance calculations don't match (possible data manipulation)")
+        iso_scores_norm = self.normalize_iso_scores(self.flat_forest.score_samples(X_scaled))
 
-        if row.get('rule_zero_balance', 0) == 1:
-            reasons.append("Large transaction leaving zero balance (possible account draining)")
+        if self.autoencoder is not None:
+            ae_scores = self.autoencoder.predict_anomaly_score(X)
+            ml_score = (iso_scores_norm + ae_scores) / 2
+        else:
+            ae_scores = np.zeros(len(records))
+            ml_score = iso_scores_norm
 
-        if row.get('rule_high_frequency', 0) == 1:
-            reasons.append(f"High-frequency transactions detected ({row.get('freq', 0)} in same time period)")
+        fraud_score = ML_WEIGHT * ml_score + RULE_WEIGHT * rule_score
+
+        scores = {
+            'fraud_score': fraud_score,
+            'ml_score': ml_score,
+            'rule_score': rule_score,
+            'ml_isolation_forest_score': iso_scores_norm,
+            'ml_autoencoder_score': ae_scores,
+            'is_suspicious': (fraud_score > SUSPICIOUS_THRESHOLD).astype(int),
+            'freq': stats['freq'],
+        }
+        for name, flags in zip(rules.names, hits):
+            scores[f'rule_{name}'] = flags.astype(int)
+        if max_features:
+            scores['feature_contributions'] = self.explainer.explain_batch(X, max_features)
+        return scores
 
-        if row.get('rule_risky_type', 0) == 1 and row.get('fraud_score', 0) > 0.6:
-            reasons.append(f"Risky transaction type: {row['type']}")
+    def explain_transaction(self, row: pd.Series) -> str:
+        """Generate human-readable explanation for suspicious transaction"""
+        return self.explain_transactions(pd.DataFrame([row]))[0]
 
-        # Additional contextual info
-        if row['amount'] > 100000:
-            reasons.append(f"Very large transaction amount: ${row['amount']:,.2f}")
+    def explain_transactions(self, df_result: pd.DataFrame,
+                             rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Human-readable explanations for rows of a ``predict`` result
 
-        if row['newbalanceOrig'] == 0 and row['oldbalanceOrg'] > 0:
-            reasons.append("Account completely emptied after transaction")
+        Rendered from reason-code templates in one vectorized pass, with a
+        reason per rule of the active rule set (see
+        ``ml_engine.explainability.reasons``).
 
-        if len(reasons) == 0:
-            return f"Moderately suspicious based on behavioral patterns (fraud score: {row['fraud_score']:.2f})"
+        Args:
+            df_result: Output of ``predict``
+            rows: Positions of the rows to explain (default: every row)
 
-        explanation = " | ".join(reasons)
-        return explanation
+        Returns:
+            Object array of explanation strings
+        """
+        return render_explanations(df_result, self.rule_engine.rules, rows)
@@ -0,0 +1,241 @@
+"""
+FraudShield AI - Account Partitioning
+Multi-process scoring of a batch split by account
+
+Every account aggregate the rules and features read is keyed by
+``nameOrig``, so a batch split by account can be scored one partition at a
+time with the same results as scoring it whole.
+
+Workers belong to a persistent ``ScoringPool`` started with the forkserver
+(spawn where it is unavailable), never forked from the server process: a
+fork of a process with running threads can inherit a lock (a RuleSet's,
+the account dictionary's) held by a thread that does not exist in the
+child. A model is written once as an artifact in the pool's scratch
+directory and memory-mapped by every worker; rules travel as their specs.
+Each task carries only its partition, and the columns ``predict`` adds come
+back as ``.npy`` files that the parent maps and scatters into place.
+"""
+
+import atexit
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+import weakref
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ml_engine.models.account_dictionary import is_encoded
+
+# Models and profile stores a worker keeps loaded, most recent first out
+WORKER_CACHE_SIZE = 4
+
+# In worker processes: loaded models / profile stores by path, rule sets by key
+_LOADED: "OrderedDict[str, object]" = OrderedDict()
+_RULES: "OrderedDict[Tuple, object]" = OrderedDict()
+
+
+def start_method() -> str:
+    """Start method of scoring workers: forkserver where available, else spawn"""
+    return 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+
+def partition_by_account(names: np.ndarray, n_partitions: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Assign rows to partitions by a hash of their account
+
+    Args:
+        names: Account per row (IDs or account codes)
+        n_partitions: Number of partitions
+
+    Returns:
+        (order, bounds): row indices grouped by partition, in input order
+        within each partition, and the ``n_partitions + 1`` offsets of the
+        partitions in ``order``
+    """
+    hashes = pd.util.hash_array(np.asarray(names))
+    partition = (hashes % np.uint64(n_partitions)).astype(np.intp)
+    order = np.argsort(partition, kind='stable')
+    bounds = np.zeros(n_partitions + 1, dtype=np.int64)
+    np.cumsum(np.bincount(partition, minlength=n_partitions), out=bounds[1:])
+    return order, bounds
+
+
+def _write_profiles(profiles, path: str, with_code_index: bool):
+    staging = f"{path}.part"
+    os.makedirs(staging)
+    for name, array in profiles.to_arrays().items():
+        np.save(os.path.join(staging, f"{name}.npy"), np.ascontiguousarray(array))
+    if with_code_index:
+        # Workers have their own account dictionary; ship this process's codes
+        np.save(os.path.join(staging, "index_by_code.npy"), profiles._code_index())
+    os.rename(staging, path)
+
+
+def _read_profiles(path: str):
+    from ml_engine.models.account_profiles import AccountProfileStore
+
+    def read(name):
+        return np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r').view(np.ndarray)
+
+    profiles = AccountProfileStore(**{name: read(name) for name in AccountProfileStore.ARRAY_NAMES})
+    if os.path.exists(os.path.join(path, "index_by_code.npy")):
+        profiles._index_by_code = read("index_by_code")
+    return profiles
+
+
+def _cached(cache: OrderedDict, key, load):
+    value = cache.get(key)
+    if value is None:
+        value = cache[key] = load()
+        while len(cache) > WORKER_CACHE_SIZE:
+            cache.popitem(last=False)
+    else:
+        cache.move_to_end(key)
+    return value
+
+
+def _score_partition(task: Tuple) -> Tuple[List[Tuple[str, str]], Optional[Dict], Tuple]:
+    """Worker: score one partition and write the columns ``predict`` added"""
+    from ml_engine.models.hybrid_fraud_detector import HybridFraudDetector, RuleBasedEngine
+    from ml_engine.models.rules import RuleSet
+
+    model_path, rules_key, rule_specs, profiles_path, part, cascade, out_dir = task
+    detector = _cached(_LOADED, model_path, lambda: HybridFraudDetector.load(model_path))
+    rules = _cached(_RULES, rules_key, lambda: RuleSet.from_specs(rule_specs, rules_key[0]))
+    detector.rule_engine = RuleBasedEngine(rules)
+    profiles = (_cached(_LOADED, profiles_path, lambda: _read_profiles(profiles_path))
+                if profiles_path is not None else None)
+
+    # Rule metrics recorded here would stay in this process; send them back
+    before = rules.counters()
+    result = detector.predict(part, profiles=profiles, cascade=cascade)
+    after = rules.counters()
+
+    os.makedirs(out_dir)
+    files = []
+    for i, name in enumerate(name for name in result.columns if name not in part.columns):
+        file_name = os.path.join(out_dir, f"{i}.npy")
+        np.save(file_name, result[name].to_numpy())
+        files.append((name, file_name))
+    counters = tuple(a - b for a, b in zip(after, before))
+    return files, result.attrs.get('cascade'), counters
+
+
+class ScoringPool:
+    """
+    Persistent worker processes for account-partitioned ``predict``
+
+    Models and profile stores are written to the scratch directory the
+    first time they are scored with, and removed when they are garbage
+    collected, so each model is written once however many batches it
+    scores. A detector must not be modified after that (``update`` returns
+    a new one).
+    """
+
+    def __init__(self, processes: int, directory: Optional[str] = None):
+        self.processes = processes
+        self.directory = tempfile.mkdtemp(prefix="fraudshield_scoring_", dir=directory)
+        context = multiprocessing.get_context(start_method())
+        if context.get_start_method() == 'forkserver':
+            # Imported once in the fork server rather than in every worker
+            context.set_forkserver_preload(['ml_engine.models.hybrid_fraud_detector'])
+        self._pool = context.Pool(processes)
+        self._spilled: Dict[Tuple, str] = {}
+        # Reentrant: a collection during _spill may run _forget on this thread
+        self._lock = threading.RLock()
+
+    def close(self):
+        """Stop the workers and remove the scratch directory"""
+        self._pool.terminate()
+        self._pool.join()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _spill(self, key: Tuple, obj, write) -> str:
+        with self._lock:
+            path = self._spilled.get(key)
+            if path is None:
+                path = os.path.join(self.directory, uuid.uuid4().hex)
+                write(path)
+                self._spilled[key] = path
+                weakref.finalize(obj, self._forget, key, path)
+        return path
+
+    def _forget(self, key: Tuple, path: str):
+        with self._lock:
+            self._spilled.pop(key, None)
+        shutil.rmtree(path, ignore_errors=True)
+
+    def score(self, detector, df: pd.DataFrame, order: np.ndarray, bounds: np.ndarray,
+              profiles=None, cascade: bool = False
+              ) -> Tuple[Dict[str, np.ndarray], List[Optional[Dict]]]:
+        """
+        Score each non-empty partition of ``df`` in a worker
+
+        Returns:
+            (columns ``predict`` added, in input row order; the cascade
+            report of each partition, or None)
+        """
+        model_path = self._spill(('model', id(detector)), detector,
+                                 lambda path: detector.save(path))
+        profiles_path = None
+        if profiles is not None:
+            encoded = is_encoded(df['nameOrig'])
+            profiles_path = self._spill(('profiles', id(profiles), encoded), profiles,
+                                        lambda path: _write_profiles(profiles, path, encoded))
+
+        # The rule set active now; workers compile it once per key
+        rules = detector.rule_engine.rules
+        rules_key = (rules.source, rules.loaded_at, id(rules))
+        rule_specs = [rule.to_spec() for rule in rules.rules]
+
+        partitions = [i for i in range(len(bounds) - 1) if bounds[i + 1] > bounds[i]]
+        run_dir = os.path.join(self.directory, f"run-{uuid.uuid4().hex}")
+        tasks = [(model_path, rules_key, rule_specs, profiles_path,
+                  df.take(order[bounds[i]:bounds[i + 1]]), cascade,
+                  os.path.join(run_dir, str(i)))
+                 for i in partitions]
+        try:
+            results = self._pool.map(_score_partition, tasks)
+
+            # Scatter each partition's rows straight to their input position
+            columns = {}
+            for i, (files, _, counters) in zip(partitions, results):
+                rows = order[bounds[i]:bounds[i + 1]]
+                for name, file_name in files:
+                    values = np.load(file_name, mmap_mode='r')
+                    if name not in columns:
+                        columns[name] = np.empty(len(df), dtype=values.dtype)
+                    columns[name][rows] = values
+                # Workers evaluated the rule set that was active when the call started
+                rules.add_counters(*counters)
+        finally:
+            shutil.rmtree(run_dir, ignore_errors=True)
+        return columns, [report for _, report, _ in results]
+
+
+_POOLS: Dict[int, ScoringPool] = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def scoring_pool(processes: int) -> ScoringPool:
+    """The process-wide ScoringPool with ``processes`` workers, started on first use"""
+    with _POOLS_LOCK:
+        pool = _POOLS.get(processes)
+        if pool is None:
+            pool = _POOLS[processes] = ScoringPool(processes)
+        return pool
+
+
+@atexit.register
+def _close_pools():
+    with _POOLS_LOCK:
+        pools = list(_POOLS.values())
+        _POOLS.clear()
+    for pool in pools:
+        pool.close()
@@ -0,0 +1,385 @@
+"""
+FraudShield AI - Declarative Rules
+Rule definitions compiled into one vectorized NumPy evaluation
+
+A rule is a dict (or JSON object) such as::
+
+    {
+        "name": "zero_balance",
+        "expression": "(oldbalanceOrg > 0) & (newbalanceOrig == 0) & (amount > 50000)",
+        "weight": 1.0,
+        "aggregates": [],
+        "description": "Large transaction leaving zero balance"
+    }
+
+Expressions are Python-syntax arithmetic and comparisons over transaction
+columns and the account aggregates the rule declares; they are validated and
+compiled once, then evaluated on whole column arrays. Because operands are
+arrays, conditions combine with ``&``, ``|`` and ``~`` (``and``, ``or``,
+``not`` and chained comparisons such as ``a < b < c`` would need a single
+truth value and are rejected).
+"""
+
+import ast
+import json
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Transaction columns an expression may reference
+COLUMNS = ('step', 'type', 'amount', 'nameOrig', 'oldbalanceOrg', 'newbalanceOrig',
+           'nameDest', 'oldbalanceDest', 'newbalanceDest')
+
+# Per-row account statistics a rule may declare (see ``account_stats``)
+AGGREGATES = ('count', 'mean', 'std', 'max', 'freq')
+
+
+def _isin(values, options) -> np.ndarray:
+    """Vectorized membership test (hash lookup, works on object and categorical columns)"""
+    return pd.Index(list(options)).get_indexer(values) >= 0
+
+
+FUNCTIONS = {
+    'isin': _isin,
+    'abs': np.abs,
+    'log1p': np.log1p,
+    'minimum': np.minimum,
+    'maximum': np.maximum,
+    'isnan': np.isnan,
+}
+
+DEFAULT_RULES = [
+    {
+        'name': 'amount_anomaly',
+        'expression': '(amount > mean + 3 * std) | (amount > 100000)',
+        'aggregates': ['mean', 'std'],
+        'description': 'Unusual amount (> 3 std dev from user mean)',
+    },
+    {
+        'name': 'balance_error',
+        'expression': 'oldbalanceOrg - amount != newbalanceOrig',
+        'description': 'Balance inconsistency',
+    },
+    {
+        'name': 'zero_balance',
+        'expression': '(oldbalanceOrg > 0) & (newbalanceOrig == 0) & (amount > 50000)',
+        'description': 'Zero balance after large transaction',
+    },
+    {
+        'name': 'high_frequency',
+        'expression': 'freq > 5',
+        'aggregates': ['freq'],
+        'description': 'High-frequency transactions (more than 5 in same step)',
+    },
+    {
+        'name': 'risky_type',
+        'expression': "isin(type, ['TRANSFER', 'CASH_OUT'])",
+        'description': 'Risky transaction types',
+    },
+]
+
+_ALLOWED_NODES = (
+    ast.Expression, ast.BinOp, ast.UnaryOp, ast.Compare, ast.Call,
+    ast.Name, ast.Load, ast.Constant, ast.List, ast.Tuple,
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow,
+    ast.BitAnd, ast.BitOr, ast.BitXor, ast.Invert, ast.USub, ast.UAdd,
+    ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE,
+)
+
+# Python's logical operators call bool() on their operands, which fails (or
+# silently picks one operand) for arrays; the message names the replacement
+_ARRAY_OPERATORS = {ast.And: '&', ast.Or: '|', ast.Not: '~'}
+
+# Rows of the synthetic batch a rule set is dry-run on before it is used
+DRY_RUN_ROWS = 8
+
+
+def _synthetic_batch(n_rows: int) -> Tuple[pd.DataFrame, Dict[str, np.ndarray]]:
+    """Transactions and account statistics typed like a scored batch (IDs as codes)"""
+    rng = np.random.default_rng(0)
+    amounts = rng.lognormal(10, 1.5, n_rows).round(2)
+    columns = pd.DataFrame({
+        'step': rng.integers(1, 744, n_rows).astype(np.int32),
+        'type': pd.Categorical(rng.choice(['PAYMENT', 'TRANSFER', 'CASH_OUT', 'DEBIT', 'CASH_IN'], n_rows)),
+        'amount': amounts,
+        'nameOrig': rng.integers(0, n_rows, n_rows).astype(np.int32),
+        'oldbalanceOrg': amounts * 2,
+        'newbalanceOrig': amounts,
+        'nameDest': rng.integers(0, n_rows, n_rows).astype(np.int32),
+        'oldbalanceDest': np.zeros(n_rows),
+        'newbalanceDest': amounts,
+    })
+    stats = {
+        'count': np.ones(n_rows),
+        'mean': amounts,
+        # A single transaction per account has no standard deviation
+        'std': np.full(n_rows, np.nan),
+        'max': amounts,
+        'freq': np.ones(n_rows, dtype=np.int64),
+    }
+    return columns, stats
+
+
+class Rule:
+    """One validated, compiled rule"""
+
+    def __init__(self, name: str, expression: str, weight: float = 1.0,
+                 aggregates: Optional[List[str]] = None, description: str = ''):
+        self.name = name
+        self.expression = expression
+        self.weight = float(weight)
+        self.aggregates = list(aggregates or [])
+        self.description = description
+
+        if not name.isidentifier():
+            raise ValueError(f"Rule name {name!r} must be a valid identifier")
+        unknown = [agg for agg in self.aggregates if agg not in AGGREGATES]
+        if unknown:
+            raise ValueError(f"Rule {name!r} declares unknown aggregates {unknown}")
+
+        try:
+            tree = ast.parse(expression, mode='eval')
+        except SyntaxError as e:
+            raise ValueError(f"Rule {name!r} has invalid expression: {e.msg}")
+
+        names = set()
+        for node in ast.walk(tree):
+            operator = type(node.op) if isinstance(node, ast.BoolOp) else type(node)
+            if operator in _ARRAY_OPERATORS:
+                raise ValueError(
+                    f"Rule {name!r} uses '{operator.__name__.lower()}'; "
+                    f"combine conditions with '{_ARRAY_OPERATORS[operator]}' instead"
+                )
+            if not isinstance(node, _ALLOWED_NODES):
+                raise ValueError(f"Rule {name!r} uses unsupported syntax: {type(node).__name__}")
+            if isinstance(node, ast.Compare) and len(node.ops) > 1:
+                raise ValueError(
+                    f"Rule {name!r} chains comparisons; write (a < b) & (b < c) instead"
+                )
+            if isinstance(node, ast.Call) and not (
+                isinstance(node.func, ast.Name) and node.func.id in FUNCTIONS
+            ):
+                raise ValueError(f"Rule {name!r} calls an unknown function")
+            if isinstance(node, ast.Name) and node.id not in FUNCTIONS:
+                names.add(node.id)
+
+        undeclared = names - set(COLUMNS) - set(self.aggregates)
+        if undeclared:
+            raise ValueError(
+                f"Rule {name!r} references {sorted(undeclared)}; aggregates must be "
+                f"declared and columns must be one of {list(COLUMNS)}"
+            )
+
+        self.columns = sorted(names & set(COLUMNS))
+        self.code = compile(tree, f"<rule {name}>", 'eval')
+
+    @classmethod
+    def from_spec(cls, spec: Dict) -> 'Rule':
+        """
+        Build a rule from its JSON object
+
+        Raises:
+            ValueError: For any malformed definition (missing keys, values of
+                the wrong type, invalid expression)
+        """
+        if not isinstance(spec, dict):
+            raise ValueError(f"Rule definition must be an object, got {type(spec).__name__}")
+        try:
+            return cls(
+                name=spec['name'],
+                expression=spec['expression'],
+                weight=spec.get('weight', 1.0),
+                aggregates=spec.get('aggregates'),
+                description=spec.get('description', ''),
+            )
+        except KeyError as e:
+            raise ValueError(f"Rule definition is missing {e.args[0]!r}")
+        except (TypeError, AttributeError) as e:
+            # e.g. a numeric name or expression, or aggregates that are not a list
+            raise ValueError(f"Rule definition {spec.get('name')!r} has a value of the wrong type: {e}")
+
+    def to_spec(self) -> Dict:
+        return {
+            'name': self.name,
+            'expression': self.expression,
+            'weight': self.weight,
+            'aggregates': list(self.aggregates),
+            'description': self.description,
+        }
+
+
+class RuleSet:
+    """
+    An immutable, compiled list of rules with per-rule cost and hit counters
+
+    ``evaluate`` extracts each referenced column once and runs every rule on
+    the same arrays, writing the flags into one (rules x rows) matrix, so a
+    rule costs one vectorized expression rather than a DataFrame pass. To
+    change rules, build a new RuleSet and swap it in.
+    """
+
+    def __init__(self, rules: List[Rule], source: str = 'default'):
+        if not rules:
+            raise ValueError("A rule set needs at least one rule")
+        names = [rule.name for rule in rules]
+        duplicates = sorted({name for name in names if names.count(name) > 1})
+        if duplicates:
+            raise ValueError(f"Duplicate rule names: {duplicates}")
+        if sum(rule.weight for rule in rules) <= 0:
+            raise ValueError("Rule weights must sum to a positive value")
+
+        self.rules = rules
+        self.source = source
+        self.loaded_at = datetime.now().isoformat()
+        self.names = names
+        self.weights = np.array([rule.weight for rule in rules])
+        self.columns = sorted({col for rule in rules for col in rule.columns})
+        self.aggregates = sorted({agg for rule in rules for agg in rule.aggregates})
+
+        self._lock = threading.Lock()
+        self._calls = 0
+        self._rows = 0
+        self._time_ns = np.zeros(len(rules), dtype=np.int64)
+        self._hits = np.zeros(len(rules), dtype=np.int64)
+
+    @classmethod
+    def from_specs(cls, specs: List[Dict], source: str = 'default') -> 'RuleSet':
+        if not isinstance(specs, list):
+            raise ValueError(f"Rules must be a list of rule objects, got {type(specs).__name__}")
+        return cls([Rule.from_spec(spec) for spec in specs], source)
+
+    @classmethod
+    def default(cls) -> 'RuleSet':
+        return cls.from_specs(DEFAULT_RULES)
+
+    @classmethod
+    def from_file(cls, path: str) -> 'RuleSet':
+        """
+        Load rules from a JSON file: a list of rule objects, or ``{"rules": [...]}``
+
+        Raises:
+            ValueError: If the file is not valid JSON or a rule is invalid
+        """
+        with open(path) as f:
+            try:
+                data = json.load(f)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Rules file {path} is not valid JSON: {e}")
+        if isinstance(data, dict):
+            if 'rules' not in data:
+                raise ValueError(f"Rules file {path} has no 'rules' list")
+            data = data['rules']
+        return cls.from_specs(data, source=path)
+
+    def evaluate(self, columns, stats: Optional[Dict[str, np.ndarray]] = None
+                 ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Run every rule on a batch
+
+        Args:
+            columns: DataFrame or dict of arrays with the transaction columns
+            stats: Per-row account statistics; required if any rule declares
+                aggregates
+
+        Returns:
+            (hits, rule_score): a (n_rules, n_rows) bool matrix in rule order
+            and the weighted share of rules each row triggers (0-1)
+        """
+        namespace = self._namespace(columns, stats)
+        n_rows = len(columns[self.columns[0]]) if self.columns else len(stats[self.aggregates[0]])
+        hits = np.empty((len(self.rules), n_rows), dtype=bool)
+        time_ns = np.empty(len(self.rules), dtype=np.int64)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            for i, rule in enumerate(self.rules):
+                start = time.perf_counter_ns()
+                hits[i] = eval(rule.code, namespace)
+                time_ns[i] = time.perf_counter_ns() - start
+
+        rule_score = (self.weights @ hits) / self.weights.sum()
+        self.add_counters(1, n_rows, time_ns, hits.sum(axis=1))
+
+        return hits, rule_score
+
+    def _namespace(self, columns, stats: Optional[Dict[str, np.ndarray]]) -> Dict:
+        namespace = {'__builtins__': {}}
+        namespace.update(FUNCTIONS)
+        for name in self.columns:
+            column = columns[name]
+            namespace[name] = column.to_numpy() if hasattr(column, 'to_numpy') else np.asarray(column)
+        if self.aggregates:
+            if stats is None:
+                raise ValueError(f"Rules need account aggregates {self.aggregates}")
+            for name in self.aggregates:
+                namespace[name] = stats[name]
+        return namespace
+
+    def dry_run(self, n_rows: int = DRY_RUN_ROWS):
+        """
+        Evaluate every rule on a small synthetic batch, without counting it
+
+        Validation only checks syntax and names; this catches rules that
+        still fail on arrays (e.g. a function called with the wrong
+        arguments) or that do not give one flag per row (``amount * 2``,
+        ``1 > 0``).
+
+        Raises:
+            ValueError: Naming the first rule that fails
+        """
+        columns, stats = _synthetic_batch(n_rows)
+        namespace = self._namespace(columns, stats)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            for rule in self.rules:
+                try:
+                    flags = np.asarray(eval(rule.code, namespace))
+                except Exception as e:
+                    raise ValueError(f"Rule {rule.name!r} fails on a sample batch: "
+                                     f"{type(e).__name__}: {e}")
+                if flags.dtype != bool or flags.shape != (n_rows,):
+                    raise ValueError(
+                        f"Rule {rule.name!r} must give one true/false flag per row, "
+                        f"got {flags.dtype} values of shape {flags.shape}"
+                    )
+
+    def counters(self) -> Tuple[int, int, np.ndarray, np.ndarray]:
+        """Snapshot of the cumulative (calls, rows, time_ns, hits) counters"""
+        with self._lock:
+            return self._calls, self._rows, self._time_ns.copy(), self._hits.copy()
+
+    def add_counters(self, calls: int, rows: int, time_ns: np.ndarray, hits: np.ndarray):
+        """Fold in evaluations counted elsewhere (e.g. in a worker process)"""
+        with self._lock:
+            self._calls += calls
+            self._rows += rows
+            self._time_ns += time_ns
+            self._hits += hits
+
+    def metrics(self) -> List[Dict]:
+        """Cumulative evaluation time and hit rate per rule since the set was loaded"""
+        with self._lock:
+            rows = self._rows
+            return [
+                {
+                    'name': rule.name,
+                    'weight': rule.weight,
+                    'calls': self._calls,
+                    'rows': rows,
+                    'hits': int(self._hits[i]),
+                    'hit_rate': float(self._hits[i] / rows) if rows else 0.0,
+                    'total_time_ms': float(self._time_ns[i] / 1e6),
+                    'ns_per_row': float(self._time_ns[i] / rows) if rows else 0.0,
+                }
+                for i, rule in enumerate(self.rules)
+            ]
+
+    def to_dict(self) -> Dict:
+        return {
+            'source': self.source,
+            'loaded_at': self.loaded_at,
+            'rules': [rule.to_spec() for rule in self.rules],
+            'metrics': self.metrics(),
+        }
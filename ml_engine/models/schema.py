@@ -0,0 +1,288 @@
+"""
+FraudShield AI - Ingestion Schema
+Which columns an uploaded transaction file must have, and how they are typed
+
+Uploads may be CSV, Parquet or Arrow IPC (file or stream). For CSV the
+header is checked before any row is parsed, so a file with missing columns
+is rejected after one line; the parser is then given explicit types and
+skips every column not listed here (e.g. ``isFlaggedFraud``), instead of
+inferring int64/float64/object for everything. Columnar inputs are cast to
+the same types, reading only the listed columns. Account IDs and ``type``
+are dictionary-encoded (categorical), so each distinct string is
+materialized once; account IDs become int32 codes right after
+(``encode_accounts``). Files too large to load at once are read in chunks
+of the same types (``iter_transactions``).
+
+Monetary columns stay float64: float32 keeps 24 significant bits, which
+loses cents above $167,772.16 and flips exact balance checks such as the
+``balance_error`` rule. The feature matrix built from them is float32.
+"""
+
+import csv
+from typing import BinaryIO, Dict, Iterator, List, Optional
+
+import pandas as pd
+
+REQUIRED_COLUMNS = ('step', 'type', 'amount', 'nameOrig', 'oldbalanceOrg',
+                    'newbalanceOrig', 'nameDest', 'oldbalanceDest', 'newbalanceDest')
+
+# Read when present; any other column is skipped
+OPTIONAL_COLUMNS = ('isFraud', 'transaction_id')
+
+# pandas dtype per column
+COLUMN_DTYPES: Dict[str, str] = {
+    'step': 'int32',
+    'type': 'category',
+    'amount': 'float64',
+    'nameOrig': 'category',
+    'oldbalanceOrg': 'float64',
+    'newbalanceOrig': 'float64',
+    'nameDest': 'category',
+    'oldbalanceDest': 'float64',
+    'newbalanceDest': 'float64',
+    'isFraud': 'int8',
+    'transaction_id': 'int64',
+}
+
+# Block size for the pyarrow CSV reader; each block is parsed on its own thread
+CSV_BLOCK_BYTES = 4 * 1024 * 1024
+
+
+def parse_header(line: bytes) -> List[str]:
+    """
+    Column names from a CSV header line
+
+    Raises:
+        ValueError: If the line is not UTF-8 text (e.g. an unsupported binary format)
+    """
+    try:
+        text = line.decode('utf-8-sig').rstrip('\r\n')
+    except UnicodeDecodeError:
+        raise ValueError("Unsupported file format; expected CSV, Parquet or Arrow IPC")
+    return next(csv.reader([text]), [])
+
+
+def select_columns(header: List[str]) -> List[str]:
+    """
+    Columns of ``header`` to read, in file order
+
+    Raises:
+        ValueError: If a required column is missing
+    """
+    missing = [column for column in REQUIRED_COLUMNS if column not in header]
+    if missing:
+        raise ValueError(f"Missing required columns: {missing}")
+    return [column for column in header if column in COLUMN_DTYPES]
+
+
+def _arrow_types(columns: List[str]) -> Dict:
+    import pyarrow as pa
+
+    types = {
+        'int8': pa.int8(),
+        'int32': pa.int32(),
+        'int64': pa.int64(),
+        'float64': pa.float64(),
+        'category': pa.dictionary(pa.int32(), pa.string()),
+    }
+    return {column: types[COLUMN_DTYPES[column]] for column in columns}
+
+
+def _csv_module(engine: Optional[str]):
+    # pyarrow.csv, or None for the pandas C parser
+    if engine == 'c':
+        return None
+    try:
+        from pyarrow import csv as pa_csv
+    except ImportError:
+        if engine == 'pyarrow':
+            raise
+        return None
+    return pa_csv
+
+
+def _read_header(source: BinaryIO):
+    header = parse_header(source.readline())
+    if not header:
+        raise ValueError("File is empty")
+    return header, select_columns(header)
+
+
+def _arrow_options(pa_csv, header: List[str], columns: List[str]) -> Dict:
+    return {
+        'read_options': pa_csv.ReadOptions(column_names=header, use_threads=True,
+                                           block_size=CSV_BLOCK_BYTES),
+        'convert_options': pa_csv.ConvertOptions(include_columns=columns,
+                                                 column_types=_arrow_types(columns),
+                                                 # Empty fields are missing values, as with pandas
+                                                 strings_can_be_null=True),
+    }
+
+
+def read_transactions(source: BinaryIO, engine: Optional[str] = None) -> pd.DataFrame:
+    """
+    Parse a transactions CSV with the ingestion schema
+
+    ``source`` is read sequentially, so it may still be arriving.
+
+    Args:
+        source: Binary file positioned at the header line
+        engine: 'pyarrow' (multithreaded) or 'c' (pandas); by default
+            pyarrow when it is installed
+
+    Raises:
+        ValueError: If the file is empty, lacks required columns, or has a
+            value that does not fit its column's type
+    """
+    header, columns = _read_header(source)
+    pa_csv = _csv_module(engine)
+    if pa_csv is None:
+        try:
+            return pd.read_csv(source, header=None, names=header, usecols=columns,
+                               dtype={column: COLUMN_DTYPES[column] for column in columns})
+        except ValueError as e:
+            raise ValueError(f"Could not parse transactions: {e}")
+
+    try:
+        table = pa_csv.read_csv(source, **_arrow_options(pa_csv, header, columns))
+    except ValueError as e:
+        # pyarrow.ArrowInvalid is a ValueError
+        raise ValueError(f"Could not parse transactions: {e}")
+    return _to_frame(table)
+
+
+def iter_transactions(source: BinaryIO, chunksize: int,
+                      engine: Optional[str] = None) -> Iterator[pd.DataFrame]:
+    """
+    Parse a transactions CSV with the ingestion schema, ``chunksize`` rows at a time
+
+    Chunks are typed exactly like ``read_transactions`` output; only one
+    chunk (plus one parser block) is held at a time.
+
+    Raises:
+        ValueError: As for ``read_transactions``, when the offending chunk is read
+    """
+    if chunksize < 1:
+        raise ValueError("chunksize must be >= 1")
+    header, columns = _read_header(source)
+    pa_csv = _csv_module(engine)
+    if pa_csv is None:
+        try:
+            yield from pd.read_csv(source, header=None, names=header, usecols=columns,
+                                   dtype={column: COLUMN_DTYPES[column] for column in columns},
+                                   chunksize=chunksize)
+        except ValueError as e:
+            raise ValueError(f"Could not parse transactions: {e}")
+        return
+
+    import pyarrow as pa
+
+    # The streaming reader yields one record batch per block; regroup them
+    # into chunks of exactly ``chunksize`` rows (slices share the batches)
+    pending, rows = [], 0
+    try:
+        for batch in pa_csv.open_csv(source, **_arrow_options(pa_csv, header, columns)):
+            pending.append(batch)
+            rows += batch.num_rows
+            while rows >= chunksize:
+                table = pa.Table.from_batches(pending)
+                pending = table.slice(chunksize).to_batches()
+                rows -= chunksize
+                yield _to_frame(table.slice(0, chunksize))
+    except ValueError as e:
+        raise ValueError(f"Could not parse transactions: {e}")
+    if rows:
+        yield _to_frame(pa.Table.from_batches(pending))
+
+
+def _to_frame(table) -> pd.DataFrame:
+    # One block per column: single-chunk numeric columns without nulls are
+    # handed to pandas without a copy, and with self_destruct each column is
+    # released as soon as it is converted
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+
+def _pyarrow(kind: str):
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise ValueError(f"{kind} uploads need the 'pyarrow' package")
+    return pa
+
+
+def conform_table(table) -> pd.DataFrame:
+    """
+    Typed frame from an Arrow table (Parquet or Arrow IPC input)
+
+    Columns already of the schema's type are passed through untouched; others
+    are cast (e.g. int64 ``step`` to int32, plain strings to dictionaries).
+
+    Raises:
+        ValueError: If a required column is missing or a column cannot be
+            cast to its type (e.g. an int64 ``step`` out of int32 range)
+    """
+    pa = _pyarrow("Arrow")
+    columns = select_columns(table.column_names)
+    types = _arrow_types(columns)
+
+    arrays = []
+    for column in columns:
+        try:
+            arrays.append(table.column(column).cast(types[column]))
+        except pa.ArrowException as e:
+            raise ValueError(f"Column '{column}' cannot be read as {COLUMN_DTYPES[column]}: {e}")
+    return _to_frame(pa.table(arrays, names=columns))
+
+
+def read_parquet(data) -> pd.DataFrame:
+    """
+    Parse a Parquet file held in memory, reading only the schema's columns
+
+    Raises:
+        ValueError: As for ``conform_table``, or if the file is not valid Parquet
+    """
+    pa = _pyarrow("Parquet")
+    import pyarrow.parquet as pq
+
+    try:
+        parquet_file = pq.ParquetFile(pa.BufferReader(data))
+        columns = select_columns(parquet_file.schema_arrow.names)
+        table = parquet_file.read(columns=columns, use_threads=True)
+    except pa.ArrowException as e:
+        raise ValueError(f"Could not read Parquet file: {e}")
+    return conform_table(table)
+
+
+def read_arrow(data) -> pd.DataFrame:
+    """
+    Parse an Arrow IPC file held in memory
+
+    Uncompressed columns reference ``data`` directly; nothing is copied for
+    columns already of the schema's type.
+
+    Raises:
+        ValueError: As for ``conform_table``, or if the file is not valid Arrow IPC
+    """
+    pa = _pyarrow("Arrow")
+    try:
+        table = pa.ipc.open_file(pa.BufferReader(data)).read_all()
+    except pa.ArrowException as e:
+        raise ValueError(f"Could not read Arrow file: {e}")
+    return conform_table(table)
+
+
+def read_arrow_stream(source: BinaryIO) -> pd.DataFrame:
+    """
+    Parse an Arrow IPC stream, record batch by record batch as it is read
+
+    Raises:
+        ValueError: As for ``conform_table``, or if the stream is not valid Arrow IPC
+    """
+    pa = _pyarrow("Arrow")
+    try:
+        reader = pa.ipc.open_stream(source)
+        select_columns(reader.schema.names)
+        table = reader.read_all()
+    except pa.ArrowException as e:
+        raise ValueError(f"Could not read Arrow stream: {e}")
+    return conform_table(table)